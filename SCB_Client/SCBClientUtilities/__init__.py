@@ -1,52 +1,144 @@
-from typing import List
-from datetime import timedelta, datetime
+from typing import Dict, List, Optional
+from datetime import timedelta
+from time import perf_counter_ns
 from uuid import UUID, uuid4
 from enum import Enum
+from threading import Lock
+
+from SCB_Client.SCBClientUtilities.arrow import arrow_batch_from_columnar, arrow_table_from_batches
+from SCB_Client.SCBClientUtilities.columnar import columnar_from_json, concat_columnar, encode_keys
+from SCB_Client.SCBClientUtilities.csv_parser import iter_csv_rows
+from SCB_Client.SCBClientUtilities.histogram import LatencyHistogram
+from SCB_Client.SCBClientUtilities.json_decoder import JsonDecoder, OrjsonDecoder, get_json_decoder, paused_gc
+from SCB_Client.SCBClientUtilities.jsonstat import columnar_from_jsonstat2, json_from_jsonstat2
+from SCB_Client.SCBClientUtilities.metadata_cache import MetadataCache
+from SCB_Client.SCBClientUtilities.payload import CsvJsonResponse, JsonStatJsonResponse, choose_response_type, estimate_payload, json_from_csv_rows
+from SCB_Client.SCBClientUtilities.planner import plan_tiling, split_evenly
+from SCB_Client.SCBClientUtilities.rate_limiter import RateLimiter
+from SCB_Client.SCBClientUtilities.response_cache import ResponseCache
+from SCB_Client.SCBClientUtilities.sinks import ParquetSink, SQLiteSink
+from SCB_Client.SCBClientUtilities.slicing import DecodedJsonResponse, split_json_response, stitch_json_responses
+from SCB_Client.SCBClientUtilities.sqlite_cache import SQLiteCache
+from SCB_Client.SCBClientUtilities.sync_store import SyncStore
+from SCB_Client.SCBClientUtilities.tracing import CallbackTracer, Span, Tracer
+from SCB_Client.SCBClientUtilities.transport import AsyncSCBTransport, SCBResponse, SCBTransport
 
 
 class SessionType(Enum):
   DOWNLOAD = "download"
   PROCESS = "process"
 
+class CounterType(Enum):
+  REQUESTS = "requests" # Every attempt of a data request, including retries
+  RATE_LIMITED = "rate_limited" # Responses with status 429
+  RETRIES = "retries"
+  CELLS = "cells" # Cells returned, from SCB or the response cache
+
 class PerformanceMonitor():
+  """
+  Times download and process sessions into streaming histograms, so memory doesn't grow with the number of sessions.
+  Sessions can be labelled, e.g. by table and partition, every distinct set of labels gets its own histogram 
+  and byte count. Histograms are merged when read, for all sessions of a type or the ones matching some labels.
+  Counters (see CounterType) are labelled the same way.
+  Safe to use from multiple threads.
+  """
+
   def __init__(self):
-    self.download_sessions: List[timedelta] = []
-    self.process_session: List[timedelta] = []
-    self.__ongoing_sessions: List[dict] = []
+    self.__ongoing_sessions: Dict[UUID, tuple] = {} # uuid -> (type, start in perf_counter_ns, labels)
+    self.__histograms: Dict[tuple, LatencyHistogram] = {} # (type, sorted label items) -> durations in nanoseconds
+    self.__byte_counts: Dict[tuple, int] = {}
+    self.__counters: Dict[tuple, int] = {} # (type, sorted label items) -> count
+    self.__lock = Lock() # Sessions can be started and stopped from multiple download workers
 
-  def start_session(self, type: SessionType) -> UUID:
+  def start_session(self, type: SessionType, **labels) -> UUID:
     new_uuid = uuid4()
-    now = datetime.now()
-    self.__ongoing_sessions.append(
-      {
-        "uuid": new_uuid,
-        "time": now,
-        "type": type
-      }
-    )
+    with self.__lock:
+      self.__ongoing_sessions[new_uuid] = (type, perf_counter_ns(), labels)
     return new_uuid
   
-  def stop_session(self, uuid: UUID) -> timedelta:
-    session_to_stop = [session for session in self.__ongoing_sessions if session["uuid"] == uuid][0]
-    if not session_to_stop:
-      raise KeyError("No found session for {uuid}.")
-    td: timedelta = datetime.now() - session_to_stop["time"]
-    if session_to_stop["type"] == SessionType.DOWNLOAD:
-      self.download_sessions.append(td)
-    elif session_to_stop["type"] == SessionType.PROCESS:
-      self.process_session.append(td)
-    else:
-      raise NotImplementedError("This sessions type is not recognized.")
-    self.__ongoing_sessions.remove(session_to_stop)
-    return td
+  def stop_session(self, uuid: UUID, byte_count: Optional[int] = None, **labels) -> timedelta:
+    """Stops the session and returns its duration, labels are added to the ones it was started with."""
+    end = perf_counter_ns()
+    with self.__lock:
+      session = self.__ongoing_sessions.pop(uuid, None)
+      if session == None:
+        raise KeyError(f"No found session for {uuid}.")
+      type, start, start_labels = session
+      if type not in (SessionType.DOWNLOAD, SessionType.PROCESS):
+        raise NotImplementedError("This sessions type is not recognized.")
+      key = (type, tuple(sorted({**start_labels, **labels}.items())))
+      if key not in self.__histograms:
+        self.__histograms[key] = LatencyHistogram()
+        self.__byte_counts[key] = 0
+      self.__histograms[key].record(end - start)
+      if byte_count != None:
+        self.__byte_counts[key] += byte_count
+    return timedelta(microseconds = (end - start) / 1000)
+
+  @property
+  def download_sessions(self) -> LatencyHistogram:
+    """Durations of all download sessions in nanoseconds."""
+    return self.get_histogram(SessionType.DOWNLOAD)
+
+  @property
+  def process_session(self) -> LatencyHistogram:
+    """Durations of all process sessions in nanoseconds."""
+    return self.get_histogram(SessionType.PROCESS)
+
+  def get_histogram(self, type: SessionType, **labels) -> LatencyHistogram:
+    """Returns the durations in nanoseconds of the sessions of type that have all the given labels."""
+    histogram = LatencyHistogram()
+    with self.__lock:
+      for key in self.__get_matching_keys(type, labels):
+        histogram.merge(self.__histograms[key])
+    return histogram
+
+  def get_byte_count(self, type: SessionType, **labels) -> int:
+    """Returns the bytes of the sessions of type that have all the given labels."""
+    with self.__lock:
+      return sum([self.__byte_counts[key] for key in self.__get_matching_keys(type, labels)])
+
+  def get_percentiles_microseconds(self, type: SessionType, **labels) -> Dict[str, Optional[float]]:
+    """Returns p50, p95 and p99 of the sessions of type that have all the given labels, None if there are no sessions."""
+    return {name: value / 1000 if value != None else None for name, value in self.get_histogram(type, **labels).percentiles().items()}
+
+  def get_labelled_sessions(self) -> List[tuple]:
+    """Returns (type, labels, histogram, byte count) for every distinct set of labels, e.g. for exporting metrics."""
+    with self.__lock:
+      sessions = []
+      for key, histogram in self.__histograms.items():
+        copy = LatencyHistogram()
+        copy.merge(histogram)
+        sessions.append((key[0], dict(key[1]), copy, self.__byte_counts[key]))
+      return sessions
     
+  def count(self, type: CounterType, value: int = 1, **labels) -> None:
+    """Adds value to the counter of type with the labels."""
+    if not isinstance(type, CounterType):
+      raise NotImplementedError("This counter type is not recognized.")
+    key = (type, tuple(sorted(labels.items())))
+    with self.__lock:
+      self.__counters[key] = self.__counters.get(key, 0) + value
+
+  def get_count(self, type: CounterType, **labels) -> int:
+    """Returns the sum of the counters of type that have all the given labels."""
+    wanted = set(labels.items())
+    with self.__lock:
+      return sum([count for key, count in self.__counters.items() if key[0] == type and wanted.issubset(key[1])])
+
+  def get_labelled_counters(self) -> List[tuple]:
+    """Returns (type, labels, count) for every distinct set of labels."""
+    with self.__lock:
+      return [(key[0], dict(key[1]), count) for key, count in self.__counters.items()]
+
   def total_session_time_microseconds(self, type: SessionType) -> int:
-    if type == SessionType.DOWNLOAD:
-      return sum([ms.microseconds for ms in self.download_sessions])
-    elif type == SessionType.PROCESS:
-      return sum([ms.microseconds for ms in self.process_session])
-    else:
+    if type not in (SessionType.DOWNLOAD, SessionType.PROCESS):
       raise NotImplementedError("This sessions type is not recognized.")
+    return self.get_histogram(type).total // 1000
+
+  def __get_matching_keys(self, type: SessionType, labels: dict) -> List[tuple]:
+    wanted = set(labels.items())
+    return [key for key in self.__histograms if key[0] == type and wanted.issubset(key[1])]
 
 def flatten_data(nested_data: List[list]) -> list:
   return [item for sublist in nested_data for item in sublist]
\ No newline at end of file
@@ -0,0 +1,50 @@
+from typing import List, Optional, Tuple
+
+from SCB_Client.model.scb_models import SCBColumnarResponse, SCBVariable
+
+def _import_pyarrow():
+  try:
+    import pyarrow
+  except ImportError as e:
+    raise ImportError("Arrow results require pyarrow, install it with pip install pyarrow.") from e
+  return pyarrow
+
+def arrow_batch_from_columnar(response: SCBColumnarResponse, variables: List[SCBVariable]):
+  """
+  Creates a pyarrow.RecordBatch from a columnar response without going through Python objects per cell.
+  Key columns become dictionary columns (categorical in pandas) over the variable valueTexts, values with the same text
+  share a dictionary entry since categories must be unique. Content columns are float64 with missing values as nulls.
+  Column names are the SCB codes, the texts are kept as field metadata.
+  """
+  pa = _import_pyarrow()
+  value_texts = {var.code: dict(zip(var.values, var.valueTexts)) for var in variables}
+  texts = {column["code"]: column["text"] for column in response.columns}
+  fields = []
+  arrays = []
+  for code, codes in response.key_codes.items():
+    labels, remap = _get_unique_labels([value_texts.get(code, {}).get(value, value) for value in response.key_values[code]])
+    indices = pa.array(codes, type = pa.int32())
+    if remap != None:
+      indices = remap.take(indices)
+    arrays.append(pa.DictionaryArray.from_arrays(indices, pa.array(labels, type = pa.string())))
+    fields.append(pa.field(code, arrays[-1].type, metadata = {"text": texts.get(code, code)}))
+  for code, values in response.values.items():
+    arrays.append(pa.array(values, type = pa.float64(), mask = response.missing[code]))
+    fields.append(pa.field(code, pa.float64(), metadata = {"text": texts.get(code, code)}))
+  return pa.RecordBatch.from_arrays(arrays, schema = pa.schema(fields))
+
+def _get_unique_labels(labels: List[str]) -> Tuple[List[str], Optional[object]]:
+  """Returns the labels without duplicates and a pyarrow array mapping every label index to its unique index, None if they're already unique."""
+  unique_labels = list(dict.fromkeys(labels))
+  if len(unique_labels) == len(labels):
+    return labels, None
+  pa = _import_pyarrow()
+  unique_indices = {label: i for i, label in enumerate(unique_labels)}
+  return unique_labels, pa.array([unique_indices[label] for label in labels], type = pa.int32())
+
+def arrow_table_from_batches(batches: list):
+  """Concatenates record batches of the same table into a pyarrow.Table without copying them."""
+  pa = _import_pyarrow()
+  if not batches:
+    raise ValueError("At least one batch is needed to create a table.")
+  return pa.Table.from_batches(batches)
@@ -0,0 +1,110 @@
+from operator import itemgetter
+from typing import Dict, List, Tuple
+
+from SCB_Client.model.scb_models import SCBColumnarResponse, SCBVariable
+
+MISSING_VALUE_MARKERS: Tuple[str, ...] = ("..", "...", "-", ".", "")
+
+def _import_numpy():
+  try:
+    import numpy
+  except ImportError as e:
+    raise ImportError("Columnar results require numpy, install it with pip install numpy.") from e
+  return numpy
+
+def columnar_from_json(json_data: dict, variables: List[SCBVariable]) -> SCBColumnarResponse:
+  """
+  Creates an SCBColumnarResponse straight from a decoded SCB JSON response, no object is created per data point.
+  Params:
+    json_data: dict
+      The decoded JSON response.
+    variables: List[SCBVariable]
+      Variables of the table, their values are used as vocabulary for the key columns.
+  """
+  key_columns = [column for column in json_data["columns"] if column["type"] != "c"]
+  content_columns = [column for column in json_data["columns"] if column["type"] == "c"]
+  data = json_data["data"]
+  vocabularies = {var.code: var.values for var in variables}
+
+  key_codes: Dict[str, object] = {}
+  key_values: Dict[str, List[str]] = {}
+  keys = [datapoint["key"] for datapoint in data]
+  for i, column in enumerate(key_columns):
+    key_codes[column["code"]], key_values[column["code"]] = encode_keys(list(map(itemgetter(i), keys)), vocabularies.get(column["code"], []))
+
+  values: Dict[str, object] = {}
+  missing: Dict[str, object] = {}
+  datapoint_values = [datapoint["values"] for datapoint in data]
+  for i, column in enumerate(content_columns):
+    values[column["code"]], missing[column["code"]] = parse_values(list(map(itemgetter(i), datapoint_values)))
+
+  return SCBColumnarResponse(
+    columns = json_data["columns"],
+    comments = json_data["comments"],
+    key_codes = key_codes,
+    key_values = key_values,
+    values = values,
+    missing = missing
+  )
+
+def encode_keys(keys: List[str], vocabulary: List[str]) -> tuple:
+  """Dictionary encodes a key column into int32 indexes of the vocabulary, keys that aren't in the vocabulary are appended to a copy of it."""
+  np = _import_numpy()
+  vocabulary = list(vocabulary)
+  index = {value: i for i, value in enumerate(vocabulary)}
+  try:
+    codes = np.fromiter(map(index.__getitem__, keys), dtype = np.int32, count = len(keys))
+  except KeyError:
+    # A key that isn't among the variable values, e.g. unknown variable, extend the vocabulary with it
+    for key in keys:
+      if key not in index:
+        index[key] = len(vocabulary)
+        vocabulary.append(key)
+    codes = np.fromiter(map(index.__getitem__, keys), dtype = np.int32, count = len(keys))
+  return codes, vocabulary
+
+def parse_values(column_values) -> tuple:
+  """Parses SCB values (strings) into a float64 array and a mask of the values marked as missing, which are NaN."""
+  np = _import_numpy()
+  strings = np.array(column_values, dtype = str)
+  if len(strings) == 0:
+    return np.empty(0, dtype = np.float64), np.empty(0, dtype = bool)
+  mask = np.isin(strings, MISSING_VALUE_MARKERS)
+  if mask.any():
+    strings = np.where(mask, "nan", strings)
+  return strings.astype(np.float64), mask
+
+def concat_columnar(responses: List[SCBColumnarResponse]) -> SCBColumnarResponse:
+  """Concatenates partitions of the same table into one SCBColumnarResponse, in the given order."""
+  np = _import_numpy()
+  if not responses:
+    raise ValueError("At least one response is needed to concatenate.")
+  first = responses[0]
+  key_codes = {}
+  key_values = {}
+  for code in first.key_codes:
+    vocabulary = list(first.key_values[code])
+    index = {value: i for i, value in enumerate(vocabulary)}
+    code_arrays = []
+    for response in responses:
+      if response.key_values[code] == first.key_values[code]:
+        code_arrays.append(response.key_codes[code])
+        continue
+      # Different vocabularies, remap the codes into the merged vocabulary
+      for value in response.key_values[code]:
+        if value not in index:
+          index[value] = len(vocabulary)
+          vocabulary.append(value)
+      remap = np.array([index[value] for value in response.key_values[code]], dtype = np.int32)
+      code_arrays.append(remap[response.key_codes[code]])
+    key_codes[code] = np.concatenate(code_arrays)
+    key_values[code] = vocabulary
+
+  return SCBColumnarResponse(
+    columns = first.columns,
+    comments = first.comments,
+    key_codes = key_codes,
+    key_values = key_values,
+    values = {code: np.concatenate([response.values[code] for response in responses]) for code in first.values},
+    missing = {code: np.concatenate([response.missing[code] for response in responses]) for code in first.missing}
+  )
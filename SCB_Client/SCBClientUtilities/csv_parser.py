@@ -0,0 +1,55 @@
+import codecs
+import csv
+from typing import Collection, Iterable, Iterator
+
+from SCB_Client.model.scb_models import SCBCsvRow
+
+
+def iter_csv_rows(chunks: Iterable[bytes], encoding: str = "latin-1", key_headers: Collection[str] = ()) -> Iterator[SCBCsvRow]:
+  """
+  Parses an SCB CSV response incrementally, one SCBCsvRow (read like a dict) per row with the headers as keys.
+  Only the current line is held in memory as text, and every row shares the same header positions.
+  Quoted fields are handled by the csv module, so headers containing commas are kept intact.
+  Params:
+    chunks: Iterable[bytes]
+      The response body in chunks, e.g. response.iter_content(chunk_size).
+    encoding: str = "latin-1"
+      Encoding of the response, SCB sends CSV as latin-1.
+    key_headers: Collection[str] = ()
+      Headers of key columns, e.g. the variable texts. Their cells repeat across rows and are interned,
+      so every row holds the same string object for the same key.
+  """
+  reader = csv.reader(_iter_lines(chunks, encoding))
+  headers = None
+  for row in reader:
+    if not row:
+      continue
+    if headers == None:
+      headers = row
+      positions = {header: i for i, header in enumerate(headers)}
+      interned = [(i, {}) for i, header in enumerate(headers) if header in key_headers]
+      continue
+    if len(row) != len(headers):
+      # Rows are zipped with the headers like dict(zip(headers, row)), missing cells are left out
+      yield SCBCsvRow(tuple(row), {header: i for i, header in enumerate(headers[:len(row)])})
+      continue
+    for i, cells in interned:
+      row[i] = cells.setdefault(row[i], row[i])
+    yield SCBCsvRow(tuple(row), positions)
+
+def _iter_lines(chunks: Iterable[bytes], encoding: str) -> Iterator[str]:
+  """Decodes chunks and yields complete lines including their line ending, lines may span chunks."""
+  decoder = codecs.getincrementaldecoder(encoding)()
+  remainder = ""
+  for chunk in chunks:
+    text = remainder + decoder.decode(chunk)
+    start = 0
+    end = text.find("\n")
+    while end != -1:
+      yield text[start:end + 1]
+      start = end + 1
+      end = text.find("\n", start)
+    remainder = text[start:]
+  remainder += decoder.decode(b"", final = True)
+  if remainder:
+    yield remainder
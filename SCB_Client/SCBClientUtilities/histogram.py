@@ -0,0 +1,86 @@
+from typing import Dict, Optional
+
+
+class LatencyHistogram():
+  """
+  Streaming histogram of non-negative integers (nanoseconds) with bounded memory, bucketed like HdrHistogram.
+  Values below 128 are exact, larger values keep their 8 most significant bits so the relative error is below 0.8%.
+  Buckets are only allocated when used and there are at most 128 per power of two, whatever the number of recorded values.
+  """
+  _SUB_BUCKET_BITS: int = 7
+  _SUB_BUCKET_COUNT: int = 1 << _SUB_BUCKET_BITS
+
+  def __init__(self):
+    self.__counts: Dict[int, int] = {}
+    self.count = 0
+    self.total = 0
+    self.min: Optional[int] = None
+    self.max: Optional[int] = None
+
+  def __len__(self) -> int:
+    return self.count
+
+  def record(self, value: int) -> None:
+    if value < 0:
+      raise ValueError("Only non-negative values can be recorded.")
+    bucket = self.__get_bucket(value)
+    self.__counts[bucket] = self.__counts.get(bucket, 0) + 1
+    self.count += 1
+    self.total += value
+    self.min = value if self.min == None else min(self.min, value)
+    self.max = value if self.max == None else max(self.max, value)
+
+  def merge(self, other: "LatencyHistogram") -> None:
+    """Adds every value recorded in other to this histogram."""
+    for bucket, count in other.__counts.items():
+      self.__counts[bucket] = self.__counts.get(bucket, 0) + count
+    self.count += other.count
+    self.total += other.total
+    if other.count > 0:
+      self.min = other.min if self.min == None else min(self.min, other.min)
+      self.max = other.max if self.max == None else max(self.max, other.max)
+
+  def percentile(self, percentile: float) -> Optional[int]:
+    """Returns the value at the percentile (0-100), None if nothing is recorded. Exact for the min and max."""
+    if not 0 <= percentile <= 100:
+      raise ValueError("Percentile must be between 0 and 100.")
+    if self.count == 0:
+      return None
+    rank = max(1, round(percentile / 100 * self.count))
+    seen = 0
+    for bucket in sorted(self.__counts):
+      seen += self.__counts[bucket]
+      if seen >= rank:
+        return min(max(self.__get_bucket_value(bucket), self.min), self.max)
+    return self.max
+
+  def percentiles(self) -> Dict[str, Optional[int]]:
+    """Returns p50, p95 and p99."""
+    return {"p50": self.percentile(50), "p95": self.percentile(95), "p99": self.percentile(99)}
+
+  def count_at_or_below(self, value: int) -> int:
+    """Returns the number of recorded values at or below value, values in the bucket of value count if the bucket's middle does."""
+    return sum([count for bucket, count in self.__counts.items() if self.__get_bucket_value(bucket) <= value])
+
+  def buckets(self) -> Dict[int, int]:
+    """Returns the count of every used bucket keyed by the bucket's upper bound, in increasing order."""
+    return {self.__get_bucket_upper_bound(bucket): self.__counts[bucket] for bucket in sorted(self.__counts)}
+
+  def __get_bucket(self, value: int) -> int:
+    if value < self._SUB_BUCKET_COUNT:
+      return value
+    shift = value.bit_length() - self._SUB_BUCKET_BITS - 1
+    return (shift + 1) * self._SUB_BUCKET_COUNT + (value >> shift) - self._SUB_BUCKET_COUNT
+
+  def __get_bucket_lower_bound(self, bucket: int) -> int:
+    if bucket < self._SUB_BUCKET_COUNT:
+      return bucket
+    shift = bucket // self._SUB_BUCKET_COUNT - 1
+    return (bucket % self._SUB_BUCKET_COUNT + self._SUB_BUCKET_COUNT) << shift
+
+  def __get_bucket_upper_bound(self, bucket: int) -> int:
+    return self.__get_bucket_lower_bound(bucket + 1) - 1
+
+  def __get_bucket_value(self, bucket: int) -> int:
+    # The middle of the bucket halves the worst case error
+    return (self.__get_bucket_lower_bound(bucket) + self.__get_bucket_upper_bound(bucket)) // 2
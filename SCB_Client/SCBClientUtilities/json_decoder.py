@@ -0,0 +1,121 @@
+import gc
+import json
+from contextlib import contextmanager, nullcontext
+from operator import itemgetter
+from threading import Lock
+from typing import Any, Iterator, List, Optional, Sequence
+
+from SCB_Client.model.scb_models import SCBJsonDataPoints, SCBJsonResponseDataPoint
+
+_UTF8_BOM: bytes = b"\xef\xbb\xbf"
+_gc_lock: Lock = Lock()
+_gc_pauses: int = 0 # Decodes in progress, from any thread
+_gc_was_enabled: bool = False
+
+@contextmanager
+def paused_gc() -> Iterator[None]:
+  """
+  Pauses the cyclic garbage collector, decoded responses are millions of small objects without reference cycles
+  so the collections their allocations trigger only cost time. Pauses from concurrent threads are counted,
+  the collector is enabled again (if it was enabled) when the last one ends. Reference counting is unaffected.
+  The collector is paused for the whole process, so garbage from other threads isn't collected meanwhile either.
+  """
+  global _gc_pauses, _gc_was_enabled
+  with _gc_lock:
+    if _gc_pauses == 0:
+      _gc_was_enabled = gc.isenabled()
+      gc.disable()
+    _gc_pauses += 1
+  try:
+    yield
+  finally:
+    with _gc_lock:
+      _gc_pauses -= 1
+      if _gc_pauses == 0 and _gc_was_enabled:
+        gc.enable()
+
+class JsonDecoder():
+  """
+  Decodes JSON responses straight from their bytes and creates the rows of SCBJsonResponse, using the json module.
+  get_json_decoder() returns the fastest decoder that is installed, subclass and override loads() for another backend.
+  Params:
+    lazy_rows: bool = False
+      Rows are created when they're accessed (see SCBJsonDataPoints) instead of all at once,
+      which skips creating an object per row for data that is only partly read or converted.
+    intern_keys: bool = False
+      Keys of rows created at once are replaced by the equal strings of the variable values, so every row
+      shares them instead of holding its own copies. Saves memory for results that are kept, but takes about
+      a fifth of the decoding time, so it's off unless memory matters more.
+    pause_gc: bool = False
+      Decoding and creating the rows are done with the garbage collector paused (see paused_gc()), which makes large
+      responses faster but also pauses collection for every other thread of the process while they're decoded.
+  """
+  name: str = "json"
+
+  def __init__(self, lazy_rows: bool = False, intern_keys: bool = False, pause_gc: bool = False):
+    self.lazy_rows = lazy_rows
+    self.intern_keys = intern_keys
+    self.pause_gc = pause_gc
+
+  def loads(self, content: bytes) -> Any:
+    return json.loads(content)
+
+  def decode(self, response) -> Any:
+    """Returns the decoded body of the response, responses without a body in bytes (e.g. CsvJsonResponse) are decoded by themselves."""
+    content = getattr(response, "content", None)
+    if not isinstance(content, (bytes, bytearray)):
+      return response.json()
+    with self.__paused_gc():
+      return self.loads(content)
+
+  def create_data_points(self, data: List[dict], vocabularies: Optional[List[List[str]]] = None) -> Sequence[SCBJsonResponseDataPoint]:
+    """
+    Returns the rows of the decoded data of a JSON response.
+    vocabularies are the values of the variable of every key column, in the order of the key, see intern_keys.
+    """
+    if self.lazy_rows:
+      return SCBJsonDataPoints(data)
+    with self.__paused_gc():
+      keys = list(map(itemgetter("key"), data))
+      if self.intern_keys and vocabularies and keys:
+        keys = _intern_keys(keys, vocabularies)
+      return list(map(SCBJsonResponseDataPoint, keys, map(itemgetter("values"), data)))
+
+  def __paused_gc(self):
+    return paused_gc() if self.pause_gc else nullcontext()
+
+def _intern_keys(keys: List[List[str]], vocabularies: List[List[str]]) -> List[List[str]]:
+  """Returns the keys with every value replaced by the equal string of its vocabulary, a column at a time."""
+  columns = []
+  for i, vocabulary in enumerate(vocabularies):
+    lookup = {value: value for value in vocabulary}
+    column = list(map(itemgetter(i), keys))
+    columns.append(list(map(lookup.get, column, column))) # Values that aren't in the vocabulary are kept
+  return list(map(list, zip(*columns)))
+
+class OrjsonDecoder(JsonDecoder):
+  """
+  Decodes with orjson, which parses the bytes faster than the json module. Creating the rows and the garbage collections
+  their allocations trigger cost the same, so whole responses decode only slightly faster unless pause_gc is set. Requires orjson.
+  """
+  name: str = "orjson"
+
+  def __init__(self, lazy_rows: bool = False, intern_keys: bool = False, pause_gc: bool = False):
+    super().__init__(lazy_rows, intern_keys, pause_gc)
+    try:
+      import orjson
+    except ImportError as e:
+      raise ImportError("OrjsonDecoder requires orjson, install it with pip install orjson.") from e
+    self.__loads = orjson.loads
+
+  def loads(self, content: bytes) -> Any:
+    if content[:3] == _UTF8_BOM:
+      content = content[3:] # orjson rejects the BOM some SCB responses start with, the json module skips it
+    return self.__loads(content)
+
+def get_json_decoder(lazy_rows: bool = False, intern_keys: bool = False, pause_gc: bool = False) -> JsonDecoder:
+  """Returns OrjsonDecoder if orjson is installed, otherwise JsonDecoder."""
+  try:
+    return OrjsonDecoder(lazy_rows, intern_keys, pause_gc)
+  except ImportError:
+    return JsonDecoder(lazy_rows, intern_keys, pause_gc)
@@ -0,0 +1,146 @@
+import math
+from itertools import product
+from typing import Dict, List, Tuple
+
+from SCB_Client.model.scb_models import SCBColumnarResponse, SCBVariable
+from SCB_Client.SCBClientUtilities.columnar import _import_numpy, parse_values
+
+CONTENTS_CODE: str = "ContentsCode" # SCB lists the contents of every table as a variable with this code
+_MISSING_VALUE_MARKER: str = ".." # Written for null values without a status, like SCB does in JSON responses
+
+def columnar_from_jsonstat2(json_data: dict, variables: List[SCBVariable]) -> SCBColumnarResponse:
+  """
+  Creates an SCBColumnarResponse from a decoded JSON-stat2 dataset without touching the cells one by one.
+  The dense value array is reshaped into the cube (one axis per dimension), the contents axis is moved last
+  and every other dimension becomes a key column of int32 indexes computed from the cube shape.
+  Rows are in the same order as in a JSON response to the same query.
+  Params:
+    json_data: dict
+      The decoded JSON-stat2 dataset.
+    variables: List[SCBVariable]
+      Variables of the table, their values are used as vocabulary for the key columns, like columnar_from_json().
+  """
+  np = _import_numpy()
+  dimension_ids, sizes, contents_axis = _get_cube_shape(json_data)
+  vocabularies = {var.code: var.values for var in variables}
+  key_axes = [axis for axis in range(len(dimension_ids)) if axis != contents_axis]
+  key_sizes = [sizes[axis] for axis in key_axes]
+  row_count = math.prod(key_sizes)
+
+  key_codes: Dict[str, object] = {}
+  key_values: Dict[str, List[str]] = {}
+  for i, axis in enumerate(key_axes):
+    code = dimension_ids[axis]
+    remap, key_values[code] = _encode_categories(_get_category_codes(json_data, code), vocabularies.get(code, []))
+    # The key of the row r along axis i repeats every prod(sizes after i) rows and cycles every prod(sizes from i) rows
+    positions = np.repeat(np.tile(np.arange(key_sizes[i], dtype = np.int32), math.prod(key_sizes[:i])), math.prod(key_sizes[i + 1:]))
+    key_codes[code] = remap[positions]
+
+  cube, cube_missing = _parse_cube_values(json_data["value"], sizes)
+  if contents_axis != len(sizes) - 1:
+    cube = np.moveaxis(cube, contents_axis, -1)
+    cube_missing = np.moveaxis(cube_missing, contents_axis, -1)
+  cube = cube.reshape(row_count, sizes[contents_axis])
+  cube_missing = cube_missing.reshape(row_count, sizes[contents_axis])
+  content_codes = _get_category_codes(json_data, dimension_ids[contents_axis])
+  values = {code: np.ascontiguousarray(cube[:, i]) for i, code in enumerate(content_codes)}
+  missing = {code: np.ascontiguousarray(cube_missing[:, i]) for i, code in enumerate(content_codes)}
+
+  return SCBColumnarResponse(
+    columns = _create_columns(json_data, dimension_ids, contents_axis),
+    comments = [],
+    key_codes = key_codes,
+    key_values = key_values,
+    values = values,
+    missing = missing
+  )
+
+def json_from_jsonstat2(json_data: dict) -> dict:
+  """
+  Converts a decoded JSON-stat2 dataset into the decoded JSON response SCB would have sent for the same query.
+  Numbers are written like SCB writes them, integral floats without decimals, null values with their status (e.g. "..") or ".." if they have none.
+  """
+  np = _import_numpy()
+  dimension_ids, sizes, contents_axis = _get_cube_shape(json_data)
+  key_axes = [axis for axis in range(len(dimension_ids)) if axis != contents_axis]
+  row_count = math.prod([sizes[axis] for axis in key_axes])
+  status = json_data.get("status") or {}
+  if isinstance(status, list):
+    status = {str(i): marker for i, marker in enumerate(status) if marker != None}
+  elif isinstance(status, str):
+    status = {str(i): status for i in range(len(json_data["value"]))}
+  strings = [
+    (_format_value(value) if value != None else status.get(str(i), _MISSING_VALUE_MARKER))
+    for i, value in enumerate(json_data["value"])
+  ]
+  # Flat indexes of the cells in the order of JSON responses, keys in cube order and the contents of a key together
+  order = np.moveaxis(np.arange(len(strings)).reshape(sizes), contents_axis, -1).reshape(row_count, sizes[contents_axis]).tolist()
+  keys = product(*[_get_category_codes(json_data, dimension_ids[axis]) for axis in key_axes])
+  data = [{"key": list(key), "values": [strings[cell] for cell in cells]} for key, cells in zip(keys, order)]
+  return {"columns": _create_columns(json_data, dimension_ids, contents_axis), "comments": [], "data": data}
+
+def _format_value(value) -> str:
+  """Writes a number like a JSON response, decoders give floats such as 1.0 for integral values which SCB writes as "1"."""
+  if isinstance(value, float) and value.is_integer():
+    return str(int(value))
+  return str(value)
+
+def _get_cube_shape(json_data: dict) -> Tuple[List[str], List[int], int]:
+  """Returns the dimension ids, the size of every dimension and the axis of the contents."""
+  dimension_ids = list(json_data["id"])
+  sizes = [int(size) for size in json_data["size"]]
+  metric_ids = json_data.get("role", {}).get("metric") or [CONTENTS_CODE]
+  contents_axes = [axis for axis, code in enumerate(dimension_ids) if code in metric_ids]
+  if not contents_axes:
+    raise ValueError("The JSON-stat2 dataset has no contents dimension (role metric or ContentsCode).")
+  if math.prod(sizes) != len(json_data["value"]):
+    raise ValueError(f"The JSON-stat2 dataset has {len(json_data['value'])} values, the dimensions have {math.prod(sizes)} cells.")
+  return dimension_ids, sizes, contents_axes[0]
+
+def _get_category_codes(json_data: dict, dimension_id: str) -> List[str]:
+  """Returns the category codes of the dimension in cube order, the index is a list or a dict of positions in JSON-stat2."""
+  category = json_data["dimension"][dimension_id]["category"]
+  index = category.get("index")
+  if index == None:
+    return list(category["label"]) # A single category can be given by its label only
+  if isinstance(index, list):
+    return index
+  codes = [None] * len(index)
+  for code, position in index.items():
+    codes[position] = code
+  return codes
+
+def _encode_categories(codes: List[str], vocabulary: List[str]) -> tuple:
+  """Returns an int32 array mapping category positions to indexes of the vocabulary, extended with unknown codes."""
+  np = _import_numpy()
+  vocabulary = list(vocabulary)
+  index = {value: i for i, value in enumerate(vocabulary)}
+  for code in codes:
+    if code not in index:
+      index[code] = len(vocabulary)
+      vocabulary.append(code)
+  return np.array([index[code] for code in codes], dtype = np.int32), vocabulary
+
+def _parse_cube_values(values: list, sizes: List[int]) -> tuple:
+  """Parses the dense values into a float64 cube, null is NaN and True in the missing cube."""
+  np = _import_numpy()
+  try:
+    cube = np.array(values, dtype = np.float64) # null is converted to NaN
+    missing = np.isnan(cube)
+  except (TypeError, ValueError):
+    # Values sent as strings, e.g. "..", are parsed like in JSON responses
+    cube, missing = parse_values([value if value != None else _MISSING_VALUE_MARKER for value in values])
+  return cube.reshape(sizes), missing.reshape(sizes)
+
+def _create_columns(json_data: dict, dimension_ids: List[str], contents_axis: int) -> List[dict]:
+  """Returns the columns of a JSON response, key columns in cube order followed by a column per content."""
+  time_ids = json_data.get("role", {}).get("time") or []
+  columns = []
+  for axis, code in enumerate(dimension_ids):
+    if axis != contents_axis:
+      columns.append({"code": code, "text": json_data["dimension"][code].get("label", code), "type": "t" if code in time_ids else "d"})
+  contents = json_data["dimension"][dimension_ids[contents_axis]]["category"]
+  labels = contents.get("label", {})
+  for code in _get_category_codes(json_data, dimension_ids[contents_axis]):
+    columns.append({"code": code, "text": labels.get(code, code), "type": "c"})
+  return columns
@@ -0,0 +1,24 @@
+import os
+from typing import Optional
+
+from SCB_Client.SCBClientUtilities.sqlite_cache import SQLiteCache
+
+
+class MetadataCache(SQLiteCache):
+  """
+  Persistent cache for metadata responses from SCB (table variables and the navigation tree), keyed by URL.
+  Can be shared by threads and processes on the same machine, see SQLiteCache.
+  Params:
+    path: Optional[str] = None
+      Path of the SQLite file, defaults to ~/.cache/SCB_Client/metadata.sqlite.
+    ttl_seconds: float = 86400
+      Entries older than this are considered stale and are fetched again.
+    max_bytes: int = 50000000
+      When the cached content exceeds this the least recently used entries are evicted.
+  """
+  _DEFAULT_PATH: str = os.path.join(os.path.expanduser("~"), ".cache", "SCB_Client", "metadata.sqlite")
+
+  def __init__(self, path: Optional[str] = None, ttl_seconds: float = 86400, max_bytes: int = 50000000):
+    if ttl_seconds == None:
+      raise ValueError("ttl_seconds must be positive.")
+    super().__init__(path if path != None else self._DEFAULT_PATH, ttl_seconds, max_bytes)
@@ -0,0 +1,193 @@
+import math
+from typing import Dict, Iterable, List, Optional, Union
+
+from SCB_Client.model.scb_models import ResponseType, SCBCsvRow, SCBPayloadEstimate, SCBQuery, SCBVariable
+from SCB_Client.SCBClientUtilities.columnar import _import_numpy
+from SCB_Client.SCBClientUtilities.jsonstat import CONTENTS_CODE, json_from_jsonstat2
+
+_ESTIMATED_VALUE_WIDTH: int = 6 # Characters of a typical value, e.g. 112989
+# Seconds to parse a cell into the default result, measured with python -m SCB_Client.benchmarks.suite (parse_json, parse_csv, parse_jsonstat2)
+_PARSE_SECONDS_PER_CELL: Dict[ResponseType, float] = {
+  ResponseType.JSON: 2.8e-6,
+  ResponseType.CSV: 0.4e-6,
+  ResponseType.JSONSTAT2: 0.15e-6
+}
+# Extra seconds per cell to convert into the shape of a JSON response, used by ResponseType.AUTO
+_CONVERSION_SECONDS_PER_CELL: Dict[ResponseType, float] = {
+  ResponseType.CSV: 1.5e-6,
+  ResponseType.JSONSTAT2: 2.0e-6
+}
+
+
+def estimate_payload(query: SCBQuery, variables: List[SCBVariable]) -> Dict[ResponseType, SCBPayloadEstimate]:
+  """
+  Estimates the size of the response to the query and the time to parse it, for every format SCB can respond with.
+  Key widths are the average lengths of the selected values (and value texts for CSV), values are assumed to be
+  _ESTIMATED_VALUE_WIDTH characters, the rest is the syntax of the format.
+  Params:
+    query: SCBQuery
+    variables: List[SCBVariable]
+      The variables of the table, see SCBClient.get_variables().
+  Returns:
+    estimates: Dict[ResponseType, SCBPayloadEstimate]
+  """
+  variables_by_code = {var.code: var for var in variables}
+  content_count = 1
+  time_count = 1
+  key_widths = [] # Average characters of every key, in the order of the query
+  csv_key_widths = [] # Average characters of the key cells of CSV rows, the time variable is pivoted into columns
+  jsonstat2_category_bytes = [] # Characters of the categories of every dimension, JSON-stat2 has no keys per cell
+  for queryvar in query.query:
+    values = queryvar.selection.values
+    value_width = _get_average_width(values)
+    jsonstat2_category_bytes.append(len(values) * (2 * value_width + _get_average_width(_get_value_texts(variables_by_code.get(queryvar.code), values)) + 12))
+    if queryvar.code == CONTENTS_CODE:
+      content_count = len(values)
+      continue
+    var = variables_by_code.get(queryvar.code)
+    key_widths.append(value_width)
+    if var != None and var.time:
+      time_count = len(values)
+      continue
+    texts = _get_value_texts(var, values)
+    csv_key_widths.append(value_width + 1 + _get_average_width(texts))
+  cell_count = math.prod([len(queryvar.selection.values) for queryvar in query.query])
+  row_count = cell_count // content_count
+
+  # {"key":["00","18","2005M01"],"values":["112989"]},
+  json_row_bytes = 23 + sum([width + 3 for width in key_widths]) + content_count * (_ESTIMATED_VALUE_WIDTH + 3)
+  json_bytes = round(60 * (len(key_widths) + content_count) + row_count * json_row_bytes)
+  # "00 Riket","18 år",112989,113013\r\n with a column per content and period
+  csv_rows = row_count // time_count
+  csv_row_bytes = 2 + sum([width + 3 for width in csv_key_widths]) + content_count * time_count * (_ESTIMATED_VALUE_WIDTH + 1)
+  csv_bytes = round(30 * (len(csv_key_widths) + content_count * time_count) + csv_rows * csv_row_bytes)
+  # "00":0, in the index and "00":"Riket", in the labels of every dimension, then 112989, per cell
+  jsonstat2_bytes = round(300 + sum([60 + category_bytes for category_bytes in jsonstat2_category_bytes]) + cell_count * (_ESTIMATED_VALUE_WIDTH + 1))
+
+  byte_counts = {ResponseType.JSON: json_bytes, ResponseType.CSV: csv_bytes, ResponseType.JSONSTAT2: jsonstat2_bytes}
+  return {
+    response_type: SCBPayloadEstimate(response_type, cell_count, byte_count, cell_count * _PARSE_SECONDS_PER_CELL[response_type])
+    for response_type, byte_count in byte_counts.items()
+  }
+
+def choose_response_type(query: SCBQuery, variables: List[SCBVariable]) -> ResponseType:
+  """
+  Returns the format with the fewest estimated bytes that can be converted to JSON results, used for ResponseType.AUTO.
+  Parse time (including conversion) breaks ties. CSV is left out when the query can't be mapped from CSV,
+  JSON-stat2 when numpy isn't installed since it's converted with numpy.
+  """
+  estimates = estimate_payload(query, variables)
+  response_types = [ResponseType.JSON]
+  if _can_convert_jsonstat2():
+    response_types.append(ResponseType.JSONSTAT2)
+  if _can_convert_csv(query, variables):
+    response_types.append(ResponseType.CSV)
+  costs = {
+    response_type: (
+      estimates[response_type].bytes,
+      estimates[response_type].parse_seconds + estimates[response_type].cell_count * _CONVERSION_SECONDS_PER_CELL.get(response_type, 0)
+    )
+    for response_type in response_types
+  }
+  return min(costs, key = lambda response_type: costs[response_type])
+
+def _can_convert_jsonstat2() -> bool:
+  try:
+    _import_numpy()
+  except ImportError:
+    return False
+  return True
+
+def json_from_csv_rows(rows: Iterable[Union[SCBCsvRow, Dict[str, str]]], query: SCBQuery, variables: List[SCBVariable]) -> dict:
+  """
+  Converts the rows of a CSV response to the query into the decoded JSON response SCB would have sent.
+  Key cells are mapped back to value codes (SCB writes them as "code text" or as the value text),
+  value columns are mapped by their header, the content text followed by the period if the time variable is selected.
+  """
+  if not _can_convert_csv(query, variables):
+    raise NotImplementedError("The query can't be converted from CSV, it needs to select the contents.")
+  variables_by_code = {var.code: var for var in variables}
+  key_queryvars = [queryvar for queryvar in query.query if queryvar.code != CONTENTS_CODE]
+  time_positions = [i for i, queryvar in enumerate(key_queryvars) if variables_by_code[queryvar.code].time]
+  time_position = time_positions[0] if time_positions else None
+  row_queryvars = [queryvar for i, queryvar in enumerate(key_queryvars) if i != time_position]
+  time_values = key_queryvars[time_position].selection.values if time_position != None else [None]
+  contents_var = variables_by_code[CONTENTS_CODE]
+  content_values = [queryvar for queryvar in query.query if queryvar.code == CONTENTS_CODE][0].selection.values
+  content_texts = _get_value_texts(contents_var, content_values)
+
+  key_lookups = [_create_key_lookup(variables_by_code[queryvar.code], queryvar.selection.values) for queryvar in row_queryvars]
+  value_headers = [
+    [text if time_value == None else f"{text} {time_value}" for text in content_texts]
+    for time_value in time_values
+  ]
+  columns = [
+    {"code": queryvar.code, "text": variables_by_code[queryvar.code].text, "type": "t" if i == time_position else "d"}
+    for i, queryvar in enumerate(key_queryvars)
+  ]
+  columns += [{"code": value, "text": text, "type": "c"} for value, text in zip(content_values, content_texts)]
+
+  data = []
+  for row in rows:
+    cells = row.cells() if isinstance(row, SCBCsvRow) else list(row.values())
+    try:
+      row_key = [lookup[cell] for lookup, cell in zip(key_lookups, cells)]
+    except KeyError as e:
+      raise ValueError(f"Couldn't map the CSV key {e} to a value of the query.") from e
+    for time_value, headers in zip(time_values, value_headers):
+      key = list(row_key)
+      if time_position != None:
+        key.insert(time_position, time_value)
+      try:
+        data.append({"key": key, "values": [row[header] for header in headers]})
+      except KeyError as e:
+        raise ValueError(f"Couldn't find the CSV column {e}.") from e
+
+  if time_position != None and time_position != len(key_queryvars) - 1:
+    # CSV rows hold every period, JSON is ordered by the query variables
+    orders = [{value: i for i, value in enumerate(queryvar.selection.values)} for queryvar in key_queryvars]
+    data.sort(key = lambda datapoint: [order[value] for order, value in zip(orders, datapoint["key"])])
+  return {"columns": columns, "comments": [], "data": data}
+
+class CsvJsonResponse():
+  """A CSV response that decodes into the JSON response SCB would have sent when json() is called, see json_from_csv_rows()."""
+  def __init__(self, rows: Iterable[Dict[str, str]], query: SCBQuery, variables: List[SCBVariable]):
+    self.status_code = 200
+    self.__rows = rows
+    self.__query = query
+    self.__variables = variables
+
+  def json(self) -> dict:
+    return json_from_csv_rows(self.__rows, self.__query, self.__variables)
+
+class JsonStatJsonResponse():
+  """A JSON-stat2 response that decodes into the JSON response SCB would have sent when json() is called, see json_from_jsonstat2()."""
+  def __init__(self, response):
+    self.status_code = 200
+    self.__response = response
+
+  def json(self) -> dict:
+    return json_from_jsonstat2(self.__response.json())
+
+def _can_convert_csv(query: SCBQuery, variables: List[SCBVariable]) -> bool:
+  variable_codes = {var.code for var in variables}
+  return CONTENTS_CODE in query.query_variable_codes_to_list() and all([queryvar.code in variable_codes for queryvar in query.query])
+
+def _create_key_lookup(var: SCBVariable, values: List[str]) -> Dict[str, str]:
+  texts = _get_value_texts(var, values)
+  lookup = {}
+  for value, text in zip(values, texts):
+    lookup[text] = value
+    lookup[f"{value} {text}"] = value
+  for value in values:
+    lookup[value] = value # Codes win over texts that happen to be codes of other values
+  return lookup
+
+def _get_value_texts(var: Optional[SCBVariable], values: List[str]) -> List[str]:
+  if var == None:
+    return values
+  texts = dict(zip(var.values, var.valueTexts))
+  return [texts.get(value, value) for value in values]
+
+def _get_average_width(values: List[str]) -> float:
+  return sum([len(value) for value in values]) / len(values) if values else 0
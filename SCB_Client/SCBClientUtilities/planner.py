@@ -0,0 +1,110 @@
+import math
+from typing import List, Optional, Tuple
+
+_MAX_SEARCH_STEPS: int = 20000 # The search is exponential in the number of dimensions, past this they're split greedily
+
+def plan_tiling(sizes: List[int], limit: int, preferred_index: Optional[int] = None) -> List[int]:
+  """
+  Finds how many chunks every dimension should be split into so that every tile of the cartesian product
+  holds at most limit cells, using as few tiles as possible. Always succeeds for limit >= 1 since a tile can be a single cell.
+  Ties are broken by splitting as few dimensions as possible, preferring to split only the preferred dimension,
+  and then by the smallest max tile size, which gives the most balanced tiles.
+  The search gives up after _MAX_SEARCH_STEPS, which only queries needing many dimensions split reach,
+  then dimensions are split one at a time by _plan_greedy() unless the search already found fewer tiles.
+  Params:
+    sizes: List[int]
+      Number of values in every dimension.
+    limit: int
+      Max number of cells in a tile.
+    preferred_index: Optional[int]
+      Index of the dimension that should be split if it's as good as any other.
+  Returns:
+    chunk_counts: List[int]
+      Number of chunks per dimension, in the order of sizes.
+  """
+  if limit < 1:
+    raise ValueError("limit must be a positive integer.")
+  if math.prod(sizes) <= limit:
+    return [1] * len(sizes)
+
+  candidates = [_chunk_candidates(size) for size in sizes]
+  best: Tuple = None
+  best_chunk_counts: List[int] = None
+  chunk_counts = [1] * len(sizes)
+  steps = 0
+
+  def search(dimension: int, tiles: int, tile_size: int) -> None:
+    nonlocal best, best_chunk_counts, steps
+    steps += 1
+    if steps > _MAX_SEARCH_STEPS:
+      return
+    if dimension == len(sizes):
+      split = [i for i, count in enumerate(chunk_counts) if count > 1]
+      only_preferred = split == [preferred_index] if preferred_index != None else True
+      score = (tiles, len(split), not only_preferred, tile_size)
+      if best == None or score < best:
+        best = score
+        best_chunk_counts = chunk_counts.copy()
+      return
+    for count, block in candidates[dimension]:
+      new_tile_size = tile_size * block
+      if new_tile_size > limit:
+        continue
+      # Whatever is chosen for the remaining dimensions, a tile can't hold more than limit cells
+      cells_per_tile_left = limit // new_tile_size
+      remaining_blocks = math.prod(sizes[dimension + 1:])
+      lower_bound = tiles * count * math.ceil(remaining_blocks / cells_per_tile_left)
+      if best != None and lower_bound > best[0]:
+        continue
+      chunk_counts[dimension] = count
+      search(dimension + 1, tiles * count, new_tile_size)
+    chunk_counts[dimension] = 1
+
+  search(0, 1, 1)
+  if steps > _MAX_SEARCH_STEPS:
+    greedy_chunk_counts = _plan_greedy(sizes, limit, preferred_index)
+    if best == None or math.prod(greedy_chunk_counts) <= best[0]:
+      return greedy_chunk_counts
+  return best_chunk_counts
+
+def _plan_greedy(sizes: List[int], limit: int, preferred_index: Optional[int] = None) -> List[int]:
+  """
+  Splits the preferred dimension, then the largest ones, into as few even chunks as keep tiles within limit.
+  Usually only a single dimension is split, the next one is only split if a single value of the previous is above limit.
+  """
+  chunk_counts = [1] * len(sizes)
+  order = sorted(range(len(sizes)), key = lambda i: (i != preferred_index, -sizes[i]))
+  tile_size = math.prod(sizes)
+  for i in order:
+    if tile_size <= limit:
+      break
+    cells_per_value = tile_size // sizes[i]
+    if cells_per_value <= limit:
+      chunk_counts[i] = math.ceil(sizes[i] / (limit // cells_per_value))
+    else:
+      chunk_counts[i] = sizes[i]
+    tile_size = cells_per_value * math.ceil(sizes[i] / chunk_counts[i])
+  return chunk_counts
+
+def _chunk_candidates(size: int) -> List[Tuple[int, int]]:
+  """Returns (chunk count, max chunk size) for every distinct max chunk size, with the fewest chunks giving that size."""
+  candidates = []
+  count = 1
+  while count <= size:
+    block = math.ceil(size / count)
+    candidates.append((count, block))
+    if block == 1:
+      break
+    count = math.ceil(size / (block - 1)) # The fewest chunks giving a smaller max chunk size
+  return candidates
+
+def split_evenly(values: list, chunk_count: int) -> List[list]:
+  """Splits values into chunk_count contiguous chunks whose sizes differ by at most one."""
+  chunk_size, larger_chunks = divmod(len(values), chunk_count)
+  chunks = []
+  start = 0
+  for i in range(chunk_count):
+    end = start + chunk_size + (1 if i < larger_chunks else 0)
+    chunks.append(values[start:end])
+    start = end
+  return chunks
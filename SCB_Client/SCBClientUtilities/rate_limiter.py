@@ -0,0 +1,122 @@
+import asyncio
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from random import uniform
+from threading import Lock
+from time import monotonic, sleep
+from typing import Optional
+
+
+class RateLimiter():
+  """
+  Token bucket used to stay within SCB's request quota (max_requests per window_seconds).
+  The bucket holds at most burst tokens and is refilled so that no window can contain more than max_requests requests,
+  i.e. burst + refill rate * window_seconds == max_requests.
+  One limiter is meant to be shared by every client in the process, see RateLimiter.shared().
+  """
+  _shared: "RateLimiter" = None
+  _shared_lock: Lock = Lock()
+
+  def __init__(self, max_requests: int = 30, window_seconds: float = 10, burst: Optional[int] = None, max_backoff_seconds: float = 30):
+    if not isinstance(max_requests, int) or max_requests < 1:
+      raise ValueError("max_requests must be a positive integer.")
+    if window_seconds <= 0:
+      raise ValueError("window_seconds must be positive.")
+    if burst == None:
+      burst = max(1, max_requests // 3)
+    if not isinstance(burst, int) or not 0 < burst < max_requests:
+      raise ValueError(f"burst must be an integer between 1 and {max_requests - 1}.")
+    self.max_requests = max_requests
+    self.window_seconds = window_seconds
+    self.burst = burst
+    self.max_backoff_seconds = max_backoff_seconds
+    self._refill_per_second: float = (max_requests - burst) / window_seconds
+    self._tokens: float = burst
+    self._last_refill: float = monotonic()
+    self._paused_until: float = 0
+    self._lock = Lock()
+
+  @classmethod
+  def shared(cls) -> "RateLimiter":
+    """Returns the process wide limiter configured with SCB's quota, created on first use."""
+    with cls._shared_lock:
+      if cls._shared == None:
+        cls._shared = cls()
+      return cls._shared
+
+  def acquire(self) -> float:
+    """Blocks until a request may be made. Returns the number of seconds spent waiting."""
+    waited = 0.0
+    while True:
+      wait_time = self.try_acquire()
+      if wait_time == 0:
+        return waited
+      sleep(wait_time)
+      waited += wait_time
+
+  async def acquire_async(self) -> float:
+    """Same as acquire() but waits without blocking the event loop."""
+    waited = 0.0
+    while True:
+      wait_time = self.try_acquire()
+      if wait_time == 0:
+        return waited
+      await asyncio.sleep(wait_time)
+      waited += wait_time
+
+  def try_acquire(self) -> float:
+    """Takes a token if one is available and returns 0, otherwise returns the number of seconds until one might be."""
+    with self._lock:
+      now = monotonic()
+      self.__refill(now)
+      if now >= self._paused_until and self._tokens >= 1:
+        self._tokens -= 1
+        return 0
+      return max(self._paused_until - now, (1 - self._tokens) / self._refill_per_second)
+
+  def back_off(self, attempt: int, retry_after: Optional[str] = None) -> float:
+    """
+    Called when SCB responds with 429. Every user of the limiter is paused, either for the time SCB asked for in
+    the Retry-After header or with an exponential backoff, both with added jitter so the clients don't retry in lockstep.
+    Params:
+      attempt: int
+        Number of consecutive 429 responses for the request, starting at 1.
+      retry_after: Optional[str]
+        Value of the Retry-After header, seconds or an HTTP date.
+    Returns:
+      delay: float
+        Seconds until requests are allowed again.
+    """
+    retry_after_seconds = self.parse_retry_after(retry_after)
+    if retry_after_seconds != None:
+      delay = min(retry_after_seconds, self.max_backoff_seconds) + uniform(0, 1 / self._refill_per_second)
+    else:
+      delay = uniform(0, min(self.max_backoff_seconds, (1 / self._refill_per_second) * 2 ** attempt))
+    with self._lock:
+      now = monotonic()
+      self._paused_until = max(self._paused_until, now + delay)
+      self._tokens = 0 # SCB considers the quota used up, don't burst once the pause is over
+      self._last_refill = max(self._last_refill, self._paused_until)
+    return delay
+
+  @staticmethod
+  def parse_retry_after(retry_after: Optional[str]) -> Optional[float]:
+    """Returns the Retry-After header value in seconds, None if missing or unparsable."""
+    if retry_after == None:
+      return None
+    try:
+      return max(0.0, float(retry_after))
+    except ValueError:
+      pass
+    try:
+      retry_at = parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+      return None
+    if retry_at.tzinfo == None:
+      retry_at = retry_at.replace(tzinfo = timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+  def __refill(self, now: float) -> None:
+    if now > self._last_refill:
+      self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self._refill_per_second)
+      self._last_refill = now
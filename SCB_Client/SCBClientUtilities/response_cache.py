@@ -0,0 +1,62 @@
+import hashlib
+import json
+import os
+import zlib
+from typing import Optional
+
+from SCB_Client.model.scb_models import SCBQuery
+from SCB_Client.SCBClientUtilities.sqlite_cache import SQLiteCache
+
+
+class ResponseCache(SQLiteCache):
+  """
+  Persistent cache for raw data responses from SCB, keyed by table URL and the normalized query.
+  Bodies are stored zlib compressed and max_bytes applies to the compressed size.
+  Can be shared by threads and processes on the same machine, see SQLiteCache.
+  Params:
+    path: Optional[str] = None
+      Path of the SQLite file, defaults to ~/.cache/SCB_Client/responses.sqlite.
+    ttl_seconds: Optional[float] = None
+      Entries older than this are considered stale and are fetched again, None keeps entries until they are evicted.
+    max_bytes: int = 1000000000
+      When the cached content exceeds this the least recently used entries are evicted.
+  """
+  _DEFAULT_PATH: str = os.path.join(os.path.expanduser("~"), ".cache", "SCB_Client", "responses.sqlite")
+
+  def __init__(self, path: Optional[str] = None, ttl_seconds: Optional[float] = None, max_bytes: int = 1000000000):
+    super().__init__(path if path != None else self._DEFAULT_PATH, ttl_seconds, max_bytes)
+
+  @staticmethod
+  def create_key(url: str, query: SCBQuery) -> str:
+    """
+    Hash of the table URL and SCBQuery.to_dict() with variables sorted by code and values sorted,
+    so queries selecting the same cells share the key regardless of order.
+    """
+    query_dict = query.to_dict()
+    normalized = {
+      "url": url,
+      "response": query_dict["response"],
+      "query": sorted(
+        [
+          {
+            "code": var["code"],
+            "selection": {
+              "filter": var["selection"]["filter"],
+              "values": sorted(var["selection"]["values"])
+            }
+          }
+          for var in query_dict["query"]
+        ],
+        key = lambda var: var["code"]
+      )
+    }
+    return hashlib.sha256(json.dumps(normalized, sort_keys = True, separators = (",", ":")).encode()).hexdigest()
+
+  def get(self, key: str) -> Optional[bytes]:
+    """Returns the decompressed response body for key, None if it's missing or stale."""
+    content = super().get(key)
+    return zlib.decompress(content) if content != None else None
+
+  def set(self, key: str, content: bytes) -> None:
+    """Caches the response body compressed."""
+    super().set(key, zlib.compress(content))
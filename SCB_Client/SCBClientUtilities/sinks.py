@@ -0,0 +1,192 @@
+import json
+import operator
+import os
+import sqlite3
+from contextlib import closing
+from functools import reduce
+from typing import Dict, List, Optional
+
+from SCB_Client.model.scb_models import SCBColumnarResponse, SCBVariable
+from SCB_Client.SCBClientUtilities.arrow import _import_pyarrow, arrow_batch_from_columnar
+from SCB_Client.SCBClientUtilities.columnar import _import_numpy, encode_keys
+from SCB_Client.SCBClientUtilities.sqlite_cache import connect, create_database
+
+
+class SQLiteSink():
+  """
+  Writes partitions from SCBClient.write_data() into a SQLite table, with a column per variable (SCB value codes) and per content (REAL).
+  The table is created from the columns of the first partition, the key columns are the primary key so writing
+  the same data again replaces it instead of duplicating it. Missing values are stored as NULL.
+  Params:
+    path: str
+      Path of the SQLite file, directories are created if needed.
+    table: str
+      Name of the table, e.g. the SCB table id.
+  """
+
+  def __init__(self, path: str, table: str):
+    self.path = path
+    self.table = table
+    create_database(self.path)
+    with closing(connect(self.path)) as connection:
+      connection.execute("CREATE TABLE IF NOT EXISTS scb_tables (name TEXT PRIMARY KEY, columns TEXT NOT NULL, vocabularies TEXT NOT NULL)")
+
+  def write(self, partition_id: str, response: SCBColumnarResponse, variables: List[SCBVariable]) -> int:
+    """Writes the partition in a single transaction and returns the number of rows written, partition_id isn't needed for SQLite."""
+    np = _import_numpy()
+    key_columns = [[response.key_values[code][i] for i in codes.tolist()] for code, codes in response.key_codes.items()]
+    value_columns = [np.where(response.missing[code], None, values).tolist() for code, values in response.values.items()]
+    rows = list(zip(*key_columns, *value_columns))
+    names = [self.__quote(code) for code in [*response.key_codes, *response.values]]
+    with closing(connect(self.path)) as connection:
+      connection.execute("BEGIN IMMEDIATE")
+      try:
+        self.__create_table(connection, response, variables)
+        connection.executemany(
+          f"INSERT OR REPLACE INTO {self.__quote(self.table)} ({', '.join(names)}) VALUES ({', '.join(['?'] * len(names))})",
+          rows
+        )
+        connection.execute("COMMIT")
+      except Exception:
+        connection.execute("ROLLBACK")
+        raise
+    return len(rows)
+
+  def read(self, filters: Optional[Dict[str, list]] = None) -> Optional[SCBColumnarResponse]:
+    """
+    Reads the table back as an SCBColumnarResponse, None if nothing has been written.
+    Params:
+      filters: Optional[Dict[str, list]] = None
+        dict like {"Tid": ["2005M01", "2005M02"]}, only rows with one of the values are read. The filtering is done by SQLite.
+    """
+    np = _import_numpy()
+    with closing(connect(self.path)) as connection:
+      row = connection.execute("SELECT columns, vocabularies FROM scb_tables WHERE name = ?", (self.table,)).fetchone()
+      if row == None:
+        return None
+      columns, vocabularies = json.loads(row[0]), json.loads(row[1])
+      conditions = []
+      parameters = []
+      for code, values in (filters or {}).items():
+        conditions.append(f"{self.__quote(code)} IN ({', '.join(['?'] * len(values))})")
+        parameters.extend(values)
+      where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+      names = [self.__quote(column["code"]) for column in columns]
+      rows = connection.execute(f"SELECT {', '.join(names)} FROM {self.__quote(self.table)}{where} ORDER BY rowid", parameters).fetchall()
+
+    table_columns = list(zip(*rows)) if rows else [[] for _ in columns]
+    key_codes, key_values, values, missing = {}, {}, {}, {}
+    for column, table_column in zip(columns, table_columns):
+      if column["type"] == "c":
+        values[column["code"]] = np.array(table_column, dtype = np.float64)
+        missing[column["code"]] = np.isnan(values[column["code"]])
+      else:
+        key_codes[column["code"]], key_values[column["code"]] = encode_keys(list(table_column), vocabularies.get(column["code"], []))
+    return SCBColumnarResponse(columns = columns, comments = [], key_codes = key_codes, key_values = key_values, values = values, missing = missing)
+
+  def __create_table(self, connection: sqlite3.Connection, response: SCBColumnarResponse, variables: List[SCBVariable]) -> None:
+    key_definitions = [f"{self.__quote(code)} TEXT NOT NULL" for code in response.key_codes]
+    value_definitions = [f"{self.__quote(code)} REAL" for code in response.values]
+    primary_key = f", PRIMARY KEY ({', '.join(self.__quote(code) for code in response.key_codes)})" if response.key_codes else ""
+    connection.execute(f"CREATE TABLE IF NOT EXISTS {self.__quote(self.table)} ({', '.join(key_definitions + value_definitions)}{primary_key})")
+    vocabularies = {var.code: var.values for var in variables if var.code in response.key_codes}
+    connection.execute(
+      "INSERT OR IGNORE INTO scb_tables (name, columns, vocabularies) VALUES (?, ?, ?)",
+      (self.table, json.dumps(response.columns), json.dumps(vocabularies))
+    )
+
+  @staticmethod
+  def __quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+class ParquetSink():
+  """
+  Writes partitions from SCBClient.write_data() into a Parquet dataset, with the same columns as ResultType.ARROW results.
+  Every partition is written to files named after its partition id, so writing the same query again replaces its files.
+  Rows with the same keys written by other queries are removed from their files first, so overlapping queries don't
+  duplicate cells. Those files are rewritten, only files in the partitioning directories of the partition are read.
+  Requires pyarrow.
+  Params:
+    path: str
+      Directory of the dataset.
+    partitioning: Optional[List[str]] = None
+      Variable codes to partition the dataset by (hive style directories), e.g. the time variable.
+  """
+
+  def __init__(self, path: str, partitioning: Optional[List[str]] = None):
+    self.path = path
+    self.partitioning = partitioning or []
+
+  def write(self, partition_id: str, response: SCBColumnarResponse, variables: List[SCBVariable]) -> int:
+    """Writes the partition and returns the number of rows written."""
+    pa = _import_pyarrow()
+    import pyarrow.dataset as ds
+    batch = arrow_batch_from_columnar(response, variables)
+    if self.partitioning:
+      # Partition values are directory names, plain strings are used instead of dictionaries
+      batch = batch.cast(pa.schema([
+        field.with_type(field.type.value_type) if field.name in self.partitioning else field for field in batch.schema
+      ]))
+    self.__remove_rows(batch, list(response.key_codes))
+    ds.write_dataset(
+      batch,
+      self.path,
+      format = "parquet",
+      partitioning = self.partitioning or None,
+      partitioning_flavor = "hive" if self.partitioning else None,
+      basename_template = f"{partition_id}-{{i}}.parquet",
+      existing_data_behavior = "overwrite_or_ignore"
+    )
+    return batch.num_rows
+
+  def __remove_rows(self, batch, key_codes: List[str]) -> None:
+    """Removes the rows with the keys of the batch from the files already written, files left without rows are deleted."""
+    pa = _import_pyarrow()
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    if not os.path.isdir(self.path):
+      return
+    keys = _join_keys([batch.column(code) for code in key_codes])
+    partition_values = {code: set(pc.unique(batch.column(code)).to_pylist()) for code in self.partitioning}
+    dataset = ds.dataset(self.path, format = "parquet", partitioning = "hive" if self.partitioning else None)
+    for fragment in dataset.get_fragments():
+      # Directory names are parsed into typed values, e.g. 2020 for "first_code=2020", the texts are compared
+      directory_values = {code: str(value) for code, value in ds.get_partition_keys(fragment.partition_expression).items()}
+      if any([directory_values.get(code) not in values for code, values in partition_values.items()]):
+        continue
+      table = pq.read_table(fragment.path)
+      columns = [
+        table.column(code) if code in table.column_names else pa.array([directory_values[code]] * table.num_rows, type = pa.string())
+        for code in key_codes
+      ]
+      kept = pc.invert(pc.is_in(_join_keys(columns), value_set = keys))
+      kept_count = pc.sum(kept).as_py() or 0
+      if kept_count == 0:
+        os.remove(fragment.path)
+      elif kept_count < table.num_rows:
+        pq.write_table(table.filter(kept), fragment.path)
+
+  def read(self, filters: Optional[Dict[str, list]] = None, columns: Optional[List[str]] = None):
+    """
+    Reads the dataset back as a pyarrow.Table, None if nothing has been written.
+    Params:
+      filters: Optional[Dict[str, list]] = None
+        dict like {"Tid": ["2005M01", "2005M02"]}, key columns hold value texts like ARROW results.
+        Filters on partitioning variables skip whole directories, other filters use Parquet statistics.
+      columns: Optional[List[str]] = None
+        Columns to read, defaults to all.
+    """
+    _import_pyarrow()
+    import pyarrow.dataset as ds
+    if not os.path.isdir(self.path):
+      return None
+    dataset = ds.dataset(self.path, format = "parquet", partitioning = "hive" if self.partitioning else None)
+    conditions = [ds.field(code).isin(values) for code, values in (filters or {}).items()]
+    return dataset.to_table(columns = columns, filter = reduce(operator.and_, conditions) if conditions else None)
+
+def _join_keys(columns: list):
+  """Returns a string array with the key of every row, the key columns joined by a separator that isn't in SCB texts."""
+  pa = _import_pyarrow()
+  import pyarrow.compute as pc
+  return pc.binary_join_element_wise(*[pc.cast(column, pa.string()) for column in columns], "\x1f")
@@ -0,0 +1,50 @@
+import json
+from typing import Dict, List, Optional
+
+
+def split_json_response(json_data: dict, variable_code: str, values: List[str]) -> Optional[Dict[str, dict]]:
+  """
+  Splits a decoded SCB JSON response into one response per value of the variable, in the order of values.
+  Returns None if the response can't be split, i.e. the variable isn't a key column or a key isn't among values.
+  """
+  key_codes = [column["code"] for column in json_data["columns"] if column["type"] != "c"]
+  if variable_code not in key_codes:
+    return None
+  key_index = key_codes.index(variable_code)
+  slices = {value: {"columns": json_data["columns"], "comments": json_data["comments"], "data": []} for value in values}
+  for datapoint in json_data["data"]:
+    value_slice = slices.get(datapoint["key"][key_index])
+    if value_slice == None:
+      return None
+    value_slice["data"].append(datapoint)
+  return slices
+
+def stitch_json_responses(slices: List[dict], selections: Optional[Dict[str, List[str]]] = None) -> dict:
+  """
+  Concatenates decoded SCB JSON responses of the same table, comments are deduplicated.
+  Given the selected values per variable code the rows are ordered like SCB orders them, by the position of every
+  key value in its selection, otherwise the rows are kept in the order of the slices.
+  """
+  comments = []
+  seen_comments = set()
+  for value_slice in slices:
+    for comment in value_slice["comments"]:
+      comment_key = json.dumps(comment, sort_keys = True)
+      if comment_key not in seen_comments:
+        seen_comments.add(comment_key)
+        comments.append(comment)
+  columns = slices[0]["columns"] if slices else []
+  data = [datapoint for value_slice in slices for datapoint in value_slice["data"]]
+  if selections != None:
+    orders = [{value: i for i, value in enumerate(selections.get(column["code"], []))} for column in columns if column["type"] != "c"]
+    data.sort(key = lambda datapoint: [order.get(value, len(order)) for order, value in zip(orders, datapoint["key"])])
+  return {"columns": columns, "comments": comments, "data": data}
+
+class DecodedJsonResponse():
+  """A JSON response that is already decoded, e.g. stitched from slices, json() returns the decoded data without copying it."""
+  def __init__(self, json_data: dict):
+    self.status_code = 200
+    self.__json_data = json_data
+
+  def json(self) -> dict:
+    return self.__json_data
@@ -0,0 +1,116 @@
+import os
+import sqlite3
+from contextlib import closing
+from time import time
+from typing import Optional
+
+def create_database(path: str) -> None:
+  """Creates the directories of path and switches the SQLite file to WAL, done once when a store is created."""
+  directory = os.path.dirname(os.path.abspath(path))
+  os.makedirs(directory, exist_ok = True)
+  with closing(connect(path)) as connection:
+    # WAL lets readers in other processes continue while one process writes
+    connection.execute("PRAGMA journal_mode=WAL")
+
+def connect(path: str) -> sqlite3.Connection:
+  """Connects to the SQLite file at path, shared by every SQLite backed store so they handle concurrency the same way."""
+  # Autocommit, transactions are started explicitly where needed. The timeout waits for locks held by other processes.
+  return sqlite3.connect(path, timeout = 30, isolation_level = None)
+
+class SQLiteCache():
+  """
+  Key value cache stored in SQLite with least recently used eviction, the base of MetadataCache and ResponseCache.
+  SQLite handles locking so the cache can be shared by threads and processes on the same machine.
+  Params:
+    path: str
+      Path of the SQLite file, directories are created if needed.
+    ttl_seconds: Optional[float]
+      Entries older than this are considered stale, None keeps entries until they are evicted.
+    max_bytes: int
+      When the cached content exceeds this the least recently used entries are evicted.
+  """
+
+  def __init__(self, path: str, ttl_seconds: Optional[float], max_bytes: int):
+    if ttl_seconds != None and ttl_seconds <= 0:
+      raise ValueError("ttl_seconds must be positive.")
+    if not isinstance(max_bytes, int) or max_bytes < 1:
+      raise ValueError("max_bytes must be a positive integer.")
+    self.path = path
+    self.ttl_seconds = ttl_seconds
+    self.max_bytes = max_bytes
+    create_database(self.path)
+    with closing(connect(self.path)) as connection:
+      connection.execute(
+        "CREATE TABLE IF NOT EXISTS entries ("
+        "key TEXT PRIMARY KEY, content BLOB NOT NULL, size INTEGER NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+      )
+      connection.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+      # The total size is kept up to date by every change, summing the sizes scans the whole table
+      connection.execute("CREATE TABLE IF NOT EXISTS totals (id INTEGER PRIMARY KEY CHECK (id = 0), size INTEGER NOT NULL)")
+      connection.execute("INSERT OR IGNORE INTO totals (id, size) SELECT 0, COALESCE(SUM(size), 0) FROM entries")
+
+  def get(self, key: str) -> Optional[bytes]:
+    """Returns the cached content for key, None if it's missing or stale."""
+    now = time()
+    with closing(connect(self.path)) as connection:
+      row = connection.execute("SELECT content, created FROM entries WHERE key = ?", (key,)).fetchone()
+      if row == None:
+        return None
+      content, created = row
+      if self.ttl_seconds != None and now - created > self.ttl_seconds:
+        connection.execute("BEGIN IMMEDIATE")
+        self.__delete(connection, "key = ? AND created = ?", (key, created))
+        connection.execute("COMMIT")
+        return None
+      connection.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+      return content
+
+  def set(self, key: str, content: bytes) -> None:
+    """Caches content for key and evicts the least recently used entries if the cache exceeds max_bytes."""
+    now = time()
+    with closing(connect(self.path)) as connection:
+      connection.execute("BEGIN IMMEDIATE") # Takes the write lock so concurrent evictions don't interleave
+      replaced = connection.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+      connection.execute(
+        "INSERT OR REPLACE INTO entries (key, content, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+        (key, content, len(content), now, now)
+      )
+      total_size = self.__add_size(connection, len(content) - (replaced[0] if replaced != None else 0))
+      while total_size > self.max_bytes:
+        evicted = connection.execute("SELECT key, size FROM entries ORDER BY accessed ASC LIMIT 100").fetchall()
+        if not evicted:
+          break
+        for evict_key, size in evicted:
+          if total_size <= self.max_bytes:
+            break
+          connection.execute("DELETE FROM entries WHERE key = ?", (evict_key,))
+          total_size = self.__add_size(connection, -size)
+      connection.execute("COMMIT")
+
+  def delete(self, key: str) -> None:
+    with closing(connect(self.path)) as connection:
+      connection.execute("BEGIN IMMEDIATE")
+      self.__delete(connection, "key = ?", (key,))
+      connection.execute("COMMIT")
+
+  def clear(self) -> None:
+    with closing(connect(self.path)) as connection:
+      connection.execute("BEGIN IMMEDIATE")
+      connection.execute("DELETE FROM entries")
+      connection.execute("UPDATE totals SET size = 0")
+      connection.execute("COMMIT")
+
+  def size_bytes(self) -> int:
+    with closing(connect(self.path)) as connection:
+      return connection.execute("SELECT size FROM totals").fetchone()[0]
+
+  def __delete(self, connection: sqlite3.Connection, condition: str, parameters: tuple) -> None:
+    """Deletes the entries matching condition and subtracts their size, within the transaction of the caller."""
+    size = connection.execute(f"SELECT COALESCE(SUM(size), 0) FROM entries WHERE {condition}", parameters).fetchone()[0]
+    connection.execute(f"DELETE FROM entries WHERE {condition}", parameters)
+    self.__add_size(connection, -size)
+
+  def __add_size(self, connection: sqlite3.Connection, delta: int) -> int:
+    """Adds delta to the total size and returns the new total."""
+    connection.execute("UPDATE totals SET size = size + ?", (delta,))
+    return connection.execute("SELECT size FROM totals").fetchone()[0]
@@ -0,0 +1,88 @@
+import json
+import os
+from contextlib import closing
+from time import time
+from typing import List, Optional
+
+from SCB_Client.model.scb_models import SCBJsonResponse, SCBJsonResponseDataPoint
+from SCB_Client.SCBClientUtilities.sqlite_cache import connect, create_database
+
+
+class SyncStore():
+  """
+  Local store for SCBClient.sync(), holds the data points and the high-water mark (the last fetched time value) of every synced query.
+  Queries are identified by a signature of the table and every selection except the time variable.
+  Stored in SQLite so it can be shared by threads and processes on the same machine.
+  Params:
+    path: Optional[str] = None
+      Path of the SQLite file, defaults to ~/.cache/SCB_Client/sync.sqlite.
+  """
+  _DEFAULT_PATH: str = os.path.join(os.path.expanduser("~"), ".cache", "SCB_Client", "sync.sqlite")
+
+  def __init__(self, path: Optional[str] = None):
+    self.path = path if path != None else self._DEFAULT_PATH
+    create_database(self.path)
+    with closing(connect(self.path)) as connection:
+      connection.execute(
+        "CREATE TABLE IF NOT EXISTS syncs ("
+        "signature TEXT PRIMARY KEY, url TEXT NOT NULL, columns TEXT NOT NULL, high_water_mark TEXT NOT NULL, updated REAL NOT NULL)"
+      )
+      connection.execute(
+        "CREATE TABLE IF NOT EXISTS data_points ("
+        "signature TEXT NOT NULL, key TEXT NOT NULL, data_values TEXT NOT NULL, PRIMARY KEY (signature, key))"
+      )
+
+  def get_high_water_mark(self, signature: str) -> Optional[str]:
+    """Returns the last time value that was synced for the signature, None if it has never been synced."""
+    with closing(connect(self.path)) as connection:
+      row = connection.execute("SELECT high_water_mark FROM syncs WHERE signature = ?", (signature,)).fetchone()
+      return row[0] if row != None else None
+
+  def append(self, signature: str, url: str, responses: List[SCBJsonResponse], high_water_mark: str) -> int:
+    """
+    Appends the data points of the responses and moves the high-water mark, both or neither are stored.
+    Data points with a key that's already stored are replaced, so appending the same periods again is harmless.
+    Returns:
+      count: int
+        Number of data points appended.
+    """
+    rows = [
+      (signature, json.dumps(datapoint.key), json.dumps(datapoint.values))
+      for response in responses
+      for datapoint in response.data
+    ]
+    columns = json.dumps(responses[0].columns) if responses else "[]"
+    with closing(connect(self.path)) as connection:
+      connection.execute("BEGIN IMMEDIATE")
+      try:
+        connection.executemany("INSERT OR REPLACE INTO data_points (signature, key, data_values) VALUES (?, ?, ?)", rows)
+        connection.execute(
+          "INSERT OR REPLACE INTO syncs (signature, url, columns, high_water_mark, updated) VALUES (?, ?, ?, ?, ?)",
+          (signature, url, columns, high_water_mark, time())
+        )
+        connection.execute("COMMIT")
+      except Exception:
+        connection.execute("ROLLBACK")
+        raise
+    return len(rows)
+
+  def read(self, signature: str) -> Optional[SCBJsonResponse]:
+    """Returns every stored data point of the signature as a single response, None if it has never been synced."""
+    with closing(connect(self.path)) as connection:
+      row = connection.execute("SELECT columns FROM syncs WHERE signature = ?", (signature,)).fetchone()
+      if row == None:
+        return None
+      data = [
+        SCBJsonResponseDataPoint(json.loads(key), json.loads(data_values))
+        for key, data_values
+        in connection.execute("SELECT key, data_values FROM data_points WHERE signature = ? ORDER BY key", (signature,))
+      ]
+    return SCBJsonResponse(columns = json.loads(row[0]), comments = [], data = data)
+
+  def delete(self, signature: str) -> None:
+    """Forgets the signature, the next sync downloads the whole query again."""
+    with closing(connect(self.path)) as connection:
+      connection.execute("BEGIN IMMEDIATE")
+      connection.execute("DELETE FROM data_points WHERE signature = ?", (signature,))
+      connection.execute("DELETE FROM syncs WHERE signature = ?", (signature,))
+      connection.execute("COMMIT")
@@ -0,0 +1,106 @@
+from time import perf_counter_ns
+from typing import Any, Callable, Dict, Optional
+
+
+class Span():
+  """
+  A timed operation of a client, e.g. "scb.http_attempt". Attributes can be added until the span ends.
+  context is free for the tracer, e.g. to keep the OpenTelemetry span started in on_start.
+  """
+
+  def __init__(self, tracer: "Tracer", name: str, attributes: Dict[str, Any]):
+    self.name = name
+    self.attributes = attributes
+    self.start_ns: int = 0
+    self.end_ns: Optional[int] = None
+    self.error: Optional[BaseException] = None
+    self.context: Any = None
+    self.__tracer = tracer
+
+  def set_attribute(self, key: str, value: Any) -> None:
+    self.attributes[key] = value
+
+  def duration_ns(self) -> Optional[int]:
+    return self.end_ns - self.start_ns if self.end_ns != None else None
+
+  def __enter__(self) -> "Span":
+    self.start_ns = perf_counter_ns()
+    self.__tracer.on_start(self)
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback) -> bool:
+    self.end_ns = perf_counter_ns()
+    self.error = exc_value
+    self.__tracer.on_end(self)
+    return False # Errors are recorded, not swallowed
+
+
+class _NoSpan():
+  """Returned by disabled tracers, every call is a no-op so tracing costs next to nothing when it isn't used."""
+
+  def set_attribute(self, key: str, value: Any) -> None:
+    pass
+
+  def __enter__(self) -> "_NoSpan":
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback) -> bool:
+    return False
+
+_NO_SPAN = _NoSpan()
+
+
+class Tracer():
+  """
+  Creates the spans of a client, the default tracer is disabled and creates none.
+  Subclass and override on_start() and on_end(), or use CallbackTracer, to receive spans.
+  Subclasses that override either hook are enabled, unless they set enabled themselves.
+  Spans of concurrent partitions are started and ended from multiple threads.
+  Spans (attributes):
+    scb.create_query (table, cell_count)
+    scb.plan (table, cell_count, partition_count)
+    scb.rate_limit_wait (table, partition_index), time held back by the rate limiter, including back-off after a 429
+    scb.http_attempt (table, partition_index, attempt, cell_count, status_code, response_bytes), one per attempt including retries
+    scb.parse (table, partition_index, cell_count, response_type, result_type)
+  partition_index is only set when the query is fetched by get_data(), iter_data(), write_data() or SCBBatch.
+  """
+  enabled: bool = False
+
+  def __init_subclass__(cls, **kwargs):
+    super().__init_subclass__(**kwargs)
+    if "enabled" not in cls.__dict__ and (cls.on_start is not Tracer.on_start or cls.on_end is not Tracer.on_end):
+      cls.enabled = True
+
+  def span(self, name: str, **attributes):
+    """Returns the span as a context manager, timed from enter to exit."""
+    if not self.enabled:
+      return _NO_SPAN
+    return Span(self, name, attributes)
+
+  def on_start(self, span: Span) -> None:
+    pass
+
+  def on_end(self, span: Span) -> None:
+    pass
+
+
+class CallbackTracer(Tracer):
+  """
+  Calls on_start and on_end with every span of the client.
+  Params:
+    on_start: Optional[Callable[[Span], None]] = None
+    on_end: Optional[Callable[[Span], None]] = None
+  """
+  enabled: bool = True
+
+  def __init__(self, on_start: Optional[Callable[[Span], None]] = None, on_end: Optional[Callable[[Span], None]] = None):
+    self.__on_start = on_start
+    self.__on_end = on_end
+
+  def on_start(self, span: Span) -> None:
+    if self.__on_start != None:
+      self.__on_start(span)
+
+  def on_end(self, span: Span) -> None:
+    if self.__on_end != None:
+      self.__on_end(span)
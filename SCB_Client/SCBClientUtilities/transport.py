@@ -0,0 +1,136 @@
+import json
+from threading import Lock
+from typing import Optional, Tuple, Union
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class SCBResponse():
+  """The parts of a requests.Response that the clients use, returned by transports that aren't built on requests."""
+  def __init__(self, status_code: int, headers: dict, content: bytes):
+    self.status_code = status_code
+    self.headers = headers
+    self.content = content
+
+  def json(self):
+    return json.loads(self.content)
+
+  def iter_content(self, chunk_size: int = 1):
+    for i in range(0, len(self.content), chunk_size):
+      yield self.content[i:i + chunk_size]
+
+  def close(self) -> None:
+    pass
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+  """HTTPAdapter that applies a default timeout to every request that doesn't specify one."""
+  def __init__(self, timeout: Union[float, Tuple[float, float]], *args, **kwargs):
+    self.timeout = timeout
+    super().__init__(*args, **kwargs)
+
+  def send(self, request, **kwargs):
+    if kwargs.get("timeout") == None:
+      kwargs["timeout"] = self.timeout
+    return super().send(request, **kwargs)
+
+class SCBTransport():
+  """
+  Owns the HTTP session used for every request to SCB, keeping connections alive between requests.
+  A transport can be shared by any number of clients and threads, see SCBTransport.shared().
+  Params:
+    pool_size: int = 10
+      Max number of connections kept alive per host, should be at least the number of concurrent downloads.
+    timeout: float | (connect, read) = (5, 60)
+      Seconds before a request is aborted.
+    session: Optional[requests.Session] = None
+      Use an existing session instead, it's used as is and is not configured by the transport.
+  """
+  _shared: "SCBTransport" = None
+  _shared_lock: Lock = Lock()
+
+  def __init__(self, pool_size: int = 10, timeout: Union[float, Tuple[float, float]] = (5, 60), session: Optional[requests.Session] = None):
+    if not isinstance(pool_size, int) or pool_size < 1:
+      raise ValueError("Pool size must be a positive integer.")
+    self.pool_size = pool_size
+    self.timeout = timeout
+    if session != None:
+      self.session = session
+    else:
+      self.session = requests.Session()
+      adapter = TimeoutHTTPAdapter(timeout, pool_maxsize = pool_size)
+      self.session.mount("https://", adapter)
+      self.session.mount("http://", adapter)
+      self.session.headers.update({"Accept-Encoding": "gzip, deflate"})
+
+  @classmethod
+  def shared(cls) -> "SCBTransport":
+    """Returns the process wide transport, created on first use."""
+    with cls._shared_lock:
+      if cls._shared == None:
+        cls._shared = cls()
+      return cls._shared
+
+  def get(self, url: str) -> requests.Response:
+    return self.session.get(url)
+
+  def post(self, url: str, json: dict, stream: bool = False) -> requests.Response:
+    """With stream the body is read when it's consumed, e.g. with iter_content(), instead of before returning."""
+    return self.session.post(url, json = json, stream = stream)
+
+  def close(self) -> None:
+    self.session.close()
+
+  def __enter__(self) -> "SCBTransport":
+    return self
+
+  def __exit__(self, *args) -> None:
+    self.close()
+
+class AsyncSCBTransport():
+  """
+  Asyncio counterpart of SCBTransport built on aiohttp, which is only required once the transport is used.
+  The underlying session is bound to the event loop it's first used in, share one transport between clients running on the same loop.
+  Params:
+    pool_size: int = 10
+      Max number of open connections.
+    timeout: float = 60
+      Seconds before a request is aborted.
+  """
+  def __init__(self, pool_size: int = 10, timeout: float = 60):
+    if not isinstance(pool_size, int) or pool_size < 1:
+      raise ValueError("Pool size must be a positive integer.")
+    self.pool_size = pool_size
+    self.timeout = timeout
+    self._session = None
+
+  def __get_session(self):
+    if self._session == None:
+      try:
+        import aiohttp
+      except ImportError as e:
+        raise ImportError("AsyncSCBTransport requires aiohttp, install it with pip install aiohttp.") from e
+      self._session = aiohttp.ClientSession(
+        connector = aiohttp.TCPConnector(limit = self.pool_size),
+        timeout = aiohttp.ClientTimeout(total = self.timeout),
+        headers = {"Accept-Encoding": "gzip, deflate"}
+      )
+    return self._session
+
+  async def get(self, url: str) -> SCBResponse:
+    async with self.__get_session().get(url) as response:
+      return SCBResponse(response.status, dict(response.headers), await response.read())
+
+  async def post(self, url: str, json: dict) -> SCBResponse:
+    async with self.__get_session().post(url, json = json) as response:
+      return SCBResponse(response.status, dict(response.headers), await response.read())
+
+  async def close(self) -> None:
+    if self._session != None:
+      await self._session.close()
+      self._session = None
+
+  async def __aenter__(self) -> "AsyncSCBTransport":
+    return self
+
+  async def __aexit__(self, *args) -> None:
+    await self.close()
@@ -1,19 +1,62 @@
+import copy
 import json
 import math
-from time import sleep
-from typing import List, Optional
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice, product
+from threading import Lock
+from typing import TYPE_CHECKING, Any, Callable, Dict, Generator, Iterator, List, Optional, Tuple, Union
+from weakref import WeakKeyDictionary
 import requests
 
-from SCB_Client.model.scb_models import (ResponseType, SCBJsonResponse,
-                                         SCBJsonResponseDataPoint, SCBQuery,
-                                         SCBQueryVariable,
+from SCB_Client.model.scb_models import (CachePolicy, ResponseType, ResultType,
+                                         SCBColumnarResponse, SCBCsvRow,
+                                         SCBJsonResponse,
+                                         SCBPayloadEstimate, SCBQuery,
+                                         SCBQueryPlan, SCBQueryVariable,
                                          SCBQueryVariableSelection,
                                          SCBVariable)
-from SCB_Client.SCBClientUtilities import PerformanceMonitor, SessionType
+from SCB_Client.SCBClientUtilities import (CsvJsonResponse, DecodedJsonResponse,
+                                           JsonDecoder,
+                                           JsonStatJsonResponse,
+                                           MetadataCache, PerformanceMonitor,
+                                           RateLimiter, ResponseCache,
+                                           SCBResponse, SCBTransport,
+                                           CounterType, SessionType, SyncStore,
+                                           Tracer,
+                                           arrow_batch_from_columnar,
+                                           arrow_table_from_batches,
+                                           choose_response_type,
+                                           columnar_from_json,
+                                           columnar_from_jsonstat2,
+                                           estimate_payload,
+                                           get_json_decoder,
+                                           iter_csv_rows,
+                                           plan_tiling, split_evenly,
+                                           split_json_response,
+                                           stitch_json_responses)
+
+if TYPE_CHECKING:
+  import pyarrow # Optional, only ResultType.ARROW needs it
 
 class SCBClient:
   _SCB_BASE_URL: str = "https://api.scb.se/OV0104/v1/doris/sv/ssd"
   _SCB_LIMIT_RESULT: int = 150000
+  _SCB_LIMIT_REQUESTS: int = 30
+  _SCB_LIMIT_WINDOW_SECONDS: int = 10
+  _SCB_MAX_RETRIES: int = 10
+  _CSV_CHUNK_SIZE: int = 65536
+  _SCB_TREE_LEVELS: List[tuple] = [
+    ("area", "areas"),
+    ("category", "categories"),
+    ("category specification", "category specifications"),
+    ("table", "tables")
+  ]
+  _TREE_MEMO_TTL_SECONDS: int = 3600
+  _tree_memo: WeakKeyDictionary = WeakKeyDictionary() # transport -> {url: (fetched, node ids)}, shared by all clients
+  _tree_memo_lock: Lock = Lock()
 
   def __init__(
     self, 
@@ -32,10 +75,27 @@ class SCBClient:
     self._variables: List[SCBVariable] = None # Used to cache variableas in case they are needed multiple times
     self._size_limit_cells: int = 30000
     self._preferred_partition_variable_code: str = None
+    self._max_workers: int = 1
     if "performance_monitor" in kwargs:
       self.perf_mon = kwargs["performance_monitor"]
     else:
       self.perf_mon = PerformanceMonitor() 
+    if "rate_limiter" in kwargs:
+      self.rate_limiter = kwargs["rate_limiter"]
+    else:
+      self.rate_limiter = RateLimiter.shared() # Shared so that all clients in the process stay within the SCB limit together
+    if "transport" in kwargs:
+      self.transport = kwargs["transport"]
+    else:
+      self.transport = SCBTransport.shared() # Shared so that connections to SCB are reused between clients
+    # Optional MetadataCache, persists variables between processes and clients
+    self.metadata_cache: MetadataCache = kwargs["metadata_cache"] if "metadata_cache" in kwargs else None
+    # Optional ResponseCache, see get_data() for how it's used
+    self.response_cache: ResponseCache = kwargs["response_cache"] if "response_cache" in kwargs else None
+    # Disabled unless a tracer is given, see Tracer for the spans
+    self.tracer: Tracer = kwargs["tracer"] if "tracer" in kwargs else Tracer()
+    # Decodes JSON responses from their bytes, orjson is used if it's installed, see JsonDecoder
+    self.json_decoder: JsonDecoder = kwargs["json_decoder"] if "json_decoder" in kwargs else get_json_decoder()
 
   def set_preferred_partition_variable_code(self, variable_code: str) -> None:
     """preferred_partition_variable_code will be used to partition the requests if the expected result is larger than the SCB limit."""
@@ -58,6 +118,17 @@ class SCBClient:
     """Size limit is used to protect against unwanted data use, will be ignored if set to 0."""
     return self._size_limit_cells
 
+  def set_max_workers(self, max_workers: int) -> None:
+    """Max workers is the number of partitions that are downloaded concurrently, defaults to 1 (sequential).
+    Can't exceed the number of requests SCB allows within its limit window."""
+    if not isinstance(max_workers, int) or not 0 < max_workers <= self._SCB_LIMIT_REQUESTS:
+      raise ValueError(f"Max workers must be an integer between 1 and {self._SCB_LIMIT_REQUESTS}.")
+    self._max_workers = max_workers
+
+  def get_max_workers(self) -> int:
+    """Max workers is the number of partitions that are downloaded concurrently, defaults to 1 (sequential)."""
+    return self._max_workers
+
   def estimate_cell_count(self, query: SCBQuery) -> int:
     """
     A lightweight get request will be made to SCB to calculate the number of
@@ -71,46 +142,432 @@ class SCBClient:
 
     return math.prod([len(queryvar.selection.values) for queryvar in query.query])
 
-  def get_data(self, query: SCBQuery) -> List[SCBJsonResponse]:
+  def estimate_payload(self, query: SCBQuery) -> Dict[ResponseType, SCBPayloadEstimate]:
+    """
+    Estimates the bytes SCB will send and the time to parse them for every response format, no data is requested.
+    Key widths are taken from the selected values, so long value codes and texts make CSV and JSON grow differently.
+    Params:
+      query: SCBQuery
+    Returns:
+      estimates: Dict[ResponseType, SCBPayloadEstimate]
+    """
+    return estimate_payload(query, self.get_variables())
+
+  def choose_response_type(self, query: SCBQuery) -> ResponseType:
+    """Returns the format ResponseType.AUTO requests the query in, the one with the fewest estimated bytes that can be converted to JSON results."""
+    return choose_response_type(query, self.get_variables())
+
+  def get_data(self, query: SCBQuery, result_type: ResultType = ResultType.DEFAULT, cache_policy: CachePolicy = CachePolicy.USE) -> Union[List[SCBJsonResponse], List[SCBColumnarResponse], List[List[SCBCsvRow]], "pyarrow.Table"]:
     """
     Get data from SCB if internal limit is not exceeded. 
-    Multiple requests will be made if the SCB limit is exceeded.
+    Multiple requests will be made if the SCB limit is exceeded, 
+    these are made concurrently if max workers is set above 1 (see set_max_workers()).
+    The responses are always returned in partition order.
+    Params:
+      query: SCBQuery
+      result_type: ResultType = ResultType.DEFAULT
+        ResultType.COLUMNAR returns every partition as an SCBColumnarResponse, not supported for CSV queries.
+          JSON-stat2 partitions are columnar for ResultType.DEFAULT too, stitch them with concat_columnar().
+        ResultType.ARROW returns a single pyarrow.Table with a record batch per partition, not supported for CSV queries.
+          Use to_pandas() on the table for a DataFrame.
+      cache_policy: CachePolicy = CachePolicy.USE
+        How the response cache is used if the client has one (response_cache keyword), cache hits make no requests.
+        JSON responses are cached in slices, one per value of the partition variable, and only values that aren't 
+        cached are downloaded. Set the time variable as the preferred partition variable to make incremental refreshes cheap.
+    Returns:
+      data: List[SCBJsonResponse] | List[SCBColumnarResponse] | List[List[SCBCsvRow]] | pyarrow.Table
+        A response per partition, SCBJsonResponse for JSON and AUTO queries, SCBColumnarResponse for ResultType.COLUMNAR
+        and JSON-stat2 queries and a list of SCBCsvRow for CSV queries. ResultType.ARROW returns a single pyarrow.Table.
+    """
+    if result_type == ResultType.ARROW:
+      return arrow_table_from_batches(list(self.iter_data(query, result_type, cache_policy)))
+    return list(self.iter_data(query, result_type, cache_policy))
+
+  def iter_data(self, query: SCBQuery, result_type: ResultType = ResultType.DEFAULT, cache_policy: CachePolicy = CachePolicy.USE) -> Iterator[Any]:
+    """
+    Same as get_data() but yields every partition, in partition order, as soon as it's downloaded and processed.
+    Partitions are the responses get_data() returns, ResultType.ARROW yields a pyarrow.RecordBatch per partition.
+    At most max workers partitions are downloaded ahead of the one being consumed, which keeps memory bounded.
+    The size limit is checked before the iterator is returned.
+    """
+    partition_queries = self._get_partition_queries(query)
+    return self.__iter_partitions(partition_queries, self._create_fetch_partition(query, result_type, cache_policy))
+
+  def write_data(self, query: SCBQuery, sink: Any, cache_policy: CachePolicy = CachePolicy.USE) -> int:
+    """
+    Writes every partition to the sink as soon as it's downloaded, only max workers partitions are kept in memory.
+    Params:
+      query: SCBQuery
+        A JSON, JSON-stat2 or AUTO query.
+      sink: SQLiteSink | ParquetSink
+        Anything with a write(partition_id, response, variables) method, which is given an SCBColumnarResponse 
+        and returns the number of rows written. partition_id identifies the partition query.
+      cache_policy: CachePolicy = CachePolicy.USE
+    Returns:
+      count: int
+        Number of rows written.
+    """
+    fetch_partition = self._create_fetch_partition(query, ResultType.COLUMNAR, cache_policy)
+    partition_queries = self._get_partition_queries(query)
+    variables = self.get_variables()
+    row_count = 0
+    for partition_query, response in zip(partition_queries, self.__iter_partitions(partition_queries, fetch_partition)):
+      row_count += sink.write(ResponseCache.create_key(self.data_url, partition_query), response, variables)
+    return row_count
+
+  def _create_fetch_partition(self, query: SCBQuery, result_type: ResultType, cache_policy: CachePolicy) -> Callable[[SCBQuery], Any]:
+    """Validates the arguments and returns the function that downloads and processes a partition of the query."""
+    self._validate_result_type(query, result_type)
+    if not isinstance(cache_policy, CachePolicy):
+      raise TypeError("Cache policy need to be one of type CachePolicy, e.g. CachePolicy.USE.")
+    partition_variable_code = self._get_partition_variable_code(query) if self.response_cache != None else None
+    return partial(self.__fetch_partition, result_type = result_type, cache_policy = cache_policy, partition_variable_code = partition_variable_code)
+
+  def sync(self, query: SCBQuery, store: SyncStore, cache_policy: CachePolicy = CachePolicy.USE) -> List[SCBJsonResponse]:
+    """
+    Downloads the periods of the time variable that are newer than the last sync of the query and appends them to the store.
+    The first sync downloads the query as it is, e.g. create_query(time_top = 12) for the last 12 periods. 
+    Later syncs compare the stored high-water mark with the time values from get_variables() and only download new periods,
+    no requests are made if there aren't any. The query is identified by its selections of all variables except time.
+    Params:
+      query: SCBQuery
+        A JSON query that selects the time variable.
+      store: SyncStore
+      cache_policy: CachePolicy = CachePolicy.USE
+    Returns:
+      responses: List[SCBJsonResponse]
+        The new partitions, empty if the store was up to date. Use store.read() for all synced data.
+    """
+    sync_query, signature = self._create_sync_query(query, store)
+    if sync_query == None:
+      return []
+    responses = self.get_data(sync_query, cache_policy = cache_policy)
+    store.append(signature, self.data_url, responses, self._get_last_time_value(sync_query))
+    return responses
+
+  def get_sync_signature(self, query: SCBQuery) -> str:
+    """Returns the signature the query is synced under, use it to read the synced data from the SyncStore."""
+    time_variable = self.__get_time_variable()
+    query_without_time = copy.deepcopy(query)
+    query_without_time.query = [queryvar for queryvar in query_without_time.query if queryvar.code != time_variable.code]
+    return ResponseCache.create_key(self.data_url, query_without_time)
+
+  def _create_sync_query(self, query: SCBQuery, store: SyncStore) -> Tuple[Optional[SCBQuery], str]:
+    """Returns the query limited to the periods after the high-water mark, None if there are none, and the signature of the query."""
+    if query.response_type not in (ResponseType.JSON, ResponseType.AUTO):
+      raise NotImplementedError("Sync is only supported for ResponseType.JSON and ResponseType.AUTO.")
+    time_variable = self.__get_time_variable()
+    if time_variable.code not in query.query_variable_codes_to_list():
+      raise ValueError(f"The query needs to select the time variable {time_variable.code} to be synced.")
+    signature = self.get_sync_signature(query)
+    high_water_mark = store.get_high_water_mark(signature)
+    if high_water_mark == None:
+      return query, signature
+    # SCB time codes start with the year and have a fixed format, so newer periods sort after older ones
+    new_time_values = [value for value in time_variable.values if value > high_water_mark]
+    if not new_time_values:
+      return None, signature
+    return self.__create_partition_query(query, {time_variable.code: new_time_values}), signature
+
+  def _get_last_time_value(self, query: SCBQuery) -> str:
+    time_variable_code = self.__get_time_variable().code
+    return max([queryvar for queryvar in query.query if queryvar.code == time_variable_code][0].selection.values)
+
+  def __get_time_variable(self) -> SCBVariable:
+    time_variables = [var for var in self.get_variables() if var.time == True]
+    if not time_variables:
+      raise ValueError("Can't find a time variable in current table.")
+    return time_variables[0]
+
+  def __iter_partitions(self, partition_queries: List[SCBQuery], fetch_partition: Callable[[SCBQuery], Any]) -> Iterator[Any]:
+    if self._max_workers == 1 or len(partition_queries) == 1:
+      for i, partition_query in enumerate(partition_queries):
+        yield fetch_partition(partition_query, i)
+      return
+
+    remaining_queries = enumerate(partition_queries)
+    with ThreadPoolExecutor(max_workers = min(self._max_workers, len(partition_queries))) as executor:
+      in_flight = deque([executor.submit(fetch_partition, partition_query, i) for i, partition_query in islice(remaining_queries, self._max_workers)])
+      while in_flight:
+        response = in_flight.popleft().result()
+        next_query = next(remaining_queries, None)
+        if next_query != None:
+          in_flight.append(executor.submit(fetch_partition, next_query[1], next_query[0]))
+        yield response
+
+  @staticmethod
+  def _validate_result_type(query: SCBQuery, result_type: ResultType) -> None:
+    if not isinstance(result_type, ResultType):
+      raise TypeError("Result type need to be one of type ResultType, e.g. ResultType.DEFAULT.")
+    if result_type in (ResultType.COLUMNAR, ResultType.ARROW) and query.response_type == ResponseType.CSV:
+      raise NotImplementedError(f"{result_type.name.capitalize()} results are only supported for ResponseType.JSON, ResponseType.JSONSTAT2 and ResponseType.AUTO.")
+
+  def _get_partition_queries(self, query: SCBQuery) -> List[SCBQuery]:
+    """
+    Checks the query against the internal size limit and splits it into queries that are within the SCB limit.
+    Every partition gets its own copy of the query so they can be fetched concurrently.
     """
     estimated_cell_count = self.estimate_cell_count(query)
     if estimated_cell_count > self._size_limit_cells and self._size_limit_cells > 0:
       raise PermissionError(f"Current size limit {self._size_limit_cells} will be exceeded. The size limit can be changed with set_size_limit().")
+    return self.plan(query).partitions
+
+  def plan(self, query: SCBQuery) -> SCBQueryPlan:
+    """
+    Returns the partitions get_data() will request for the query, no requests are made.
+    If the query exceeds the SCB limit it's tiled over as many variables as needed, using as few requests as possible 
+    with partitions of even size so concurrent downloads finish at about the same time. 
+    A single variable is split whenever that's enough, the preferred partition variable if it's as good as any other.
+    Params:
+      query: SCBQuery
+    Returns:
+      plan: SCBQueryPlan
+    """
+    with self.tracer.span("scb.plan", table = self.table) as span:
+      plan = self.__create_plan(query)
+      span.set_attribute("cell_count", sum(plan.cell_counts))
+      span.set_attribute("partition_count", len(plan))
+    return plan
+
+  def __create_plan(self, query: SCBQuery) -> SCBQueryPlan:
+    estimated_cell_count = self.estimate_cell_count(query)
     if estimated_cell_count < self._SCB_LIMIT_RESULT:
-      response = requests.post(self.data_url, json = query.to_dict())
-      return [self.__create_response_obj(response, query.response_type)]
+      return SCBQueryPlan(partitions = [query], partition_variable_codes = [], cell_counts = [estimated_cell_count])
+
+    partition_variable = self.__get_preferred_partition_variable_or_default(query)
+    preferred_index = [i for i, queryvar in enumerate(query.query) if queryvar is partition_variable][0]
+    chunk_counts = plan_tiling([len(queryvar.selection.values) for queryvar in query.query], self._SCB_LIMIT_RESULT, preferred_index)
+
+    split_variables = [(queryvar.code, split_evenly(queryvar.selection.values, chunk_count)) 
+                       for queryvar, chunk_count in zip(query.query, chunk_counts) if chunk_count > 1]
+    codes = [code for code, _ in split_variables]
+    partitions = []
+    cell_counts = []
+    # Partitions are ordered by the values of the split variables, in the order of the query
+    for chunks in product(*[chunks for _, chunks in split_variables]):
+      partition_query = self.__create_partition_query(query, dict(zip(codes, chunks)))
+      partitions.append(partition_query)
+      cell_counts.append(self.estimate_cell_count(partition_query))
+    return SCBQueryPlan(partitions = partitions, partition_variable_codes = codes, cell_counts = cell_counts)
+
+  def __fetch_partition(self, query: SCBQuery, partition_index: Optional[int] = None, result_type: ResultType = ResultType.DEFAULT, cache_policy: CachePolicy = CachePolicy.USE, partition_variable_code: Optional[str] = None) -> SCBJsonResponse:
+    """Downloads and processes a single partition, safe to call from multiple threads. partition_index labels the performance sessions."""
+    wire_query = self._get_wire_query(query)
+    if self._can_use_slices(wire_query, cache_policy, partition_variable_code):
+      response = self.__download_slices(wire_query, cache_policy, partition_variable_code, partition_index)
     else:
-      partition_variable = self.__get_preferred_partition_variable_or_default(query)
-      
-      # First we check how many values of the partition variable we can include in each request
-      partition_values_per_request = self.__get_partition_values_per_request(query, partition_variable)
-
-      # Now we need to fetch the data
-      values_to_partition = partition_variable.selection.values.copy()
-      partitions = self.__partition_list(values_to_partition, partition_values_per_request)
-      response_list: List[SCBJsonResponse] = []
-      for partition in partitions:
-        partition_variable.selection.values = partition
-
-        # TODO: This is horrible, SCB limits the amount of requests that can be made.
-        # We should hold off if we've reached the limit, maybe even keep track of how many requests we've
-        # made and not rely on SCB to tell us to back off.
-        while True:
-          dl_ses_id = self.perf_mon.start_session(SessionType.DOWNLOAD)
-          response = requests.post(self.data_url, json = query.to_dict())
-          if response.status_code == 429:
-            sleep(0.1)
-            continue
-          else:
-            self.perf_mon.stop_session(dl_ses_id)
-            break
-        
-        response_list.append(self.__create_response_obj(response, query.response_type))
-        
-      return response_list
+      response = self._download(wire_query, cache_policy, partition_index)
+    return self._process_response(response, query, wire_query, result_type, partition_index)
+
+  def _process_response(self, response, query: SCBQuery, wire_query: SCBQuery, result_type: ResultType, partition_index: Optional[int] = None) -> Any:
+    """Parses the downloaded response to a partition into the result type and counts its cells, makes no requests."""
+    cell_count = self.estimate_cell_count(query)
+    with self._create_parse_span(wire_query, result_type, partition_index, cell_count):
+      response, response_type = self._get_response_to_parse(response, query, wire_query, result_type)
+      response_obj = self._create_response_obj(response, response_type, result_type, partition_index)
+    self.perf_mon.count(CounterType.CELLS, cell_count, **self._get_session_labels(partition_index))
+    return response_obj
+
+  def _get_wire_query(self, query: SCBQuery) -> SCBQuery:
+    """Returns the query as it's sent to SCB, in the format ResponseType.AUTO picks if it's used."""
+    if query.response_type != ResponseType.AUTO:
+      return query
+    wire_query = copy.copy(query)
+    wire_query.response_type = self.choose_response_type(query)
+    return wire_query
+
+  def _get_response_to_parse(self, response, query: SCBQuery, wire_query: SCBQuery, result_type: ResultType = ResultType.DEFAULT) -> Tuple[Any, ResponseType]:
+    """
+    Returns the response and its format for _create_response_obj(), responses to ResponseType.AUTO are parsed like JSON.
+    JSON-stat2 is decoded straight into columnar and Arrow results, those are the same as the ones from JSON.
+    """
+    if query.response_type != ResponseType.AUTO or wire_query.response_type == ResponseType.JSON:
+      return response, wire_query.response_type
+    if wire_query.response_type == ResponseType.JSONSTAT2:
+      if result_type in (ResultType.COLUMNAR, ResultType.ARROW):
+        return response, ResponseType.JSONSTAT2
+      return JsonStatJsonResponse(response), ResponseType.JSON
+    rows = iter_csv_rows(response.iter_content(chunk_size = self._CSV_CHUNK_SIZE), key_headers = self._get_csv_key_headers())
+    return CsvJsonResponse(rows, wire_query, self.get_variables()), ResponseType.JSON
+
+  def _get_key_vocabularies(self, columns: List[dict]) -> Optional[List[List[str]]]:
+    """Returns the values of the variable of every key column of a JSON response, None if the variables aren't loaded."""
+    if self._variables == None:
+      return None
+    values = {var.code: var.values for var in self._variables}
+    return [values.get(column["code"], []) for column in columns if column["type"] != "c"]
+
+  def _get_csv_key_headers(self) -> set:
+    """CSV responses have the variable texts as headers of the key columns, none are known if the variables aren't loaded."""
+    return {var.text for var in self._variables} if self._variables != None else set()
+
+  def _create_parse_span(self, query: SCBQuery, result_type: ResultType, partition_index: Optional[int], cell_count: int):
+    return self.tracer.span(
+      "scb.parse",
+      table = self.table,
+      partition_index = partition_index,
+      cell_count = cell_count,
+      response_type = query.response_type.name,
+      result_type = result_type.name
+    )
+
+  def _create_attempt_span(self, query: SCBQuery, partition_index: Optional[int], attempt: int):
+    return self.tracer.span(
+      "scb.http_attempt",
+      table = self.table,
+      partition_index = partition_index,
+      attempt = attempt,
+      cell_count = self.estimate_cell_count(query)
+    )
+
+  def __download_slices(self, query: SCBQuery, cache_policy: CachePolicy, partition_variable_code: str, partition_index: Optional[int] = None):
+    """See _create_slice_download()."""
+    download = self._create_slice_download(query, cache_policy, partition_variable_code)
+    missing_query, response = self._resume_download(download)
+    while missing_query != None:
+      missing_query, response = self._resume_download(download, self._download(missing_query, CachePolicy.BYPASS, partition_index))
+    return response
+
+  def _create_slice_download(self, query: SCBQuery, cache_policy: CachePolicy, partition_variable_code: str) -> Generator[SCBQuery, Any, Any]:
+    """
+    Returns the response to the query stitched together from cached slices along the partition variable,
+    only the values that aren't cached are downloaded and their slices are cached.
+    Makes no requests itself, the generator yields the queries to download without the cache and is sent their responses
+    (see _resume_download()), so the sync and async clients download them their own way.
+    """
+    if cache_policy == CachePolicy.USE:
+      # Responses that can't be sliced are cached whole
+      content = self.response_cache.get(self.response_cache.create_key(self.data_url, query))
+      if content != None:
+        return SCBResponse(200, {}, content)
+      slices, missing_query = self._get_cached_slices(query, partition_variable_code)
+    else:
+      slices, missing_query = {}, query
+    if missing_query != None:
+      response = yield missing_query
+      if response.status_code != 200:
+        return response
+      fetched_slices = self._store_slices(missing_query, partition_variable_code, response)
+      if fetched_slices == None:
+        # The response can't be sliced, e.g. the partition variable is a content variable
+        if slices:
+          response = yield query
+        if response.status_code == 200:
+          self.response_cache.set(self.response_cache.create_key(self.data_url, query), response.content)
+        return response
+      slices.update(fetched_slices)
+    return self._stitch_slices(query, partition_variable_code, slices)
+
+  @staticmethod
+  def _resume_download(download: Generator, response = None) -> Tuple[Optional[SCBQuery], Any]:
+    """Sends the response to the download, returns the next query to download or None and the result once the download is done."""
+    try:
+      return download.send(response), None
+    except StopIteration as result:
+      return None, result.value
+
+  def _can_use_slices(self, query: SCBQuery, cache_policy: CachePolicy, partition_variable_code: Optional[str]) -> bool:
+    """Slices are cached for JSON responses along the partition variable when the client has a response cache."""
+    return (
+      partition_variable_code != None 
+      and self.response_cache != None 
+      and cache_policy != CachePolicy.BYPASS 
+      and query.response_type == ResponseType.JSON
+    )
+
+  def _get_cached_slices(self, query: SCBQuery, partition_variable_code: str) -> Tuple[Dict[str, dict], Optional[SCBQuery]]:
+    """Returns the decoded cached slices per value of the partition variable, and a query for the values that aren't cached (None if all are)."""
+    values = [queryvar for queryvar in query.query if queryvar.code == partition_variable_code][0].selection.values
+    slices = {}
+    for value in values:
+      content = self.response_cache.get(self.__get_slice_key(query, partition_variable_code, value))
+      if content != None:
+        slices[value] = json.loads(content)
+    missing_values = [value for value in values if value not in slices]
+    if not missing_values:
+      return slices, None
+    return slices, self.__create_partition_query(query, {partition_variable_code: missing_values})
+
+  def _store_slices(self, query: SCBQuery, partition_variable_code: str, response) -> Optional[Dict[str, dict]]:
+    """Splits the response along the partition variable and caches every slice, returns None if it can't be split."""
+    values = [queryvar for queryvar in query.query if queryvar.code == partition_variable_code][0].selection.values
+    slices = split_json_response(response.json(), partition_variable_code, values)
+    if slices == None:
+      return None
+    for value, value_slice in slices.items():
+      self.response_cache.set(self.__get_slice_key(query, partition_variable_code, value), json.dumps(value_slice).encode())
+    return slices
+
+  def _stitch_slices(self, query: SCBQuery, partition_variable_code: str, slices: Dict[str, dict]) -> DecodedJsonResponse:
+    """Creates a response for the query from its slices, data is ordered like SCB orders the response to the query."""
+    selections = {queryvar.code: queryvar.selection.values for queryvar in query.query}
+    return DecodedJsonResponse(stitch_json_responses([slices[value] for value in selections[partition_variable_code]], selections))
+
+  def __get_slice_key(self, query: SCBQuery, partition_variable_code: str, value: str) -> str:
+    # A slice has the same key as a query selecting only that value, so whole responses and slices are interchangeable.
+    return self.response_cache.create_key(self.data_url, self.__create_partition_query(query, {partition_variable_code: [value]}))
+
+  def _download(self, query: SCBQuery, cache_policy: CachePolicy = CachePolicy.USE, partition_index: Optional[int] = None):
+    """Returns the response to the query, from the response cache if the policy allows it, without touching the rate limiter."""
+    cache_key, response = self._get_cached_response(query, cache_policy)
+    if response != None:
+      return response
+
+    # CSV is parsed while it's downloaded, so the body of a CSV response is read during processing.
+    # Unless it's going to be cached, then the body has to be read anyway.
+    stream = query.response_type == ResponseType.CSV and cache_key == None
+    labels = self._get_session_labels(partition_index)
+    attempt = 0
+    while True:
+      with self.tracer.span("scb.rate_limit_wait", table = self.table, partition_index = partition_index):
+        self.rate_limiter.acquire()
+      with self._create_attempt_span(query, partition_index, attempt) as span:
+        dl_ses_id = self.perf_mon.start_session(SessionType.DOWNLOAD, **labels)
+        response = self.transport.post(self.data_url, json = query.to_dict(), stream = stream)
+        byte_count = self._get_byte_count(response, stream)
+        self.perf_mon.stop_session(dl_ses_id, byte_count)
+        span.set_attribute("status_code", response.status_code)
+        span.set_attribute("response_bytes", byte_count)
+      if stream and response.status_code == 429:
+        response.close() # Returns the connection to the pool without reading the body
+      if not self._should_retry(response, attempt, labels):
+        break
+      attempt += 1
+    
+    self._cache_response(cache_key, response)
+    return response
+
+  def _get_cached_response(self, query: SCBQuery, cache_policy: CachePolicy) -> Tuple[Optional[str], Optional[SCBResponse]]:
+    """Returns the key the response to the query is cached under, None if it isn't cached, and the cached response if the policy allows it."""
+    if self.response_cache == None or cache_policy == CachePolicy.BYPASS:
+      return None, None
+    cache_key = self.response_cache.create_key(self.data_url, query)
+    if cache_policy == CachePolicy.USE:
+      content = self.response_cache.get(cache_key)
+      if content != None:
+        return cache_key, SCBResponse(200, {}, content)
+    return cache_key, None
+
+  def _cache_response(self, cache_key: Optional[str], response) -> None:
+    """Caches successful responses under the key from _get_cached_response()."""
+    if cache_key != None and response.status_code == 200:
+      self.response_cache.set(cache_key, response.content)
+
+  def _should_retry(self, response, attempt: int, labels: Dict[str, str]) -> bool:
+    """
+    Counts a request, attempt is the number of retries before it. Returns True if SCB limited it and it should be retried,
+    raises ConnectionError once _SCB_MAX_RETRIES retries have been limited.
+    """
+    self.perf_mon.count(CounterType.REQUESTS, **labels)
+    if response.status_code != 429:
+      return False
+    self.perf_mon.count(CounterType.RATE_LIMITED, **labels)
+    if attempt >= self._SCB_MAX_RETRIES:
+      raise ConnectionError(f"SCB is still limiting requests after {self._SCB_MAX_RETRIES} retries.")
+    self.perf_mon.count(CounterType.RETRIES, **labels)
+    # Pauses every client sharing the rate limiter, the next acquire() waits for it.
+    self.rate_limiter.back_off(attempt + 1, response.headers.get("Retry-After"))
+    return True
   
   def create_query(self, variable_selection: Optional[dict[str, list]] = None, response_type: ResponseType = ResponseType.JSON, time_top: int = 0) -> SCBQuery:
     """
@@ -124,6 +581,12 @@ class SCBClient:
       time_top: int = 0
         Will raise a ValueError if none of the variables available in current table is a time variable.
     """
+    with self.tracer.span("scb.create_query", table = self.table) as span:
+      query = self.__create_query(variable_selection, response_type, time_top)
+      span.set_attribute("cell_count", self.estimate_cell_count(query))
+    return query
+
+  def __create_query(self, variable_selection: Optional[dict[str, list]], response_type: ResponseType, time_top: int) -> SCBQuery:
 
     # Validating input
     if not isinstance(response_type, ResponseType):
@@ -167,57 +630,67 @@ class SCBClient:
     return query
 
   def get_variables(self) -> List[SCBVariable]:
-    """Returns cached variables with possible values if exists, otherwhise fetch, cache and return."""
+    """Returns cached variables with possible values if exists, otherwhise fetch, cache and return.
+    The metadata cache is used before fetching if the client has one."""
     if self._variables != None:
       return self._variables
-    s = requests.Session()
-    response = s.get(self.data_url).json()
+    response = self._get_metadata(self.transport, self.data_url, self.metadata_cache, self.rate_limiter).json()
     variables = [SCBVariable(**var) for var in response["variables"]]
     self._variables = variables # cache it
-    s.close()
     return variables
 
   @staticmethod
-  def __partition_list(list_to_partition: list, partition_size: int) -> List[list]:
-    list_partitioned = []
-    for i in range(0, len(list_to_partition), partition_size):
-      list_partitioned.append(list_to_partition[i:i+partition_size])
-    return list_partitioned
-
-  def __create_response_obj(self, response_data: requests.Response, response_type: ResponseType):
-    perf_ses_id = self.perf_mon.start_session(SessionType.PROCESS)
-    if response_type == ResponseType.JSON:
-      json_data = response_data.json()
+  def __create_partition_query(query: SCBQuery, partition: Dict[str, list]) -> SCBQuery:
+    """Returns a copy of the query where every variable in partition only selects the values in partition."""
+    partition_query = copy.deepcopy(query)
+    for queryvar in partition_query.query:
+      if queryvar.code in partition:
+        queryvar.selection.values = partition[queryvar.code]
+    return partition_query
+
+  def _get_session_labels(self, partition_index: Optional[int] = None) -> Dict[str, str]:
+    """Labels of the performance sessions of the client, the partition is only known when get_data() splits the query."""
+    labels = {"table": self.table}
+    if partition_index != None:
+      labels["partition"] = str(partition_index)
+    return labels
+
+  @staticmethod
+  def _get_byte_count(response, stream: bool) -> Optional[int]:
+    """Returns the size of the response body, from Content-Length if the body isn't read yet. None if it's unknown."""
+    if not stream:
+      return len(response.content)
+    content_length = response.headers.get("Content-Length")
+    return int(content_length) if content_length != None and content_length.isdigit() else None
+
+  def _create_response_obj(self, response_data: requests.Response, response_type: ResponseType, result_type: ResultType = ResultType.DEFAULT, partition_index: Optional[int] = None):
+    perf_ses_id = self.perf_mon.start_session(SessionType.PROCESS, **self._get_session_labels(partition_index))
+    if response_type == ResponseType.JSON and result_type == ResultType.COLUMNAR:
+      response_data = columnar_from_json(self.json_decoder.decode(response_data), self.get_variables())
+
+    elif response_type == ResponseType.JSON and result_type == ResultType.ARROW:
+      variables = self.get_variables()
+      response_data = arrow_batch_from_columnar(columnar_from_json(self.json_decoder.decode(response_data), variables), variables)
+
+    elif response_type == ResponseType.JSONSTAT2 and result_type == ResultType.ARROW:
+      variables = self.get_variables()
+      response_data = arrow_batch_from_columnar(columnar_from_jsonstat2(self.json_decoder.decode(response_data), variables), variables)
+
+    elif response_type == ResponseType.JSONSTAT2:
+      # JSON-stat2 has no rows to create, DEFAULT and COLUMNAR results are both columnar
+      response_data = columnar_from_jsonstat2(self.json_decoder.decode(response_data), self.get_variables())
+
+    elif response_type == ResponseType.JSON:
+      json_data = self.json_decoder.decode(response_data)
       response_data = SCBJsonResponse(
         columns = json_data["columns"],
         comments = json_data["comments"],
-        data = [
-          SCBJsonResponseDataPoint(
-            datapoint["key"], 
-            datapoint["values"]
-          ) 
-          for datapoint 
-          in json_data["data"]
-        ]
+        data = self.json_decoder.create_data_points(json_data["data"], self._get_key_vocabularies(json_data["columns"]))
       )
     
     elif response_type == ResponseType.CSV:
-      # SCB sometimes has headers with a comma (,) in them which is mad.
-      # Attempt to counter this with assuming ", " is not a delimiter.
-      content = response_data.content \
-                  .decode("latin-1") \
-                  .replace("\"", "") \
-                  .replace("'", "") \
-                  .replace(", ", " ")
-      lines = content.strip().split("\r\n")
-      headers = lines[0].split(",")
-      response_data = []
-      for line in lines[1:]:
-        l = line.strip()
-        datapoint = {}
-        for i, value in enumerate(l.split(",")):
-          datapoint[headers[i]] = value
-        response_data.append(datapoint)
+      # SCB sometimes has quoted headers with a comma (,) in them, the parser handles quoting properly.
+      response_data = list(iter_csv_rows(response_data.iter_content(chunk_size = self._CSV_CHUNK_SIZE), key_headers = self._get_csv_key_headers()))
       
     else:
       raise NotImplementedError("This response type is not supported yet.")
@@ -242,89 +715,156 @@ class SCBClient:
       ))
     return scb_query
 
+  def _get_partition_variable_code(self, query: SCBQuery) -> str:
+    """Returns the code of the variable the query is partitioned by, see __get_preferred_partition_variable_or_default()."""
+    return self.__get_preferred_partition_variable_or_default(query).code
+
   def __get_preferred_partition_variable_or_default(self, query: SCBQuery) -> SCBQueryVariable:
-    """Returns the preferred partition variable if any, defaults to variable in query with most values."""
-    if self._preferred_partition_variable_code != None:
-      return [queryvar for queryvar in query.query if queryvar.code == self._preferred_partition_variable_code][0]
+    """Returns the preferred partition variable if any and it's in the query, defaults to variable in query with most values."""
+    preferred_variables = [queryvar for queryvar in query.query if queryvar.code == self._preferred_partition_variable_code]
+    if preferred_variables:
+      return preferred_variables[0]
     
-    variables = query.query
-    variables.sort(key = lambda qv: len(qv.selection.values), reverse = True)
+    # sorted() is stable and leaves the order of the query as it is
+    variables = sorted(query.query, key = lambda qv: len(qv.selection.values), reverse = True)
     return variables[0]
   
-  def __get_partition_values_per_request(self, query: SCBQuery, partition_variable: SCBQueryVariable) -> int:
-    """Calculates how many values from the partition variable can be included in the request
-    without exceeding SCB limit."""
-    estimated_count_per_value = self.estimate_cell_count(query) / len(partition_variable.selection.values)
-    if estimated_count_per_value > self._SCB_LIMIT_RESULT:
-      raise ValueError(f"Can't partition by {partition_variable.code}, each partition would exceed SCB limit ({int(estimated_count_per_value)} > {self._SCB_LIMIT_RESULT}).")
-    values_per_partition = math.floor(self._SCB_LIMIT_RESULT / estimated_count_per_value)
-    return values_per_partition
-
   @classmethod
   def create_and_validate_client(cls, area: str, category: str, category_specification: str, table: str, **kwargs):
     """Validates that the area, category, category_specification and table is valid.
-        Requires 4 light-weight requests to SCB."""
-    if "session" in kwargs:
-      s = kwargs["session"]
+        Requires up to 4 light-weight requests to SCB which are made concurrently, tree nodes are memoised per transport 
+        so clients of tables with the same parents share them, see create_and_validate_clients().
+        A transport can be provided with the transport keyword, or a requests.Session with the session keyword.
+        With a MetadataCache as the metadata_cache keyword the tree is read from the cache when possible, 
+        the cache is kept by the returned client, as is a ResponseCache passed as the response_cache keyword, a Tracer passed as the tracer keyword
+        and a JsonDecoder passed as the json_decoder keyword."""
+    return cls.create_and_validate_clients([(area, category, category_specification, table)], **kwargs)[0]
+
+  @classmethod
+  def create_and_validate_clients(cls, tables: List[Tuple[str, str, str, str]], **kwargs) -> List["SCBClient"]:
+    """
+    Validates many tables and returns a client per table, in the same order.
+    Every distinct tree node that isn't memoised is requested once, concurrently and within the SCB request limit, 
+    so validating many tables costs about one request per unique node. Nodes are memoised per transport for 
+    _TREE_MEMO_TTL_SECONDS, clients using the shared transport (the default) share them process wide.
+    Params:
+      tables: List[Tuple[str, str, str, str]]
+        Tuples of (area, category, category_specification, table).
+      **kwargs
+        Same keywords as create_and_validate_client(), plus rate_limiter and performance_monitor which are shared by the clients.
+    Returns:
+      clients: List[SCBClient]
+    """
+    if "transport" in kwargs:
+      s = kwargs["transport"]
+    elif "session" in kwargs:
+      s = SCBTransport(session = kwargs["session"])
     else:
-      s = requests.Session()
-    perf_mon = PerformanceMonitor()
+      s = SCBTransport.shared()
+    perf_mon = kwargs["performance_monitor"] if "performance_monitor" in kwargs else PerformanceMonitor()
+    rate_limiter = kwargs["rate_limiter"] if "rate_limiter" in kwargs else RateLimiter.shared()
+    metadata_cache = kwargs.get("metadata_cache")
+
+    paths = [cls._get_tree_path(*table) for table in tables]
+    urls = list(dict.fromkeys([url for path in paths for url, _, _ in path]))
+    tree_nodes = {url: cls._get_memoised_tree_nodes(s, url) for url in urls}
+    missing_urls = [url for url in urls if tree_nodes[url] == None]
+    if missing_urls:
+      def get_tree_nodes(url: str) -> Optional[set]:
+        dl_ses_id = perf_mon.start_session(SessionType.DOWNLOAD)
+        response = cls._get_metadata(s, url, metadata_cache, rate_limiter)
+        perf_mon.stop_session(dl_ses_id, len(response.content))
+        return cls._get_tree_node_ids(response)
+
+      with ThreadPoolExecutor(max_workers = min(len(missing_urls), cls._SCB_LIMIT_REQUESTS)) as executor:
+        for url, node_ids in zip(missing_urls, executor.map(get_tree_nodes, missing_urls)):
+          if node_ids != None:
+            cls._memoise_tree_nodes(s, url, node_ids)
+          tree_nodes[url] = node_ids
+
+    # Validated in order so an invalid node is reported before the failed requests for its children
+    for path in paths:
+      for url, node_id, level in path:
+        cls._validate_tree_node(tree_nodes[url], node_id, url, level)
+
+    return [
+      SCBClient(
+        area = area,
+        category = category,
+        category_specification = category_specification,
+        table = table,
+        performance_monitor = perf_mon,
+        rate_limiter = rate_limiter,
+        transport = s,
+        metadata_cache = metadata_cache,
+        response_cache = kwargs.get("response_cache"),
+        tracer = kwargs["tracer"] if "tracer" in kwargs else Tracer(),
+        json_decoder = kwargs["json_decoder"] if "json_decoder" in kwargs else get_json_decoder()
+      )
+      for area, category, category_specification, table in tables
+    ]
 
-    # Validating area
-    dl_ses_id = perf_mon.start_session(SessionType.DOWNLOAD)
-    scb_area_response = s.get(cls._SCB_BASE_URL)
-    dl_ses_id = perf_mon.stop_session(dl_ses_id)
+  @classmethod
+  def _get_tree_path(cls, area: str, category: str, category_specification: str, table: str) -> List[tuple]:
+    """Returns (url, node_id, level) for every level of the tree, the node must be listed at url."""
+    path = []
+    url = cls._SCB_BASE_URL
+    for level, node_id in zip(cls._SCB_TREE_LEVELS, [area, category, category_specification, table]):
+      path.append((url, node_id, level))
+      url = f"{url}/{node_id}"
+    return path
 
-    if scb_area_response.status_code != 200:
-      raise ConnectionError(f"Couldn't reach SCB at {cls._SCB_BASE_URL}")
+  @classmethod
+  def _get_memoised_tree_nodes(cls, transport: Any, url: str) -> Optional[set]:
+    with cls._tree_memo_lock:
+      memo = cls._tree_memo.get(transport, {})
+      if url not in memo:
+        return None
+      fetched, node_ids = memo[url]
+      if time.monotonic() - fetched > cls._TREE_MEMO_TTL_SECONDS:
+        del memo[url]
+        return None
+      return node_ids
 
-    if area not in [scb_area["id"] for scb_area in json.loads(scb_area_response.content.decode("latin-1"))]:
-      raise ValueError(f"{area} doesn't seem to be a valid area, please visit {cls._SCB_BASE_URL} for valid areas.")
+  @classmethod
+  def _memoise_tree_nodes(cls, transport: Any, url: str, node_ids: set) -> None:
+    with cls._tree_memo_lock:
+      cls._tree_memo.setdefault(transport, {})[url] = (time.monotonic(), node_ids)
 
-    _area = area
-    
-    # Validating category
-    dl_ses_id = perf_mon.start_session(SessionType.DOWNLOAD)
-    scb_category_response = s.get(f"{cls._SCB_BASE_URL}/{area}")
-    perf_mon.stop_session(dl_ses_id)
-    if scb_category_response.status_code != 200:
-      raise ConnectionError(f"Couldn't retrieve categories from SCB at {cls._SCB_BASE_URL}/{area}")
-
-    if category not in [scb_category["id"] for scb_category in json.loads(scb_category_response.content.decode("latin-1"))]:
-      raise ValueError(f"{category} doesn't seem to be a valid category, please visit {cls._SCB_BASE_URL}/{area} for valid categories.")
-
-    _category = category
-
-    # Validating category sepcification
-    dl_ses_id = perf_mon.start_session(SessionType.DOWNLOAD)
-    scb_category_specification_response = s.get(f"{cls._SCB_BASE_URL}/{area}/{category}")
-    perf_mon.stop_session(dl_ses_id)
-    if scb_category_specification_response.status_code != 200:
-      raise ConnectionError(f"Couldn't retrieve category specifications from SCB at {cls._SCB_BASE_URL}/{area}/{category}")
-
-    if category_specification not in [scb_category_spec["id"] for scb_category_spec in json.loads(scb_category_specification_response.content.decode("latin-1"))]:
-      raise ValueError(f"{category_specification} doesn't seem to be a valid category specification, please visit {cls._SCB_BASE_URL}/{area}/{category} for valid specifications.")
-
-    _category_spec = category_specification
-
-    # Validating table
-    dl_ses_id = perf_mon.start_session(SessionType.DOWNLOAD)
-    scb_table_response = s.get(f"{cls._SCB_BASE_URL}/{area}/{category}/{category_specification}")
-    perf_mon.stop_session(dl_ses_id)
-    if scb_table_response.status_code != 200:
-      raise ConnectionError(f"Couldn't retrieve tables from SCB at {cls._SCB_BASE_URL}/{area}/{category}/{category_specification}")
-
-    if table not in [scb_table["id"] for scb_table in json.loads(scb_table_response.content.decode("latin-1"))]:
-      raise ValueError(f"{table} doesn't seem to be a valid table, please visit {cls._SCB_BASE_URL}/{area}/{category}/{category_specification} for valid tables.")
-
-    _table = table
-
-    s.close()
-
-    return SCBClient(
-      area = _area,
-      category = _category,
-      category_specification = _category_spec,
-      table = _table,
-      performance_monitor = perf_mon
-    )
\ No newline at end of file
+  @staticmethod
+  def _get_metadata(transport: SCBTransport, url: str, metadata_cache: Optional[MetadataCache] = None, rate_limiter: Optional[RateLimiter] = None):
+    """GETs metadata from SCB, served from and stored in the metadata cache if one is given. 
+    Requests are held back by the rate limiter if one is given."""
+    if metadata_cache != None:
+      content = metadata_cache.get(url)
+      if content != None:
+        return SCBResponse(200, {}, content)
+    if rate_limiter != None:
+      rate_limiter.acquire()
+    response = transport.get(url)
+    if metadata_cache != None and response.status_code == 200:
+      metadata_cache.set(url, response.content)
+    return response
+
+  @staticmethod
+  def _get_tree_node_ids(response) -> Optional[set]:
+    """Returns the ids of the nodes in a tree response, None if the request failed."""
+    if response.status_code != 200:
+      return None
+    return {node["id"] for node in json.loads(response.content.decode("latin-1"))}
+
+  @staticmethod
+  def _validate_tree_node(node_ids: Optional[set], node_id: str, url: str, level: tuple) -> None:
+    """Validates that node_id is one of the nodes listed by SCB at url, level is one of _SCB_TREE_LEVELS. 
+    node_ids is None if they couldn't be retrieved."""
+    level_name, level_plural = level
+    if node_ids == None:
+      raise ConnectionError(f"Couldn't retrieve {level_plural} from SCB at {url}")
+
+    if node_id not in node_ids:
+      raise ValueError(f"{node_id} doesn't seem to be a valid {level_name}, please visit {url} for valid {level_plural}.")
+
+from SCB_Client.async_client import AsyncSCBClient
+from SCB_Client.batch import JobStatus, SCBBatch, SCBJob, SCBJobProgress, SCBJobResult
+from SCB_Client.catalogue import SCBCatalogue, SCBCatalogueEntry
+from SCB_Client.metrics import Metric, MetricSample, MetricsRegistry
@@ -0,0 +1,320 @@
+import asyncio
+from collections import deque
+from functools import partial
+from itertools import islice
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Union
+
+from SCB_Client import SCBClient
+from SCB_Client.model.scb_models import (CachePolicy, ResponseType, ResultType,
+                                         SCBColumnarResponse, SCBCsvRow, SCBJsonResponse, SCBPayloadEstimate,
+                                         SCBQuery, SCBQueryPlan, SCBVariable)
+from SCB_Client.SCBClientUtilities import (AsyncSCBTransport, MetadataCache,
+                                           PerformanceMonitor, RateLimiter,
+                                           ResponseCache,
+                                           SCBResponse, SessionType, SyncStore, Tracer,
+                                           arrow_table_from_batches, get_json_decoder)
+
+if TYPE_CHECKING:
+  import pyarrow # Optional, only ResultType.ARROW needs it
+
+class AsyncSCBClient:
+  """
+  Asyncio version of SCBClient, network bound methods are awaitable and partitions are fetched concurrently on the event loop.
+  Queries are planned and responses are processed by an SCBClient, so both clients return identical results.
+  Pass the same AsyncSCBTransport to every client on an event loop to share connections between tables.
+  """
+
+  def __init__(
+    self,
+    area: str,
+    category: str,
+    category_specification: str,
+    table: str,
+    **kwargs
+    ):
+
+    if "transport" in kwargs:
+      self.transport = kwargs["transport"]
+    else:
+      self.transport = AsyncSCBTransport()
+    # The sync client is only used for planning and processing, it never makes any requests since variables are fetched here.
+    self._client = SCBClient(
+      area,
+      category,
+      category_specification,
+      table,
+      performance_monitor = kwargs["performance_monitor"] if "performance_monitor" in kwargs else PerformanceMonitor(),
+      rate_limiter = kwargs["rate_limiter"] if "rate_limiter" in kwargs else RateLimiter.shared(),
+      metadata_cache = kwargs.get("metadata_cache"),
+      response_cache = kwargs.get("response_cache"),
+      tracer = kwargs["tracer"] if "tracer" in kwargs else Tracer(),
+      json_decoder = kwargs["json_decoder"] if "json_decoder" in kwargs else get_json_decoder()
+    )
+    self._client.set_max_workers(SCBClient._SCB_LIMIT_REQUESTS) # Concurrency on the event loop is cheap, the rate limiter holds requests back
+    self.area = area
+    self.category = category
+    self.category_specification = category_specification
+    self.table = table
+    self.data_url = self._client.data_url
+    self.perf_mon = self._client.perf_mon
+    self.rate_limiter = self._client.rate_limiter
+    self.metadata_cache = self._client.metadata_cache
+    self.response_cache = self._client.response_cache
+    self.tracer = self._client.tracer
+    self.json_decoder = self._client.json_decoder
+
+  async def set_preferred_partition_variable_code(self, variable_code: str) -> None:
+    """preferred_partition_variable_code will be used to partition the requests if the expected result is larger than the SCB limit."""
+    await self.get_variables()
+    self._client.set_preferred_partition_variable_code(variable_code)
+
+  def get_preferred_partition_variable_code(self) -> str:
+    """preferred_partition_variable_code will be used to partition the requests if the expected result is larger than the SCB limit."""
+    return self._client.get_preferred_partition_variable_code()
+
+  def set_size_limit(self, limit: int) -> None:
+    """Size limit is used to protect against unwanted data use, will be ignored if set to 0."""
+    self._client.set_size_limit(limit)
+
+  def get_size_limit(self) -> int:
+    """Size limit is used to protect against unwanted data use, will be ignored if set to 0."""
+    return self._client.get_size_limit()
+
+  def set_max_workers(self, max_workers: int) -> None:
+    """Max workers is the number of partitions that are downloaded concurrently, defaults to the SCB request limit."""
+    self._client.set_max_workers(max_workers)
+
+  def get_max_workers(self) -> int:
+    """Max workers is the number of partitions that are downloaded concurrently, defaults to the SCB request limit."""
+    return self._client.get_max_workers()
+
+  def estimate_cell_count(self, query: SCBQuery) -> int:
+    """Returns the number of "cells" that will be returned with this selection, see SCBClient.estimate_cell_count()."""
+    return self._client.estimate_cell_count(query)
+
+  async def estimate_payload(self, query: SCBQuery) -> Dict[ResponseType, SCBPayloadEstimate]:
+    """See SCBClient.estimate_payload()."""
+    await self.get_variables()
+    return self._client.estimate_payload(query)
+
+  async def choose_response_type(self, query: SCBQuery) -> ResponseType:
+    """See SCBClient.choose_response_type()."""
+    await self.get_variables()
+    return self._client.choose_response_type(query)
+
+  def plan(self, query: SCBQuery) -> SCBQueryPlan:
+    """Returns the partitions get_data() will request for the query, see SCBClient.plan()."""
+    return self._client.plan(query)
+
+  async def get_data(self, query: SCBQuery, result_type: ResultType = ResultType.DEFAULT, cache_policy: CachePolicy = CachePolicy.USE) -> Union[List[SCBJsonResponse], List[SCBColumnarResponse], List[List[SCBCsvRow]], "pyarrow.Table"]:
+    """
+    Get data from SCB if internal limit is not exceeded.
+    Multiple requests will be made concurrently if the SCB limit is exceeded, the responses are returned in partition order.
+    See SCBClient.get_data() for result_type, cache_policy and what's returned.
+    """
+    if result_type == ResultType.ARROW:
+      return arrow_table_from_batches([batch async for batch in self.iter_data(query, result_type, cache_policy)])
+    return [response async for response in self.iter_data(query, result_type, cache_policy)]
+
+  def iter_data(self, query: SCBQuery, result_type: ResultType = ResultType.DEFAULT, cache_policy: CachePolicy = CachePolicy.USE) -> AsyncIterator[Any]:
+    """
+    Same as get_data() but yields every partition, in partition order, as soon as it's downloaded and processed.
+    At most max workers partitions are downloaded ahead of the one being consumed, which keeps memory bounded.
+    The size limit is checked before the iterator is returned, use it with async for.
+    """
+    partition_queries = self._client._get_partition_queries(query)
+    # AUTO picks the format and columnar results are created from the variables, the sync client would fetch them on the event loop
+    load_variables = query.response_type in (ResponseType.AUTO, ResponseType.JSONSTAT2) or result_type in (ResultType.COLUMNAR, ResultType.ARROW)
+    return self.__iter_partitions(partition_queries, self.__create_fetch_partition(query, result_type, cache_policy), load_variables)
+
+  async def write_data(self, query: SCBQuery, sink: Any, cache_policy: CachePolicy = CachePolicy.USE) -> int:
+    """Writes every partition to the sink as soon as it's downloaded, see SCBClient.write_data()."""
+    fetch_partition = self.__create_fetch_partition(query, ResultType.COLUMNAR, cache_policy)
+    partition_queries = self._client._get_partition_queries(query)
+    variables = await self.get_variables()
+    partition_ids = iter([ResponseCache.create_key(self.data_url, partition_query) for partition_query in partition_queries])
+    loop = asyncio.get_running_loop()
+    row_count = 0
+    async for response in self.__iter_partitions(partition_queries, fetch_partition):
+      row_count += await loop.run_in_executor(None, sink.write, next(partition_ids), response, variables)
+    return row_count
+
+  def __create_fetch_partition(self, query: SCBQuery, result_type: ResultType, cache_policy: CachePolicy) -> Callable[[SCBQuery], Awaitable]:
+    self._client._validate_result_type(query, result_type)
+    if not isinstance(cache_policy, CachePolicy):
+      raise TypeError("Cache policy need to be one of type CachePolicy, e.g. CachePolicy.USE.")
+    partition_variable_code = self._client._get_partition_variable_code(query) if self.response_cache != None else None
+    return partial(self.__fetch_partition, result_type = result_type, cache_policy = cache_policy, partition_variable_code = partition_variable_code)
+
+  async def sync(self, query: SCBQuery, store: SyncStore, cache_policy: CachePolicy = CachePolicy.USE) -> List[SCBJsonResponse]:
+    """Appends the periods that are newer than the last sync of the query to the store, see SCBClient.sync()."""
+    await self.get_variables()
+    sync_query, signature = self._client._create_sync_query(query, store)
+    if sync_query == None:
+      return []
+    responses = await self.get_data(sync_query, cache_policy = cache_policy)
+    await asyncio.get_running_loop().run_in_executor(
+      None, store.append, signature, self.data_url, responses, self._client._get_last_time_value(sync_query)
+    )
+    return responses
+
+  async def get_sync_signature(self, query: SCBQuery) -> str:
+    """Returns the signature the query is synced under, see SCBClient.get_sync_signature()."""
+    await self.get_variables()
+    return self._client.get_sync_signature(query)
+
+  async def __iter_partitions(self, partition_queries: List[SCBQuery], fetch_partition: Callable[[SCBQuery], Awaitable], load_variables: bool = False) -> AsyncIterator[Any]:
+    if load_variables:
+      await self.get_variables()
+    remaining_queries = enumerate(partition_queries)
+    in_flight = deque([asyncio.create_task(fetch_partition(partition_query, i)) for i, partition_query in islice(remaining_queries, self.get_max_workers())])
+    try:
+      while in_flight:
+        response = await in_flight.popleft()
+        next_query = next(remaining_queries, None)
+        if next_query != None:
+          in_flight.append(asyncio.create_task(fetch_partition(next_query[1], next_query[0])))
+        yield response
+    finally:
+      # The consumer stopped early or a partition failed, no need to finish the downloads
+      for task in in_flight:
+        task.cancel()
+
+  async def create_query(self, variable_selection: Optional[dict[str, list]] = None, response_type: ResponseType = ResponseType.JSON, time_top: int = 0) -> SCBQuery:
+    """See SCBClient.create_query()."""
+    await self.get_variables()
+    return self._client.create_query(variable_selection, response_type, time_top)
+
+  async def get_variables(self) -> List[SCBVariable]:
+    """Returns cached variables with possible values if exists, otherwhise fetch, cache and return.
+    The metadata cache is used before fetching if the client has one."""
+    if self._client._variables != None:
+      return self._client._variables
+    response = await self._get_metadata(self.transport, self.data_url, self.metadata_cache, self.rate_limiter)
+    variables = [SCBVariable(**var) for var in response.json()["variables"]]
+    self._client._variables = variables # cache it, the sync client will use it from now on
+    return variables
+
+  async def close(self) -> None:
+    await self.transport.close()
+
+  async def __aenter__(self) -> "AsyncSCBClient":
+    return self
+
+  async def __aexit__(self, *args) -> None:
+    await self.close()
+
+  async def __fetch_partition(self, query: SCBQuery, partition_index: Optional[int] = None, result_type: ResultType = ResultType.DEFAULT, cache_policy: CachePolicy = CachePolicy.USE, partition_variable_code: Optional[str] = None) -> SCBJsonResponse:
+    wire_query = self._client._get_wire_query(query)
+    if self._client._can_use_slices(wire_query, cache_policy, partition_variable_code):
+      response = await self.__download_slices(wire_query, cache_policy, partition_variable_code, partition_index)
+    else:
+      response = await self._download(wire_query, cache_policy, partition_index)
+    # Parsing is CPU bound, it runs in the default executor so other partitions keep downloading
+    return await asyncio.get_running_loop().run_in_executor(
+      None, self._client._process_response, response, query, wire_query, result_type, partition_index
+    )
+
+  async def __download_slices(self, query: SCBQuery, cache_policy: CachePolicy, partition_variable_code: str, partition_index: Optional[int] = None) -> SCBResponse:
+    """See SCBClient._create_slice_download(), the cache is read and written in the default executor."""
+    loop = asyncio.get_running_loop()
+    download = self._client._create_slice_download(query, cache_policy, partition_variable_code)
+    missing_query, response = await loop.run_in_executor(None, self._client._resume_download, download)
+    while missing_query != None:
+      response = await self._download(missing_query, CachePolicy.BYPASS, partition_index)
+      missing_query, response = await loop.run_in_executor(None, self._client._resume_download, download, response)
+    return response
+
+  async def _download(self, query: SCBQuery, cache_policy: CachePolicy = CachePolicy.USE, partition_index: Optional[int] = None) -> SCBResponse:
+    """See SCBClient._download(), the cache is read and written in the default executor."""
+    loop = asyncio.get_running_loop()
+    cache_key = None
+    if self.response_cache != None:
+      cache_key, response = await loop.run_in_executor(None, self._client._get_cached_response, query, cache_policy)
+      if response != None:
+        return response
+
+    labels = self._client._get_session_labels(partition_index)
+    attempt = 0
+    while True:
+      with self.tracer.span("scb.rate_limit_wait", table = self.table, partition_index = partition_index):
+        await self.rate_limiter.acquire_async()
+      with self._client._create_attempt_span(query, partition_index, attempt) as span:
+        dl_ses_id = self.perf_mon.start_session(SessionType.DOWNLOAD, **labels)
+        response = await self.transport.post(self.data_url, json = query.to_dict())
+        self.perf_mon.stop_session(dl_ses_id, len(response.content))
+        span.set_attribute("status_code", response.status_code)
+        span.set_attribute("response_bytes", len(response.content))
+      if not self._client._should_retry(response, attempt, labels):
+        break
+      attempt += 1
+
+    if cache_key != None:
+      await loop.run_in_executor(None, self._client._cache_response, cache_key, response)
+    return response
+
+  @classmethod
+  async def create_and_validate_client(cls, area: str, category: str, category_specification: str, table: str, **kwargs):
+    """Validates that the area, category, category_specification and table is valid.
+        Requires up to 4 light-weight requests to SCB which are made concurrently, tree nodes are memoised per transport.
+        A transport can be provided with the transport keyword, it's kept by the returned client.
+        See SCBClient.create_and_validate_client() for the metadata_cache, response_cache, tracer and json_decoder keywords,
+        the tree requests are held back by the rate limiter (rate_limiter keyword) which is kept by the returned client."""
+    if "transport" in kwargs:
+      transport = kwargs["transport"]
+    else:
+      transport = AsyncSCBTransport()
+    perf_mon = PerformanceMonitor()
+    rate_limiter = kwargs["rate_limiter"] if "rate_limiter" in kwargs else RateLimiter.shared()
+
+    async def get_tree_nodes(url: str) -> Optional[set]:
+      node_ids = SCBClient._get_memoised_tree_nodes(transport, url)
+      if node_ids != None:
+        return node_ids
+      dl_ses_id = perf_mon.start_session(SessionType.DOWNLOAD)
+      response = await cls._get_metadata(transport, url, kwargs.get("metadata_cache"), rate_limiter)
+      perf_mon.stop_session(dl_ses_id, len(response.content))
+      node_ids = SCBClient._get_tree_node_ids(response)
+      if node_ids != None:
+        SCBClient._memoise_tree_nodes(transport, url, node_ids)
+      return node_ids
+
+    path = SCBClient._get_tree_path(area, category, category_specification, table)
+    try:
+      tree_nodes = await asyncio.gather(*[get_tree_nodes(url) for url, _, _ in path])
+      for (url, node_id, level), node_ids in zip(path, tree_nodes):
+        SCBClient._validate_tree_node(node_ids, node_id, url, level)
+    except Exception:
+      if "transport" not in kwargs:
+        await transport.close()
+      raise
+
+    return cls(
+      area = area,
+      category = category,
+      category_specification = category_specification,
+      table = table,
+      performance_monitor = perf_mon,
+      rate_limiter = rate_limiter,
+      transport = transport,
+      metadata_cache = kwargs.get("metadata_cache"),
+      response_cache = kwargs.get("response_cache"),
+      tracer = kwargs["tracer"] if "tracer" in kwargs else Tracer(),
+      json_decoder = kwargs["json_decoder"] if "json_decoder" in kwargs else get_json_decoder()
+    )
+
+  @staticmethod
+  async def _get_metadata(transport: AsyncSCBTransport, url: str, metadata_cache: Optional[MetadataCache] = None, rate_limiter: Optional[RateLimiter] = None):
+    """GETs metadata from SCB, served from and stored in the metadata cache if one is given.
+    Requests are held back by the rate limiter if one is given, the cache is read and written in the default executor."""
+    loop = asyncio.get_running_loop()
+    if metadata_cache != None:
+      content = await loop.run_in_executor(None, metadata_cache.get, url)
+      if content != None:
+        return SCBResponse(200, {}, content)
+    if rate_limiter != None:
+      await rate_limiter.acquire_async()
+    response = await transport.get(url)
+    if metadata_cache != None and response.status_code == 200:
+      await loop.run_in_executor(None, metadata_cache.set, url, response.content)
+    return response
@@ -0,0 +1,177 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from threading import Lock
+from typing import Any, Callable, List, Optional
+
+from SCB_Client import SCBClient
+from SCB_Client.model.scb_models import CachePolicy, ResultType, SCBQuery
+from SCB_Client.SCBClientUtilities import ResponseCache, arrow_table_from_batches
+
+class JobStatus(Enum):
+  PENDING = "pending"
+  RUNNING = "running"
+  DONE = "done"
+  FAILED = "failed" # Planning or a partition failed, the remaining partitions of the job are skipped
+
+@dataclass
+class SCBJob:
+  """
+  A query against the table of client, see SCBBatch.
+  name defaults to the table id, a job with a sink writes its partitions to it (see SCBClient.write_data()) instead of returning them.
+  """
+  client: SCBClient
+  query: SCBQuery
+  name: Optional[str] = None
+  deadline: Optional[datetime] = None
+  result_type: ResultType = ResultType.DEFAULT
+  cache_policy: CachePolicy = CachePolicy.USE
+  sink: Any = None
+
+@dataclass
+class SCBJobProgress:
+  name: str
+  status: JobStatus
+  partitions_done: int
+  partitions_total: int
+  cells_done: int
+  cells_total: int
+
+  def fraction_done(self) -> float:
+    """Share of the job's cells that are downloaded, 1 if the job has no cells."""
+    return self.cells_done / self.cells_total if self.cells_total > 0 else 1.0
+
+@dataclass
+class SCBJobResult:
+  """data is what get_data() would return for the job, or the number of rows written if the job has a sink. None if the job failed."""
+  name: str
+  data: Any
+  error: Optional[Exception] = None
+
+class SCBBatch:
+  """
+  Fetches the partitions of many jobs, usually one per table, through one scheduler so a single request budget is shared by all tables.
+  Every job is planned up front, then partitions are downloaded concurrently in job priority order:
+  jobs with the earliest deadline first, jobs without a deadline last, and larger jobs before smaller ones.
+  Requests are held back by the rate limiter of every job's client, which is RateLimiter.shared() unless another one was given.
+  Params:
+    jobs: List[SCBJob]
+    max_workers: int = 30 (keyword)
+      Number of partitions that are downloaded concurrently, across all jobs.
+    on_progress: Callable[[SCBJobProgress], None] (keyword)
+      Called whenever a partition of a job is done or the job fails.
+  """
+
+  def __init__(self, jobs: List[SCBJob], **kwargs):
+    if "max_workers" in kwargs:
+      max_workers = kwargs["max_workers"]
+      if not isinstance(max_workers, int) or max_workers < 1 or max_workers > SCBClient._SCB_LIMIT_REQUESTS:
+        raise ValueError(f"Max workers must be an integer between 1 and {SCBClient._SCB_LIMIT_REQUESTS}.")
+      self.max_workers = max_workers
+    else:
+      self.max_workers = SCBClient._SCB_LIMIT_REQUESTS
+    self.on_progress: Optional[Callable[[SCBJobProgress], None]] = kwargs.get("on_progress")
+    self.jobs = jobs
+    self.__progress = [
+      SCBJobProgress(job.name if job.name != None else job.client.table, JobStatus.PENDING, 0, 0, 0, 0)
+      for job in jobs
+    ]
+    self.__lock = Lock()
+
+  def get_progress(self) -> List[SCBJobProgress]:
+    """Returns a snapshot of the progress of every job, in the order of the jobs. Can be called from other threads while running."""
+    with self.__lock:
+      return [SCBJobProgress(**vars(progress)) for progress in self.__progress]
+
+  def run(self) -> List[SCBJobResult]:
+    """Plans and fetches every job, a failing job doesn't stop the others. Returns the results in the order of the jobs."""
+    partitions: List[List[SCBQuery]] = []
+    fetchers: List[Optional[Callable]] = []
+    partition_data: list = [0 if job.sink != None else {} for job in self.jobs] # Rows written or partitions by index
+    results = [SCBJobResult(progress.name, None) for progress in self.__progress]
+    for i, job in enumerate(self.jobs):
+      try:
+        result_type = ResultType.COLUMNAR if job.sink != None else job.result_type
+        fetch_partition = job.client._create_fetch_partition(job.query, result_type, job.cache_policy)
+        partition_queries = job.client._get_partition_queries(job.query)
+      except Exception as e:
+        fetchers.append(None)
+        partitions.append([])
+        results[i].error = e
+        self.__update(i, status = JobStatus.FAILED)
+        continue
+      fetchers.append(fetch_partition)
+      partitions.append(partition_queries)
+      self.__update(i, partitions_total = len(partition_queries), cells_total = job.client.estimate_cell_count(job.query))
+
+    # Scheduled in priority order, the partitions of a job stay in partition order
+    ranked_jobs = sorted(
+      [i for i in range(len(self.jobs)) if fetchers[i] != None],
+      key = lambda i: (self.jobs[i].deadline == None, self.jobs[i].deadline or datetime.min, -self.__progress[i].cells_total)
+    )
+    queue = iter([(i, p) for i in ranked_jobs for p in range(len(partitions[i]))])
+
+    with ThreadPoolExecutor(max_workers = self.max_workers) as executor:
+      in_flight = {}
+
+      def submit_next() -> None:
+        for i, p in queue:
+          if results[i].error != None:
+            continue # Skip the remaining partitions of failed jobs
+          if self.__progress[i].status == JobStatus.PENDING:
+            self.__update(i, status = JobStatus.RUNNING)
+          in_flight[executor.submit(fetchers[i], partitions[i][p], p)] = (i, p)
+          return
+
+      for _ in range(self.max_workers):
+        submit_next()
+      while in_flight:
+        done, _ = wait(in_flight, return_when = FIRST_COMPLETED)
+        for future in done:
+          i, p = in_flight.pop(future)
+          self.__handle_partition(i, p, future, partitions, partition_data, results)
+          submit_next()
+
+    for i, job in enumerate(self.jobs):
+      if results[i].error != None:
+        continue
+      if job.sink != None:
+        results[i].data = partition_data[i]
+        continue
+      data = [partition_data[i][p] for p in range(len(partitions[i]))]
+      results[i].data = arrow_table_from_batches(data) if job.result_type == ResultType.ARROW else data
+    return results
+
+  def __handle_partition(self, i: int, p: int, future, partitions: List[List[SCBQuery]], partition_data: list, results: List[SCBJobResult]) -> None:
+    job = self.jobs[i]
+    if results[i].error != None:
+      return # Already failed by another partition
+    try:
+      response = future.result()
+      if job.sink != None:
+        partition_id = ResponseCache.create_key(job.client.data_url, partitions[i][p])
+        partition_data[i] += job.sink.write(partition_id, response, job.client.get_variables())
+      else:
+        partition_data[i][p] = response
+    except Exception as e:
+      results[i].error = e
+      partition_data[i] = {} # Release the partitions that were already downloaded
+      self.__update(i, status = JobStatus.FAILED)
+      return
+    progress = self.__progress[i]
+    partitions_done = progress.partitions_done + 1
+    self.__update(
+      i,
+      partitions_done = partitions_done,
+      cells_done = progress.cells_done + job.client.estimate_cell_count(partitions[i][p]),
+      status = JobStatus.DONE if partitions_done == progress.partitions_total else JobStatus.RUNNING
+    )
+
+  def __update(self, i: int, **changes) -> None:
+    with self.__lock:
+      for key, value in changes.items():
+        setattr(self.__progress[i], key, value)
+      snapshot = SCBJobProgress(**vars(self.__progress[i]))
+    if self.on_progress != None:
+      self.on_progress(snapshot)
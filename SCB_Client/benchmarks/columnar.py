@@ -0,0 +1,75 @@
+"""
+Compares SCBColumnarResponse with the default SCBJsonResponse, both created from the raw JSON body.
+Retained memory is what's left once the decoded JSON is released, i.e. the size of the result.
+Run with python -m SCB_Client.benchmarks.columnar
+"""
+import json
+import tracemalloc
+from time import perf_counter
+from typing import Callable, Dict, List
+
+from SCB_Client.model.scb_models import SCBJsonResponse, SCBJsonResponseDataPoint, SCBVariable
+from SCB_Client.SCBClientUtilities import columnar_from_json
+
+def create_json_data(regions: int = 312, ages: int = 101, periods: int = 5) -> dict:
+  """Synthetic decoded response shaped like BefolkManad, the default is about 157k cells."""
+  return {
+    "columns": [
+      {"code": "Region", "text": "region", "type": "d"},
+      {"code": "Alder", "text": "ålder", "type": "d"},
+      {"code": "Tid", "text": "månad", "type": "t"},
+      {"code": "BE0101N1", "text": "Folkmängd", "type": "c"}
+    ],
+    "comments": [],
+    "data": [
+      {"key": [f"{region:04}", str(age), f"2005M{period + 1:02}"], "values": [".." if age == 100 else str(region * age + period)]}
+      for region in range(regions) for age in range(ages) for period in range(periods)
+    ]
+  }
+
+def create_variables(regions: int = 312, ages: int = 101, periods: int = 5) -> List[SCBVariable]:
+  region_values = [f"{region:04}" for region in range(regions)]
+  age_values = [str(age) for age in range(ages)]
+  time_values = [f"2005M{period + 1:02}" for period in range(periods)]
+  return [
+    SCBVariable("Region", "region", region_values, region_values),
+    SCBVariable("Alder", "ålder", age_values, age_values),
+    SCBVariable("Tid", "månad", time_values, time_values, False, True)
+  ]
+
+def to_json_response(json_data: dict) -> SCBJsonResponse:
+  """The default conversion done by SCBClient."""
+  return SCBJsonResponse(
+    columns = json_data["columns"],
+    comments = json_data["comments"],
+    data = [SCBJsonResponseDataPoint(datapoint["key"], datapoint["values"]) for datapoint in json_data["data"]]
+  )
+
+def measure(convert: Callable, repeats: int = 3) -> dict:
+  timings = []
+  for _ in range(repeats):
+    start = perf_counter()
+    convert()
+    timings.append(perf_counter() - start)
+  tracemalloc.start()
+  result = convert()
+  retained, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  del result
+  return {"seconds": min(timings), "retained_mb": retained / 1e6, "peak_mb": peak / 1e6}
+
+def run() -> Dict[str, dict]:
+  body = json.dumps(create_json_data()).encode()
+  variables = create_variables()
+  results = {
+    "SCBJsonResponse": measure(lambda: to_json_response(json.loads(body))),
+    "SCBColumnarResponse": measure(lambda: columnar_from_json(json.loads(body), variables))
+  }
+  print(f"Body: {len(body) / 1e6:.1f} MB")
+  print(f"{'result':<22}{'seconds':>10}{'retained MB':>14}{'peak MB':>10}")
+  for name, result in results.items():
+    print(f"{name:<22}{result['seconds']:>10.3f}{result['retained_mb']:>14.1f}{result['peak_mb']:>10.1f}")
+  return results
+
+if __name__ == "__main__":
+  run()
@@ -0,0 +1,79 @@
+"""
+Compares the streaming CSV parser with the previous whole-body implementation.
+Run with python -m SCB_Client.benchmarks.csv_parsing
+"""
+import tracemalloc
+from time import perf_counter
+from typing import Callable, Dict, List
+
+from SCB_Client.SCBClientUtilities import iter_csv_rows
+
+CHUNK_SIZE = 65536
+
+def legacy_parse_csv(content: bytes) -> List[Dict[str, str]]:
+  """The CSV parsing used by SCBClient before the streaming parser."""
+  content = content \
+              .decode("latin-1") \
+              .replace("\"", "") \
+              .replace("'", "") \
+              .replace(", ", " ")
+  lines = content.strip().split("\r\n")
+  headers = lines[0].split(",")
+  response_data = []
+  for line in lines[1:]:
+    l = line.strip()
+    datapoint = {}
+    for i, value in enumerate(l.split(",")):
+      datapoint[headers[i]] = value
+    response_data.append(datapoint)
+  return response_data
+
+def streaming_parse_csv(content: bytes) -> List[Dict[str, str]]:
+  return list(iter_csv_rows(content[i:i + CHUNK_SIZE] for i in range(0, len(content), CHUNK_SIZE)))
+
+def streaming_count_rows(content: bytes) -> int:
+  """Rows are consumed one at a time, e.g. written to storage, and never collected."""
+  return sum(1 for _ in iter_csv_rows(content[i:i + CHUNK_SIZE] for i in range(0, len(content), CHUNK_SIZE)))
+
+def create_csv_body(regions: int = 312, ages: int = 101, periods: int = 5) -> bytes:
+  """Synthetic response shaped like BefolkManad, the default is about 157k cells."""
+  headers = ["region", "ålder"] + [f"Folkmängden per månad 2005M{period + 1:02}" for period in range(periods)]
+  lines = [",".join(f'"{header}"' for header in headers)]
+  for region in range(regions):
+    for age in range(ages):
+      values = ",".join(str(100000 + region * ages + age + period) for period in range(periods))
+      lines.append(f'"{region:02} Region {region}","{age} år",{values}')
+  return ("\r\n".join(lines) + "\r\n").encode("latin-1")
+
+def measure(parse: Callable, content: bytes, repeats: int = 3) -> dict:
+  timings = []
+  for _ in range(repeats):
+    start = perf_counter()
+    parse(content)
+    timings.append(perf_counter() - start)
+  tracemalloc.start()
+  parse(content)
+  _, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  best = min(timings)
+  return {
+    "seconds": best,
+    "mb_per_second": len(content) / best / 1e6,
+    "peak_mb": peak / 1e6
+  }
+
+def run() -> Dict[str, dict]:
+  content = create_csv_body()
+  results = {
+    "legacy": measure(legacy_parse_csv, content),
+    "streaming": measure(streaming_parse_csv, content),
+    "streaming (consumed)": measure(streaming_count_rows, content)
+  }
+  print(f"CSV body: {len(content) / 1e6:.1f} MB")
+  print(f"{'implementation':<22}{'seconds':>10}{'MB/s':>10}{'peak MB':>10}")
+  for name, result in results.items():
+    print(f"{name:<22}{result['seconds']:>10.3f}{result['mb_per_second']:>10.1f}{result['peak_mb']:>10.1f}")
+  return results
+
+if __name__ == "__main__":
+  run()
@@ -0,0 +1,66 @@
+"""
+Compares the JSON decoders with the previous decoding of JSON responses, for a response of 150k cells.
+Run with python -m SCB_Client.benchmarks.json_decoding
+"""
+import tracemalloc
+from time import perf_counter
+from typing import Callable, Dict, List
+
+from SCB_Client.benchmarks.mock_server import SyntheticTable
+from SCB_Client.model.scb_models import SCBJsonResponseDataPoint
+from SCB_Client.SCBClientUtilities import JsonDecoder, OrjsonDecoder, SCBResponse
+
+def legacy_decode(response: SCBResponse) -> List[SCBJsonResponseDataPoint]:
+  """The decoding used by SCBClient before JsonDecoder, from the text of the response with an object per row created in a loop."""
+  json_data = response.json()
+  return [SCBJsonResponseDataPoint(datapoint["key"], datapoint["values"]) for datapoint in json_data["data"]]
+
+def create_decode(decoder: JsonDecoder) -> Callable[[SCBResponse], object]:
+  return lambda response: decoder.create_data_points(decoder.decode(response)["data"])
+
+def create_json_body(regions: int = 300, ages: int = 100, periods: int = 5) -> bytes:
+  """JSON response of the synthetic table of the benchmark suite, the default is 150k cells."""
+  table = SyntheticTable({"Region": regions, "Alder": ages, "Tid": periods})
+  return table.create_data({var.code: var.values for var in table.variables[:3]}, "json")
+
+def measure(decode: Callable, response: SCBResponse, repeats: int = 5) -> dict:
+  timings = []
+  for _ in range(repeats):
+    start = perf_counter()
+    decode(response)
+    timings.append(perf_counter() - start)
+  tracemalloc.start()
+  decode(response)
+  _, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  best = min(timings)
+  return {
+    "seconds": best,
+    "mb_per_second": len(response.content) / best / 1e6,
+    "peak_mb": peak / 1e6
+  }
+
+def run() -> Dict[str, dict]:
+  response = SCBResponse(200, {}, create_json_body())
+  decoders = {
+    "legacy": legacy_decode,
+    "json": create_decode(JsonDecoder()),
+    "json (lazy rows)": create_decode(JsonDecoder(lazy_rows = True)),
+    "json (paused gc)": create_decode(JsonDecoder(pause_gc = True))
+  }
+  try:
+    decoders["orjson"] = create_decode(OrjsonDecoder())
+    decoders["orjson (lazy rows)"] = create_decode(OrjsonDecoder(lazy_rows = True))
+    decoders["orjson (paused gc)"] = create_decode(OrjsonDecoder(pause_gc = True))
+  except ImportError:
+    print("orjson isn't installed, install it with pip install orjson to compare it.")
+  results = {name: measure(decode, response) for name, decode in decoders.items()}
+  print(f"JSON body: {len(response.content) / 1e6:.1f} MB")
+  print(f"{'implementation':<22}{'seconds':>10}{'MB/s':>10}{'peak MB':>10}{'speedup':>10}")
+  for name, result in results.items():
+    speedup = results["legacy"]["seconds"] / result["seconds"]
+    print(f"{name:<22}{result['seconds']:>10.3f}{result['mb_per_second']:>10.1f}{result['peak_mb']:>10.1f}{speedup:>9.1f}x")
+  return results
+
+if __name__ == "__main__":
+  run()
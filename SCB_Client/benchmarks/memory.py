@@ -0,0 +1,87 @@
+"""
+Measures the memory held per row by parsed responses of 150k cells, compared with the row types used before
+the slotted models and interned keys.
+Run with python -m SCB_Client.benchmarks.memory
+"""
+import gc
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List
+
+from SCB_Client import ResponseType, SCBClient
+from SCB_Client.benchmarks.mock_server import SyntheticTable
+from SCB_Client.model.scb_models import SCBQueryVariable, SCBQueryVariableSelection
+from SCB_Client.SCBClientUtilities import SCBResponse, SCBTransport, get_json_decoder
+
+@dataclass
+class LegacyDataPoint:
+  """SCBJsonResponseDataPoint before it had __slots__."""
+  key: List[str]
+  values: List[str]
+
+@dataclass
+class LegacyQueryVariableSelection:
+  filter: str
+  values: List[str]
+
+@dataclass
+class LegacyQueryVariable:
+  code: str
+  selection: LegacyQueryVariableSelection
+
+def legacy_json_rows(content: bytes) -> list:
+  json_data = get_json_decoder().loads(content)
+  return [LegacyDataPoint(datapoint["key"], datapoint["values"]) for datapoint in json_data["data"]]
+
+def legacy_csv_rows(content: bytes) -> list:
+  """The rows of the CSV parser before SCBCsvRow, a dict per row."""
+  rows = list(_create_client(None)._create_response_obj(SCBResponse(200, {}, content), ResponseType.CSV))
+  return [dict(zip(row, row.cells())) for row in rows]
+
+def measure_retained(build: Callable[[], Any], count: int) -> dict:
+  """Returns the bytes still allocated by build() once it has returned, in total and per item."""
+  gc.collect()
+  tracemalloc.start()
+  result = build()
+  retained, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  del result
+  return {"bytes": retained, "bytes_per_item": retained / count, "peak_mb": peak / 1e6}
+
+def _create_client(table: SyntheticTable) -> SCBClient:
+  client = SCBClient("BE", "BE0101", "BE0101A", "Synthetic", transport = SCBTransport())
+  client._variables = table.variables if table != None else None # Loaded like after create_query(), no requests are made
+  return client
+
+def run(regions: int = 300, ages: int = 100, periods: int = 5) -> Dict[str, dict]:
+  table = SyntheticTable({"Region": regions, "Alder": ages, "Tid": periods})
+  selection = {var.code: var.values for var in table.variables[:3]}
+  json_content = table.create_data(selection, "json")
+  csv_content = table.create_data(selection, "csv")
+  client = _create_client(table)
+  interning_client = _create_client(table)
+  interning_client.json_decoder = get_json_decoder(intern_keys = True)
+  json_rows = regions * ages * periods
+  csv_rows = regions * ages
+  results = {
+    "json rows (legacy)": measure_retained(lambda: legacy_json_rows(json_content), json_rows),
+    "json rows": measure_retained(lambda: client._create_response_obj(SCBResponse(200, {}, json_content), ResponseType.JSON), json_rows),
+    "json rows (interned keys)": measure_retained(
+      lambda: interning_client._create_response_obj(SCBResponse(200, {}, json_content), ResponseType.JSON), json_rows
+    ),
+    "csv rows (legacy)": measure_retained(lambda: legacy_csv_rows(csv_content), csv_rows),
+    "csv rows": measure_retained(lambda: client._create_response_obj(SCBResponse(200, {}, csv_content), ResponseType.CSV), csv_rows),
+    "query variables (legacy)": measure_retained(
+      lambda: [LegacyQueryVariable("Region", LegacyQueryVariableSelection("item", ["00"])) for _ in range(10000)], 10000
+    ),
+    "query variables": measure_retained(
+      lambda: [SCBQueryVariable("Region", SCBQueryVariableSelection("item", ["00"])) for _ in range(10000)], 10000
+    )
+  }
+  print(f"{'rows':<26}{'MB':>10}{'bytes/item':>12}{'peak MB':>10}")
+  for name, result in results.items():
+    print(f"{name:<26}{result['bytes'] / 1e6:>10.1f}{result['bytes_per_item']:>12.0f}{result['peak_mb']:>10.1f}")
+  return results
+
+if __name__ == "__main__":
+  run()
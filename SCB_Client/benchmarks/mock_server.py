@@ -0,0 +1,347 @@
+"""
+Local stand-in for the SCB API, serving synthetic tables over HTTP so the clients can be tested and benchmarked without the live API.
+Covers the tree and metadata GETs, the data POST (JSON, CSV and JSON-stat2), the cell limit, 429 throttling and latency.
+Run with python -m SCB_Client.benchmarks.mock_server to serve the default table until interrupted.
+"""
+import json
+import math
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import product
+from threading import Lock, Thread
+from time import monotonic, sleep
+from typing import Dict, List, Optional, Tuple
+
+from SCB_Client import SCBClient
+from SCB_Client.model.scb_models import SCBVariable
+from SCB_Client.SCBClientUtilities import AsyncSCBTransport, SCBTransport
+
+class SyntheticTable():
+  """
+  A table with variables of the given sizes and deterministic values, so responses to the same query are identical.
+  Values of the time variable are months (2000M01, 2000M02, ...), other values are zero padded numbers.
+  Params:
+    sizes: Dict[str, int]
+      Number of values per variable, e.g. {"Region": 300, "Alder": 100, "Tid": 12}.
+    contents: int = 1
+      Number of contents, listed as the variable ContentsCode like SCB does.
+    time_variable: Optional[str] = "Tid"
+      Code of the time variable, must be one of sizes.
+  """
+  _CONTENTS_CODE: str = "ContentsCode"
+
+  def __init__(self, sizes: Dict[str, int], contents: int = 1, time_variable: Optional[str] = "Tid"):
+    if time_variable != None and time_variable not in sizes:
+      raise KeyError(f"Time variable {time_variable} needs to be one of the variables.")
+    self.sizes = sizes
+    self.contents = contents
+    self.time_variable = time_variable
+    self.variables = [self.__create_variable(code, size) for code, size in sizes.items()]
+    content_values = [f"C{i:02}" for i in range(contents)]
+    self.variables.append(SCBVariable(self._CONTENTS_CODE, "tabellinnehåll", content_values, [f"Innehåll {i}" for i in range(contents)]))
+    self.__value_indices = {var.code: {value: i for i, value in enumerate(var.values)} for var in self.variables}
+
+  def get_cell_count(self) -> int:
+    return math.prod([len(var.values) for var in self.variables])
+
+  def create_metadata(self) -> bytes:
+    variables = []
+    for var in self.variables:
+      variable = {"code": var.code, "text": var.text, "values": var.values, "valueTexts": var.valueTexts}
+      if var.time:
+        variable["time"] = True
+      elif var.code != self._CONTENTS_CODE:
+        variable["elimination"] = True
+      variables.append(variable)
+    return json.dumps({"title": "Synthetic table", "variables": variables}).encode()
+
+  def create_data(self, selection: Dict[str, List[str]], response_format: str) -> bytes:
+    """Returns the body for the selection, variables that aren't selected are eliminated and every content is returned if none is selected."""
+    key_variables = [var for var in self.variables if var.code in selection and var.code != self._CONTENTS_CODE]
+    contents = self.variables[-1]
+    content_indices = [self.__value_indices[contents.code][value] for value in selection.get(self._CONTENTS_CODE, contents.values)]
+    key_indices = [[self.__value_indices[var.code][value] for value in selection[var.code]] for var in key_variables]
+    if response_format == "csv":
+      return self.__create_csv(key_variables, key_indices, content_indices)
+    if response_format == "json-stat2":
+      return self.__create_jsonstat2(key_variables, key_indices, content_indices)
+    return self.__create_json(key_variables, key_indices, content_indices)
+
+  def __create_json(self, key_variables: List[SCBVariable], key_indices: List[List[int]], content_indices: List[int]) -> bytes:
+    contents = self.variables[-1]
+    columns = [{"code": var.code, "text": var.text, "type": "t" if var.time else "d"} for var in key_variables]
+    columns += [{"code": contents.values[i], "text": contents.valueTexts[i], "type": "c"} for i in content_indices]
+    data = [
+      {
+        "key": [var.values[i] for var, i in zip(key_variables, indices)],
+        "values": [self.__create_value(indices, content) for content in content_indices]
+      }
+      for indices in product(*key_indices)
+    ]
+    return json.dumps({"columns": columns, "comments": [], "data": data}, ensure_ascii = False).encode("utf-8")
+
+  def __create_csv(self, key_variables: List[SCBVariable], key_indices: List[List[int]], content_indices: List[int]) -> bytes:
+    # Like SCB, the time variable is pivoted into a column per content and period
+    contents = self.variables[-1]
+    row_variables = [(var, indices) for var, indices in zip(key_variables, key_indices) if not var.time]
+    time_variables = [(var, indices) for var, indices in zip(key_variables, key_indices) if var.time]
+    time_indices = time_variables[0][1] if time_variables else [None]
+    headers = [var.text for var, _ in row_variables]
+    for content in content_indices:
+      for time_index in time_indices:
+        headers.append(contents.valueTexts[content] if time_index == None else f"{contents.valueTexts[content]} {time_variables[0][0].values[time_index]}")
+    time_position = key_variables.index(time_variables[0][0]) if time_variables else None
+    lines = [",".join([f'"{header}"' for header in headers])]
+    for row_indices in product(*[indices for _, indices in row_variables]):
+      cells = [f'"{var.values[i]} {var.valueTexts[i]}"' for (var, _), i in zip(row_variables, row_indices)]
+      for content in content_indices:
+        for time_index in time_indices:
+          indices = list(row_indices)
+          if time_position != None:
+            indices.insert(time_position, time_index)
+          cells.append(self.__create_value(indices, content))
+      lines.append(",".join(cells))
+    return ("\r\n".join(lines) + "\r\n").encode("latin-1", errors = "replace")
+
+  def __create_jsonstat2(self, key_variables: List[SCBVariable], key_indices: List[List[int]], content_indices: List[int]) -> bytes:
+    # The cube is ordered like the table variables, the contents last, with null and a status for missing values
+    contents = self.variables[-1]
+    dimensions = [(var, indices) for var, indices in zip(key_variables, key_indices)] + [(contents, content_indices)]
+    values = []
+    status = {}
+    for cell in product(*key_indices, content_indices):
+      value = self.__create_value(cell[:-1], cell[-1])
+      if value == "..":
+        status[str(len(values))] = value
+        values.append(None)
+      else:
+        values.append(int(value))
+    dataset = {
+      "version": "2.0",
+      "class": "dataset",
+      "label": "Synthetic table",
+      "source": "Mock SCB",
+      "id": [var.code for var, _ in dimensions],
+      "size": [len(indices) for _, indices in dimensions],
+      "dimension": {
+        var.code: {
+          "label": var.text,
+          "category": {
+            "index": {var.values[i]: position for position, i in enumerate(indices)},
+            "label": {var.values[i]: var.valueTexts[i] for i in indices}
+          }
+        }
+        for var, indices in dimensions
+      },
+      "role": {"time": [var.code for var in key_variables if var.time], "metric": [contents.code]},
+      "value": values,
+      "status": status
+    }
+    return json.dumps(dataset, ensure_ascii = False).encode("utf-8")
+
+  @staticmethod
+  def __create_value(indices, content: int) -> str:
+    value = content * 7 + sum([(position + 1) * index for position, index in enumerate(indices)])
+    return ".." if value % 97 == 0 else str(value) # SCB sends missing values as ..
+
+  def __create_variable(self, code: str, size: int) -> SCBVariable:
+    if code == self.time_variable:
+      values = [f"{2000 + i // 12}M{i % 12 + 1:02}" for i in range(size)]
+      return SCBVariable(code, "månad", values, values, False, True)
+    width = len(str(size - 1))
+    values = [f"{i:0{width}}" for i in range(size)]
+    return SCBVariable(code, code.lower(), values, [f"{code} {i}" for i in range(size)], True, False)
+
+
+class MockSCBServer():
+  """
+  Serves synthetic tables on localhost like SCB, requests made through create_transport() or create_async_transport()
+  go to the server instead of SCB. Runs in daemon threads, use it as a context manager or call start() and stop().
+  Params:
+    tables: Dict[Tuple[str, str, str, str], SyntheticTable]
+      Tables by (area, category, category_specification, table).
+    max_cells: int = 150000 (keyword)
+      Queries selecting more cells are answered with 403 like SCB does.
+    max_requests: int = 30 (keyword)
+      Requests allowed per window, more are answered with 429 and Retry-After. 0 disables throttling.
+    window_seconds: float = 10 (keyword)
+    latency_seconds: float = 0 (keyword)
+      Added before every response.
+  """
+  _CACHED_BODIES: int = 64
+
+  def __init__(self, tables: Dict[Tuple[str, str, str, str], SyntheticTable], **kwargs):
+    self.tables = tables
+    self.max_cells = kwargs["max_cells"] if "max_cells" in kwargs else SCBClient._SCB_LIMIT_RESULT
+    self.max_requests = kwargs["max_requests"] if "max_requests" in kwargs else SCBClient._SCB_LIMIT_REQUESTS
+    self.window_seconds = kwargs["window_seconds"] if "window_seconds" in kwargs else SCBClient._SCB_LIMIT_WINDOW_SECONDS
+    self.latency_seconds = kwargs["latency_seconds"] if "latency_seconds" in kwargs else 0
+    self.request_count = 0
+    self.throttled_count = 0
+    self.url: Optional[str] = None
+    self.__server: Optional[ThreadingHTTPServer] = None
+    self.__request_times = deque()
+    self.__bodies: OrderedDict = OrderedDict() # Request body -> response, generating large bodies would dominate benchmarks
+    self.__lock = Lock()
+
+  def start(self) -> "MockSCBServer":
+    server = self
+
+    class Handler(BaseHTTPRequestHandler):
+      protocol_version = "HTTP/1.1" # Keeps connections alive like SCB
+
+      def do_GET(self):
+        self.__respond(*server._handle("GET", self.path, None))
+
+      def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.__respond(*server._handle("POST", self.path, body))
+
+      def __respond(self, status_code: int, headers: dict, content: bytes):
+        self.send_response(status_code)
+        for name, value in headers.items():
+          self.send_header(name, value)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+      def log_message(self, format, *args):
+        pass
+
+    self.__server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    self.__server.daemon_threads = True
+    self.url = f"http://127.0.0.1:{self.__server.server_address[1]}"
+    Thread(target = self.__server.serve_forever, kwargs = {"poll_interval": 0.05}, daemon = True).start() # Stops quickly between tests
+    return self
+
+  def stop(self) -> None:
+    if self.__server != None:
+      self.__server.shutdown()
+      self.__server.server_close()
+      self.__server = None
+
+  def __enter__(self) -> "MockSCBServer":
+    return self.start()
+
+  def __exit__(self, *args) -> None:
+    self.stop()
+
+  def create_transport(self, **kwargs) -> SCBTransport:
+    """Returns an SCBTransport sending requests for SCB to the server, kwargs are passed to SCBTransport."""
+    return _MockSCBTransport(self, **kwargs)
+
+  def create_async_transport(self, **kwargs) -> AsyncSCBTransport:
+    return _MockAsyncSCBTransport(self, **kwargs)
+
+  def get_url(self, url: str) -> str:
+    """Returns the url at the server for an SCB url."""
+    if self.url == None:
+      raise ConnectionError("The server isn't started.")
+    return self.url + url[len(SCBClient._SCB_BASE_URL):] if url.startswith(SCBClient._SCB_BASE_URL) else url
+
+  def _handle(self, method: str, path: str, body: Optional[bytes]) -> Tuple[int, dict, bytes]:
+    if self.latency_seconds > 0:
+      sleep(self.latency_seconds)
+    retry_after = self.__throttle()
+    if retry_after != None:
+      return 429, {"Retry-After": str(retry_after)}, b"Too many requests"
+    nodes = [node for node in path.strip("/").split("/") if node]
+    if method == "GET":
+      return self.__handle_get(nodes)
+    table = self.tables.get(tuple(nodes))
+    if table == None:
+      return 404, {}, b"Not found"
+    return self.__handle_post(table, body)
+
+  def __throttle(self) -> Optional[int]:
+    """Counts the request and returns seconds to wait if it's over the limit, None if it's allowed."""
+    with self.__lock:
+      self.request_count += 1
+      if self.max_requests <= 0:
+        return None
+      now = monotonic()
+      while self.__request_times and now - self.__request_times[0] >= self.window_seconds:
+        self.__request_times.popleft()
+      if len(self.__request_times) >= self.max_requests:
+        self.throttled_count += 1
+        return max(1, math.ceil(self.window_seconds - (now - self.__request_times[0])))
+      self.__request_times.append(now)
+      return None
+
+  def __handle_get(self, nodes: List[str]) -> Tuple[int, dict, bytes]:
+    if len(nodes) == 4:
+      table = self.tables.get(tuple(nodes))
+      if table == None:
+        return 404, {}, b"Not found"
+      return 200, {"Content-Type": "application/json; charset=utf-8"}, table.create_metadata()
+    children = sorted({path[len(nodes)] for path in self.tables if list(path[:len(nodes)]) == nodes})
+    if not children:
+      return 404, {}, b"Not found"
+    node_type = "t" if len(nodes) == 3 else "l"
+    content = json.dumps([{"id": child, "type": node_type, "text": child} for child in children]).encode()
+    return 200, {"Content-Type": "application/json; charset=utf-8"}, content
+
+  def __handle_post(self, table: SyntheticTable, body: bytes) -> Tuple[int, dict, bytes]:
+    with self.__lock:
+      cached = self.__bodies.get((id(table), body))
+      if cached != None:
+        self.__bodies.move_to_end((id(table), body))
+        return cached
+    try:
+      query = json.loads(body)
+      selection = {queryvar["code"]: queryvar["selection"]["values"] for queryvar in query["query"]}
+      response_format = query.get("response", {}).get("format", "json")
+    except (ValueError, KeyError, TypeError):
+      return 400, {}, b"Invalid query"
+    variables = {var.code: var for var in table.variables}
+    for code, values in selection.items():
+      if code not in variables or not set(values).issubset(variables[code].values):
+        return 400, {}, b"Invalid selection"
+    if response_format not in ("json", "csv", "json-stat2"):
+      return 400, {}, b"Unsupported format"
+    cell_count = math.prod([len(values) for values in selection.values()])
+    if SyntheticTable._CONTENTS_CODE not in selection:
+      cell_count *= table.contents
+    if cell_count > self.max_cells:
+      return 403, {}, b"Too many cells selected"
+    content_type = "text/csv; charset=iso-8859-1" if response_format == "csv" else "application/json; charset=utf-8"
+    response = (200, {"Content-Type": content_type}, table.create_data(selection, response_format))
+    with self.__lock:
+      self.__bodies[(id(table), body)] = response
+      if len(self.__bodies) > self._CACHED_BODIES:
+        self.__bodies.popitem(last = False)
+    return response
+
+
+class _MockSCBTransport(SCBTransport):
+  def __init__(self, server: MockSCBServer, **kwargs):
+    super().__init__(**kwargs)
+    self.server = server
+
+  def get(self, url: str):
+    return super().get(self.server.get_url(url))
+
+  def post(self, url: str, json: dict, stream: bool = False):
+    return super().post(self.server.get_url(url), json, stream)
+
+
+class _MockAsyncSCBTransport(AsyncSCBTransport):
+  def __init__(self, server: MockSCBServer, **kwargs):
+    super().__init__(**kwargs)
+    self.server = server
+
+  async def get(self, url: str):
+    return await super().get(self.server.get_url(url))
+
+  async def post(self, url: str, json: dict):
+    return await super().post(self.server.get_url(url), json)
+
+
+if __name__ == "__main__":
+  with MockSCBServer({("BE", "BE0101", "BE0101A", "Synthetic"): SyntheticTable({"Region": 300, "Alder": 100, "Tid": 12})}) as server:
+    print(f"Serving BE/BE0101/BE0101A/Synthetic at {server.url}, interrupt to stop.")
+    try:
+      while True:
+        sleep(1)
+    except KeyboardInterrupt:
+      pass
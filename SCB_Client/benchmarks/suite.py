@@ -0,0 +1,179 @@
+"""
+Throughput benchmarks of the client against MockSCBServer, compared with stored baselines so regressions are visible.
+Every benchmark is run once to warm up (the server caches its responses) and then timed, the median is compared.
+Run with python -m SCB_Client.benchmarks.suite
+  --save                stores the results as the new baselines
+  --repeats N           timed runs per benchmark, defaults to 5
+  --tolerance T         relative slowdown reported as a regression, defaults to 0.25
+  --fail-on-regression  exits with 1 if any benchmark regressed
+  --scale S             multiplies the size of the tables, e.g. 0.1 for a quick run (not comparable with the baselines)
+  benchmark names       runs only these
+Baselines depend on the machine, save new ones before comparing changes on another machine.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional
+
+from SCB_Client import ResponseType, ResultType, SCBClient
+from SCB_Client.benchmarks.mock_server import MockSCBServer, SyntheticTable
+from SCB_Client.SCBClientUtilities import RateLimiter, SCBResponse
+
+BASELINES_PATH: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+TABLE_PATH = ("BE", "BE0101", "BE0101A", "Synthetic")
+
+class BenchmarkContext():
+  """The server and tables the benchmarks run against, scale multiplies the number of regions."""
+  def __init__(self, scale: float = 1.0):
+    regions = max(1, int(300 * scale))
+    self.single_request_table = SyntheticTable({"Region": regions, "Alder": 100, "Tid": 5}) # 150k cells, the SCB limit
+    self.partitioned_table = SyntheticTable({"Region": regions, "Alder": 100, "Tid": 20}) # 600k cells, 4 partitions
+    self.server = MockSCBServer(
+      {TABLE_PATH: self.single_request_table, (*TABLE_PATH[:3], "Partitioned"): self.partitioned_table},
+      max_requests = 0
+    )
+    self.rate_limiter = RateLimiter(max_requests = 100000, window_seconds = 1) # Measures the client, not SCB's limit
+
+  def create_client(self, table: str = TABLE_PATH[3]) -> SCBClient:
+    client = SCBClient.create_and_validate_client(*TABLE_PATH[:3], table, transport = self.server.create_transport(), rate_limiter = self.rate_limiter)
+    client.set_size_limit(0)
+    return client
+
+def get_data_json(context: BenchmarkContext) -> Callable[[], Any]:
+  client = context.create_client()
+  query = client.create_query()
+  return lambda: sum([len(response.data) for response in client.get_data(query)])
+
+def get_data_csv(context: BenchmarkContext) -> Callable[[], Any]:
+  client = context.create_client()
+  query = client.create_query(response_type = ResponseType.CSV)
+  return lambda: sum([len(response) for response in client.get_data(query)])
+
+def get_data_jsonstat2(context: BenchmarkContext) -> Callable[[], Any]:
+  client = context.create_client()
+  query = client.create_query(response_type = ResponseType.JSONSTAT2)
+  return lambda: sum([len(response) for response in client.get_data(query)])
+
+def get_data_partitioned(context: BenchmarkContext) -> Callable[[], Any]:
+  client = context.create_client("Partitioned")
+  client.set_max_workers(4)
+  query = client.create_query()
+  return lambda: sum([len(response.data) for response in client.get_data(query)])
+
+def create_parse_benchmark(response_type: ResponseType, result_type: ResultType) -> Callable[[BenchmarkContext], Callable[[], Any]]:
+  def setup(context: BenchmarkContext) -> Callable[[], Any]:
+    client = context.create_client()
+    query = client.create_query(response_type = response_type)
+    content = client.transport.post(client.data_url, query.to_dict()).content
+    return lambda: client._create_response_obj(SCBResponse(200, {}, content), response_type, result_type)
+  return setup
+
+def create_and_validate_client(context: BenchmarkContext) -> Callable[[], Any]:
+  # A new transport every time, tree nodes are memoised per transport
+  return lambda: context.create_client()
+
+BENCHMARKS: Dict[str, Callable[[BenchmarkContext], Callable[[], Any]]] = {
+  "get_data_json": get_data_json,
+  "get_data_csv": get_data_csv,
+  "get_data_jsonstat2": get_data_jsonstat2,
+  "get_data_partitioned": get_data_partitioned,
+  "parse_json": create_parse_benchmark(ResponseType.JSON, ResultType.DEFAULT),
+  "parse_json_columnar": create_parse_benchmark(ResponseType.JSON, ResultType.COLUMNAR),
+  "parse_csv": create_parse_benchmark(ResponseType.CSV, ResultType.DEFAULT),
+  "parse_jsonstat2": create_parse_benchmark(ResponseType.JSONSTAT2, ResultType.DEFAULT),
+  "create_and_validate_client": create_and_validate_client
+}
+
+def run_benchmarks(names: Optional[List[str]] = None, repeats: int = 5, scale: float = 1.0) -> Dict[str, dict]:
+  """Returns the median and min seconds of every benchmark, by name."""
+  names = names if names else list(BENCHMARKS)
+  unknown_names = [name for name in names if name not in BENCHMARKS]
+  if unknown_names:
+    raise KeyError(f"Unknown benchmarks {unknown_names}, the benchmarks are {list(BENCHMARKS)}.")
+  context = BenchmarkContext(scale)
+  results = {}
+  with context.server:
+    for name in names:
+      measured = BENCHMARKS[name](context)
+      measured() # Warm up
+      timings = []
+      for _ in range(repeats):
+        start = perf_counter()
+        measured()
+        timings.append(perf_counter() - start)
+      results[name] = {"median_seconds": statistics.median(timings), "min_seconds": min(timings)}
+  return results
+
+def load_baselines(path: str = BASELINES_PATH) -> Dict[str, dict]:
+  """Returns the stored results by name, empty if there are no baselines."""
+  if not os.path.isfile(path):
+    return {}
+  with open(path, encoding = "utf-8") as file:
+    return json.load(file)["results"]
+
+def save_baselines(results: Dict[str, dict], path: str = BASELINES_PATH) -> None:
+  """Stores the results, baselines of benchmarks that weren't run are kept."""
+  baselines = {**load_baselines(path), **results}
+  with open(path, "w", encoding = "utf-8") as file:
+    json.dump({"python": platform.python_version(), "machine": platform.machine(), "results": baselines}, file, indent = 2, sort_keys = True)
+    file.write("\n")
+
+def compare(results: Dict[str, dict], baselines: Dict[str, dict], tolerance: float = 0.25) -> List[dict]:
+  """
+  Compares the median of every result with its baseline.
+  Returns:
+    rows: List[dict]
+      name, baseline and current median seconds, change (relative, None without a baseline)
+      and status: "regression" if slower than the tolerance, "improvement" if faster, otherwise "ok", or "new".
+  """
+  rows = []
+  for name, result in results.items():
+    current = result["median_seconds"]
+    baseline = baselines[name]["median_seconds"] if name in baselines else None
+    change = current / baseline - 1 if baseline else None
+    if change == None:
+      status = "new"
+    elif change > tolerance:
+      status = "regression"
+    elif change < -tolerance:
+      status = "improvement"
+    else:
+      status = "ok"
+    rows.append({"name": name, "baseline": baseline, "current": current, "change": change, "status": status})
+  return rows
+
+def format_report(rows: List[dict]) -> str:
+  lines = [f"{'benchmark':<28}{'baseline s':>12}{'current s':>12}{'change':>10}  status"]
+  for row in rows:
+    baseline = f"{row['baseline']:.4f}" if row["baseline"] != None else "-"
+    change = f"{row['change']:+.1%}" if row["change"] != None else "-"
+    lines.append(f"{row['name']:<28}{baseline:>12}{row['current']:>12.4f}{change:>10}  {row['status']}")
+  return "\n".join(lines)
+
+def main(args: Optional[List[str]] = None) -> int:
+  parser = argparse.ArgumentParser(prog = "python -m SCB_Client.benchmarks.suite", description = "Client throughput against a local mock SCB server.")
+  parser.add_argument("names", nargs = "*")
+  parser.add_argument("--repeats", type = int, default = 5)
+  parser.add_argument("--tolerance", type = float, default = 0.25)
+  parser.add_argument("--scale", type = float, default = 1.0)
+  parser.add_argument("--save", action = "store_true")
+  parser.add_argument("--fail-on-regression", action = "store_true")
+  parser.add_argument("--baselines", default = BASELINES_PATH)
+  options = parser.parse_args(args)
+
+  results = run_benchmarks(options.names, options.repeats, options.scale)
+  rows = compare(results, load_baselines(options.baselines) if options.scale == 1.0 else {}, options.tolerance)
+  print(format_report(rows))
+  if options.save:
+    save_baselines(results, options.baselines)
+    print(f"Baselines saved to {options.baselines}")
+  if options.fail_on_regression and any([row["status"] == "regression" for row in rows]):
+    return 1
+  return 0
+
+if __name__ == "__main__":
+  sys.exit(main())
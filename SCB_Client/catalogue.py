@@ -0,0 +1,171 @@
+import json
+import os
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import closing
+from dataclasses import dataclass
+from time import time
+from typing import List, Optional
+
+from SCB_Client import SCBClient
+from SCB_Client.model.scb_models import SCBVariable
+from SCB_Client.SCBClientUtilities import RateLimiter, SCBTransport
+from SCB_Client.SCBClientUtilities.sqlite_cache import connect, create_database
+
+@dataclass
+class SCBCatalogueEntry:
+  """
+  A table in the catalogue, path is every level of the tree down to the table, e.g. (area, category, category_specification, table).
+  Tables can be at other depths than the four SCBClient takes. variables is None if they aren't indexed.
+  """
+  path: List[str]
+  url: str
+  text: str
+  variables: Optional[List[SCBVariable]] = None
+
+class SCBCatalogue():
+  """
+  Offline index of the SCB tree, built by crawl(), with every table and its variables searchable by text.
+  The raw responses are kept as well so the catalogue can be passed as metadata_cache to SCBClient,
+  validations and get_variables() are then served from it without any requests. Responses stored by a client are indexed too.
+  Params:
+    path: Optional[str] = None
+      Path of the SQLite file, defaults to ~/.cache/SCB_Client/catalogue.sqlite.
+  """
+  _DEFAULT_PATH: str = os.path.join(os.path.expanduser("~"), ".cache", "SCB_Client", "catalogue.sqlite")
+
+  def __init__(self, path: Optional[str] = None):
+    self.path = path if path != None else self._DEFAULT_PATH
+    create_database(self.path)
+    with closing(connect(self.path)) as connection:
+      connection.execute("CREATE TABLE IF NOT EXISTS responses (url TEXT PRIMARY KEY, content BLOB NOT NULL, updated REAL NOT NULL)")
+      connection.execute("CREATE TABLE IF NOT EXISTS catalogue_tables (url TEXT PRIMARY KEY, text TEXT NOT NULL, search_text TEXT NOT NULL)")
+      connection.execute(
+        "CREATE TABLE IF NOT EXISTS catalogue_variables ("
+        "url TEXT NOT NULL, code TEXT NOT NULL, search_text TEXT NOT NULL, PRIMARY KEY (url, code))"
+      )
+
+  def get(self, url: str) -> Optional[bytes]:
+    """Returns the stored response for url, None if it isn't in the catalogue. Same interface as MetadataCache."""
+    with closing(connect(self.path)) as connection:
+      row = connection.execute("SELECT content FROM responses WHERE url = ?", (url,)).fetchone()
+    return zlib.decompress(row[0]) if row != None else None
+
+  def set(self, url: str, content: bytes) -> None:
+    """Stores the response for url and indexes the tables or variables in it. Same interface as MetadataCache."""
+    metadata = self.__decode(content)
+    with closing(connect(self.path)) as connection:
+      connection.execute("BEGIN IMMEDIATE")
+      connection.execute("INSERT OR REPLACE INTO responses (url, content, updated) VALUES (?, ?, ?)", (url, zlib.compress(content), time()))
+      if isinstance(metadata, list):
+        # A level of the tree, tables ("t") are indexed by their text
+        connection.executemany(
+          "INSERT OR REPLACE INTO catalogue_tables (url, text, search_text) VALUES (?, ?, ?)",
+          [
+            (f"{url}/{node['id']}", node.get("text", ""), f"{node['id']} {node.get('text', '')}".casefold())
+            for node in metadata if node.get("type") == "t"
+          ]
+        )
+      elif isinstance(metadata, dict) and "variables" in metadata:
+        connection.execute("DELETE FROM catalogue_variables WHERE url = ?", (url,))
+        connection.executemany(
+          "INSERT OR REPLACE INTO catalogue_variables (url, code, search_text) VALUES (?, ?, ?)",
+          [(url, var["code"], f"{var['code']} {var.get('text', '')}".casefold()) for var in metadata["variables"]]
+        )
+      connection.execute("COMMIT")
+
+  def crawl(self, **kwargs) -> List[str]:
+    """
+    Walks the tree from SCBClient._SCB_BASE_URL, the same hierarchy create_and_validate_client() validates, and indexes every table.
+    Requests are made concurrently and held back by the rate limiter, requests that are limited by SCB are retried.
+    Params:
+      transport: SCBTransport = SCBTransport.shared() (keyword)
+      rate_limiter: RateLimiter = RateLimiter.shared() (keyword)
+      max_workers: int = 10 (keyword)
+        Number of concurrent requests.
+      include_variables: bool = True (keyword)
+        Fetches the variables of every table, one request per table.
+      root: List[str] = [] (keyword)
+        Path to crawl below, e.g. ["BE"] for a single area.
+    Returns:
+      failed_urls: List[str]
+        URLs that couldn't be fetched, empty if the whole tree was indexed.
+    """
+    transport = kwargs["transport"] if "transport" in kwargs else SCBTransport.shared()
+    rate_limiter = kwargs["rate_limiter"] if "rate_limiter" in kwargs else RateLimiter.shared()
+    max_workers = kwargs["max_workers"] if "max_workers" in kwargs else 10
+    include_variables = kwargs["include_variables"] if "include_variables" in kwargs else True
+    root_url = "/".join([SCBClient._SCB_BASE_URL, *kwargs.get("root", [])])
+
+    def fetch(url: str):
+      attempt = 0
+      while True:
+        rate_limiter.acquire()
+        response = transport.get(url)
+        if response.status_code != 429 or attempt >= SCBClient._SCB_MAX_RETRIES:
+          return response
+        attempt += 1
+        rate_limiter.back_off(attempt, response.headers.get("Retry-After"))
+
+    failed_urls = []
+    with ThreadPoolExecutor(max_workers = max_workers) as executor:
+      in_flight = {executor.submit(fetch, root_url): root_url}
+      while in_flight:
+        done, _ = wait(in_flight, return_when = FIRST_COMPLETED)
+        for future in done:
+          url = in_flight.pop(future)
+          try:
+            response = future.result()
+          except Exception:
+            failed_urls.append(url)
+            continue
+          if response.status_code != 200:
+            failed_urls.append(url)
+            continue
+          self.set(url, response.content)
+          metadata = self.__decode(response.content)
+          if not isinstance(metadata, list):
+            continue # Variables of a table
+          for node in metadata:
+            if node.get("type") == "l" or (node.get("type") == "t" and include_variables):
+              child_url = f"{url}/{node['id']}"
+              in_flight[executor.submit(fetch, child_url)] = child_url
+    return failed_urls
+
+  def search(self, text: str, limit: int = 50) -> List[SCBCatalogueEntry]:
+    """
+    Returns tables where every word of text is part of the table id or text, or of the code or text of one of its variables.
+    Matching is case insensitive, tables matching by their own text come first.
+    """
+    tokens = text.casefold().split()
+    table_match = "t.search_text LIKE ? ESCAPE '\\'"
+    variable_match = "EXISTS (SELECT 1 FROM catalogue_variables v WHERE v.url = t.url AND v.search_text LIKE ? ESCAPE '\\')"
+    patterns = ["%" + token.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%" for token in tokens]
+    parameters = [parameter for pattern in patterns for parameter in (pattern, pattern)]
+    where = f"WHERE {' AND '.join([f'({table_match} OR {variable_match})'] * len(tokens))} " if tokens else ""
+    order = f"({' AND '.join([table_match] * len(tokens))}) DESC, " if tokens else ""
+    with closing(connect(self.path)) as connection:
+      rows = connection.execute(
+        f"SELECT t.url, t.text, r.content FROM catalogue_tables t LEFT JOIN responses r ON r.url = t.url {where}ORDER BY {order}t.url LIMIT ?",
+        [*parameters, *patterns, limit]
+      ).fetchall()
+    return [self.__create_entry(url, table_text, content) for url, table_text, content in rows]
+
+  def __create_entry(self, url: str, text: str, content: Optional[bytes]) -> SCBCatalogueEntry:
+    variables = None
+    metadata = self.__decode(zlib.decompress(content)) if content != None else None
+    if isinstance(metadata, dict) and "variables" in metadata:
+      variables = [SCBVariable(**var) for var in metadata["variables"]]
+    path = url[len(SCBClient._SCB_BASE_URL) + 1:].split("/")
+    return SCBCatalogueEntry(path = path, url = url, text = text, variables = variables)
+
+  @staticmethod
+  def __decode(content: bytes):
+    """Returns the decoded JSON response, None if it isn't JSON."""
+    try:
+      try:
+        return json.loads(content.decode("utf-8-sig"))
+      except UnicodeDecodeError:
+        return json.loads(content.decode("latin-1"))
+    except ValueError:
+      return None
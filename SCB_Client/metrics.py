@@ -0,0 +1,161 @@
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from typing import Dict, List, Tuple
+
+from SCB_Client.SCBClientUtilities import CounterType, LatencyHistogram, PerformanceMonitor, SessionType
+
+@dataclass
+class MetricSample:
+  name: str
+  labels: Dict[str, str]
+  value: float
+
+@dataclass
+class Metric:
+  """A metric family, type is "counter" or "histogram" like in the Prometheus exposition format."""
+  name: str
+  type: str
+  help: str
+  samples: List[MetricSample] = field(default_factory = list)
+
+class MetricsRegistry():
+  """
+  Exports the metrics of registered PerformanceMonitors in the Prometheus text exposition format, or OpenMetrics.
+  Metrics are read from the monitors when collected, so the registry can be pulled (collect(), generate_text())
+  or scraped over HTTP (start_http_server()). Clients sharing a PerformanceMonitor, see the performance_monitor keyword,
+  only need it registered once.
+  Exported metrics, with the prefix:
+    requests_total, rate_limited_total, retries_total, downloaded_bytes_total, cells_total (counters)
+    download_seconds, process_seconds (histograms, from SessionType.DOWNLOAD and SessionType.PROCESS)
+  Params:
+    monitors: List[PerformanceMonitor] = [] (keyword)
+    prefix: str = "scb_client" (keyword)
+    labels: Tuple[str] = ("table",) (keyword)
+      Session labels to export, metrics are summed over the other labels. Partitions are left out by default
+      since every partition index would be a time series of its own.
+    buckets: Tuple[float] = _DEFAULT_BUCKETS (keyword)
+      Upper bounds in seconds of the exported histogram buckets, counts are within the relative error of LatencyHistogram.
+  """
+  _DEFAULT_BUCKETS: Tuple[float] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+  _COUNTERS: Dict[CounterType, Tuple[str, str]] = {
+    CounterType.REQUESTS: ("requests", "Data requests made to SCB, including retries."),
+    CounterType.RATE_LIMITED: ("rate_limited", "Data requests limited by SCB (status 429)."),
+    CounterType.RETRIES: ("retries", "Data requests retried after being limited by SCB."),
+    CounterType.CELLS: ("cells", "Cells returned, from SCB or the response cache.")
+  }
+  _HISTOGRAMS: Dict[SessionType, Tuple[str, str]] = {
+    SessionType.DOWNLOAD: ("download_seconds", "Duration of data requests to SCB."),
+    SessionType.PROCESS: ("process_seconds", "Duration of processing responses into results.")
+  }
+  _OPENMETRICS_CONTENT_TYPE: str = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+  _PROMETHEUS_CONTENT_TYPE: str = "text/plain; version=0.0.4; charset=utf-8"
+
+  def __init__(self, **kwargs):
+    self.prefix = kwargs["prefix"] if "prefix" in kwargs else "scb_client"
+    self.labels = tuple(kwargs["labels"]) if "labels" in kwargs else ("table",)
+    self.buckets = tuple(sorted(kwargs["buckets"])) if "buckets" in kwargs else self._DEFAULT_BUCKETS
+    self.__monitors: List[PerformanceMonitor] = list(kwargs.get("monitors", []))
+    self.__lock = Lock()
+
+  def register(self, monitor: PerformanceMonitor) -> None:
+    with self.__lock:
+      if not any(registered is monitor for registered in self.__monitors):
+        self.__monitors.append(monitor)
+
+  def unregister(self, monitor: PerformanceMonitor) -> None:
+    with self.__lock:
+      self.__monitors = [registered for registered in self.__monitors if registered is not monitor]
+
+  def collect(self) -> List[Metric]:
+    """Returns the current value of every metric, summed over all registered monitors."""
+    with self.__lock:
+      monitors = list(self.__monitors)
+    counters: Dict[CounterType, Dict[tuple, int]] = {type: {} for type in self._COUNTERS}
+    byte_counts: Dict[tuple, int] = {}
+    histograms: Dict[SessionType, Dict[tuple, LatencyHistogram]] = {type: {} for type in self._HISTOGRAMS}
+    for monitor in monitors:
+      for type, labels, count in monitor.get_labelled_counters():
+        key = self.__get_label_key(labels)
+        counters[type][key] = counters[type].get(key, 0) + count
+      for type, labels, histogram, byte_count in monitor.get_labelled_sessions():
+        key = self.__get_label_key(labels)
+        if key not in histograms[type]:
+          histograms[type][key] = LatencyHistogram()
+        histograms[type][key].merge(histogram)
+        if type == SessionType.DOWNLOAD:
+          byte_counts[key] = byte_counts.get(key, 0) + byte_count
+
+    metrics = []
+    for type, (name, help) in self._COUNTERS.items():
+      metrics.append(self.__create_counter(name, help, counters[type]))
+    metrics.append(self.__create_counter("downloaded_bytes", "Bytes of data responses downloaded from SCB.", byte_counts))
+    for type, (name, help) in self._HISTOGRAMS.items():
+      metric = Metric(f"{self.prefix}_{name}", "histogram", help)
+      for key, histogram in sorted(histograms[type].items()):
+        labels = dict(key)
+        for bound in self.buckets:
+          metric.samples.append(MetricSample(f"{metric.name}_bucket", {**labels, "le": repr(float(bound))}, histogram.count_at_or_below(int(bound * 1e9))))
+        metric.samples.append(MetricSample(f"{metric.name}_bucket", {**labels, "le": "+Inf"}, histogram.count))
+        metric.samples.append(MetricSample(f"{metric.name}_sum", labels, histogram.total / 1e9))
+        metric.samples.append(MetricSample(f"{metric.name}_count", labels, histogram.count))
+      metrics.append(metric)
+    return metrics
+
+  def generate_text(self, openmetrics: bool = False) -> str:
+    """Returns the metrics in the Prometheus text exposition format (version 0.0.4), or OpenMetrics 1.0.0."""
+    lines = []
+    for metric in self.collect():
+      # OpenMetrics names counter families without the _total suffix of their samples
+      family_name = metric.name[:-len("_total")] if openmetrics and metric.type == "counter" else metric.name
+      lines.append(f"# HELP {family_name} {self.__escape(metric.help, False)}")
+      lines.append(f"# TYPE {family_name} {metric.type}")
+      for sample in metric.samples:
+        labels = ",".join([f'{name}="{self.__escape(value, True)}"' for name, value in sample.labels.items()])
+        lines.append(f"{sample.name}{{{labels}}} {self.__format_value(sample.value)}" if labels else f"{sample.name} {self.__format_value(sample.value)}")
+    if openmetrics:
+      lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+  def start_http_server(self, port: int, addr: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """
+    Serves the metrics on every path in a daemon thread, OpenMetrics if the scraper accepts it.
+    Returns the server, call shutdown() on it to stop serving. Port 0 picks a free port, see server.server_address.
+    """
+    registry = self
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+      def do_GET(self):
+        openmetrics = "application/openmetrics-text" in self.headers.get("Accept", "")
+        body = registry.generate_text(openmetrics).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", registry._OPENMETRICS_CONTENT_TYPE if openmetrics else registry._PROMETHEUS_CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+      def log_message(self, format, *args):
+        pass # Scrapes aren't logged
+
+    server = ThreadingHTTPServer((addr, port), MetricsHandler)
+    server.daemon_threads = True
+    Thread(target = server.serve_forever, daemon = True).start()
+    return server
+
+  def __create_counter(self, name: str, help: str, counts: Dict[tuple, int]) -> Metric:
+    metric = Metric(f"{self.prefix}_{name}_total", "counter", help)
+    for key, count in sorted(counts.items()):
+      metric.samples.append(MetricSample(metric.name, dict(key), count))
+    return metric
+
+  def __get_label_key(self, labels: Dict[str, str]) -> tuple:
+    return tuple([(name, str(labels[name])) for name in self.labels if name in labels])
+
+  @staticmethod
+  def __format_value(value: float) -> str:
+    return str(value) if isinstance(value, int) else repr(float(value))
+
+  @staticmethod
+  def __escape(text: str, is_label_value: bool) -> str:
+    text = text.replace("\\", "\\\\").replace("\n", "\\n")
+    return text.replace('"', '\\"') if is_label_value else text
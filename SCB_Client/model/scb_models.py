@@ -1,11 +1,26 @@
+from collections.abc import Mapping, Sequence
 from dataclasses import dataclass
 from enum import Enum
-from typing import List, Dict
+from typing import Any, List, Dict
 
 
 class ResponseType(Enum):
   JSON = "json"
   CSV = "csv"
+  JSONSTAT2 = "json-stat2" # The cube as a dense value array with dimension metadata, decoded into an SCBColumnarResponse
+  AUTO = "auto" # Requested in the format with the fewest estimated bytes, results are the same as for JSON. See SCBClient.estimate_payload()
+
+class ResultType(Enum):
+  """The shape get_data() returns every partition in, independent of the format SCB responds with."""
+  DEFAULT = "default" # SCBJsonResponse for JSON, list of SCBCsvRow (read-only mappings of header to cell) for CSV, SCBColumnarResponse for JSON-stat2
+  COLUMNAR = "columnar" # SCBColumnarResponse, requires numpy
+  ARROW = "arrow" # pyarrow.RecordBatch per partition, get_data() returns a pyarrow.Table, requires pyarrow
+
+class CachePolicy(Enum):
+  """How get_data() uses the response cache of the client, ignored if the client has none."""
+  USE = "use" # Serve from the cache when possible, store what is downloaded
+  REFRESH = "refresh" # Always download, store what is downloaded
+  BYPASS = "bypass" # Always download, the cache is neither read nor written
 
 @dataclass()
 class SCBVariable():
@@ -20,23 +35,112 @@ class SCBVariable():
 class SCBCsvResponse:
   data: List[Dict[str, str]]
   column_names: List[str]
+
+class SCBCsvRow(Mapping):
+  """
+  A row of a CSV response, read like a dict with the headers as keys. The cells are kept in a tuple
+  and the header positions are shared by every row of the response, so a row costs about half of a dict.
+  Use dict(row) for a dict, e.g. to modify it.
+  """
+  __slots__ = ("__cells", "__positions")
+
+  def __init__(self, cells: tuple, positions: Dict[str, int]):
+    self.__cells = cells
+    self.__positions = positions
+
+  def __getitem__(self, header: str) -> str:
+    return self.__cells[self.__positions[header]]
+
+  def __iter__(self):
+    return iter(self.__positions)
+
+  def __len__(self) -> int:
+    return len(self.__positions)
+
+  def __contains__(self, header) -> bool:
+    return header in self.__positions
+
+  def cells(self) -> tuple:
+    """Returns the cells in the order of the headers, without looking up every header like values() does."""
+    return self.__cells
+
+  def __repr__(self) -> str:
+    return repr(dict(self))
+
 @dataclass
 class SCBJsonResponseDataPoint:
+  __slots__ = ("key", "values") # Created per row, without a __dict__ every row is smaller
   key: List[str]
   values: List[str]
 
+class SCBJsonDataPoints(Sequence):
+  """
+  Rows of an SCBJsonResponse created when they're accessed from the decoded data of the response, see JsonDecoder.
+  Behaves like the list of SCBJsonResponseDataPoint it replaces, except that every access creates a new row
+  that shares its key and values with the decoded data.
+  """
+  def __init__(self, data: List[dict]):
+    self.__data = data
+
+  def __len__(self) -> int:
+    return len(self.__data)
+
+  def __getitem__(self, index):
+    if isinstance(index, slice):
+      return [SCBJsonResponseDataPoint(datapoint["key"], datapoint["values"]) for datapoint in self.__data[index]]
+    datapoint = self.__data[index]
+    return SCBJsonResponseDataPoint(datapoint["key"], datapoint["values"])
+
+  def __iter__(self):
+    for datapoint in self.__data:
+      yield SCBJsonResponseDataPoint(datapoint["key"], datapoint["values"])
+
+  def __eq__(self, other) -> bool:
+    if not isinstance(other, Sequence) or isinstance(other, str):
+      return NotImplemented
+    return len(self) == len(other) and all([first == second for first, second in zip(self, other)])
+
+  def __repr__(self) -> str:
+    return f"SCBJsonDataPoints({len(self)} rows)"
+
 @dataclass
 class SCBJsonResponse:
   columns: List[dict]
   comments: List[dict]
-  data: List[SCBJsonResponseDataPoint]
+  data: Sequence[SCBJsonResponseDataPoint] # A list, or SCBJsonDataPoints if the decoder creates the rows lazily
+
+@dataclass(eq = False)
+class SCBColumnarResponse:
+  """
+  Column oriented response backed by numpy arrays.
+  Key columns are dictionary encoded, key_codes[code] holds int32 indexes into key_values[code] which are the SCBVariable values.
+  Content columns are parsed once into float64 arrays, values SCB marks as missing (e.g. ".." or "-") are NaN and True in missing.
+  """
+  columns: List[dict]
+  comments: List[dict]
+  key_codes: Dict[str, Any]
+  key_values: Dict[str, List[str]]
+  values: Dict[str, Any]
+  missing: Dict[str, Any]
+
+  def __len__(self) -> int:
+    for column in [*self.key_codes.values(), *self.values.values()]:
+      return len(column)
+    return 0
+
+  def decode_key(self, code: str) -> List[str]:
+    """Returns the key column for the variable code as strings."""
+    vocabulary = self.key_values[code]
+    return [vocabulary[i] for i in self.key_codes[code].tolist()]
 
 @dataclass
 class SCBQueryVariableSelection:
+  __slots__ = ("filter", "values")
   filter: str
   values: List[str]
 @dataclass
 class SCBQueryVariable:
+  __slots__ = ("code", "selection") # Copied for every partition of a query
   code: str
   selection: SCBQueryVariableSelection
 
@@ -69,3 +173,24 @@ class SCBQuery:
         "format": self.response_type.value
       } 
     }
+
+@dataclass
+class SCBPayloadEstimate:
+  """Estimated size of the response to a query in one format and the time to parse it, see SCBClient.estimate_payload()."""
+  response_type: ResponseType
+  cell_count: int
+  bytes: int
+  parse_seconds: float
+
+@dataclass
+class SCBQueryPlan:
+  """
+  The requests a query is split into to stay within the SCB limit, see SCBClient.plan().
+  partition_variable_codes are the variables that are split, cell_counts holds the number of cells of every partition.
+  """
+  partitions: List[SCBQuery]
+  partition_variable_codes: List[str]
+  cell_counts: List[int]
+
+  def __len__(self) -> int:
+    return len(self.partitions)
@@ -1,5 +1,24 @@
+import json
+from itertools import product
+from typing import Callable, List, Optional
+
+from pytest import MonkeyPatch
+
+from SCB_Client import SCBClient
 from SCB_Client.model.scb_models import SCBVariable
+from SCB_Client.SCBClientUtilities import RateLimiter, SCBResponse, SCBTransport
 
+MOCKED_COLUMNS = [
+  {"code": "first_code", "text": "first_code", "type": "d"},
+  {"code": "second_code", "text": "second_code", "type": "d"},
+  {"code": "content", "text": "content", "type": "c"}
+]
+
+MOCKED_TIME_COLUMNS = [
+  {"code": "first_code", "text": "first_text", "type": "d"},
+  {"code": "time_code", "text": "time_text", "type": "t"},
+  {"code": "content", "text": "content", "type": "c"}
+]
 
 def mock_variables():
     return [
@@ -47,4 +66,60 @@ def mock_variables_with_time():
       False,
       True
     )
-  ]
\ No newline at end of file
+  ]
+
+def mock_variables_with_texts():
+  """mock_variables() with value texts that differ from the values, e.g. "One" for "one"."""
+  return [
+    SCBVariable("first_code", "first_text", ["one", "two", "three"], ["One", "Two", "Three"]),
+    SCBVariable("second_code", "second_text", ["four", "five", "six"], ["Four", "Five", "Six"])
+  ]
+
+def mocked_body(query: dict, columns: List[dict] = MOCKED_COLUMNS, value: Callable[[list], str] = lambda key: "1") -> bytes:
+  """JSON response to a posted query with a row per combination of the selected values of the key columns, value(key) is the content of a row."""
+  selections = {var["code"]: var["selection"]["values"] for var in query["query"]}
+  key_codes = [column["code"] for column in columns if column["type"] != "c"]
+  return json.dumps({
+    "columns": columns,
+    "comments": [],
+    "data": [{"key": list(key), "values": [value(list(key))]} for key in product(*[selections[code] for code in key_codes])]
+  }).encode()
+
+def mocked_body_with_missing(query: dict) -> bytes:
+  """mocked_body() where the content of the rows with "six" is missing (".."), the others are 1.5."""
+  return mocked_body(query, value = lambda key: ".." if key[1] == "six" else "1.5")
+
+def mocked_time_body(query: dict) -> bytes:
+  """mocked_body() of the table of mock_variables_with_time(), the content of a row is its key joined."""
+  return mocked_body(query, MOCKED_TIME_COLUMNS, "".join)
+
+def create_mocked_client(m: MonkeyPatch, posts: Optional[list] = None, variables: Callable[[], List[SCBVariable]] = mock_variables, body: Callable[[dict], bytes] = mocked_body, **kwargs) -> SCBClient:
+  """
+  Client of a mocked table that answers every post with body(query), posted queries are appended to posts.
+  kwargs are passed to SCBClient, e.g. response_cache or rate_limiter.
+  """
+  kwargs.setdefault("rate_limiter", RateLimiter())
+  client = SCBClient("Test", "Test", "Test", "Test", transport = SCBTransport(), **kwargs)
+  m.setattr(client, "get_variables", variables)
+
+  def mocked_post(url: str, json: dict, stream: bool = False):
+    if posts != None:
+      posts.append(json)
+    return SCBResponse(200, {}, body(json))
+
+  m.setattr(client.transport, "post", mocked_post)
+  return client
+
+class mocked_async_transport():
+  """Async transport answering every post with body(query), posted queries are appended to posts."""
+  def __init__(self, posts: Optional[list] = None, body: Callable[[dict], bytes] = mocked_body):
+    self.posts = posts
+    self.body = body
+
+  async def post(self, url: str, json: dict) -> SCBResponse:
+    if self.posts != None:
+      self.posts.append(json)
+    return SCBResponse(200, {}, self.body(json))
+
+  async def close(self) -> None:
+    pass
@@ -0,0 +1,192 @@
+import asyncio
+import json
+import threading
+import pytest
+from pytest import MonkeyPatch
+
+from SCB_Client import AsyncSCBClient, ResponseType, ResultType, SCBClient
+from SCB_Client.SCBClientUtilities import JsonDecoder, RateLimiter, SCBResponse, SCBTransport
+
+VARIABLES = {
+  "variables": [
+    {"code": "first_code", "text": "first_code", "values": ["one", "two", "three"], "valueTexts": ["one", "two", "three"]},
+    {"code": "second_code", "text": "second_code", "values": ["four", "five", "six"], "valueTexts": ["four", "five", "six"]}
+  ]
+}
+
+def mocked_data(query: dict) -> bytes:
+  first_values = [var["selection"]["values"] for var in query["query"] if var["code"] == "first_code"][0]
+  second_values = [var["selection"]["values"] for var in query["query"] if var["code"] == "second_code"][0]
+  return json.dumps({
+    "columns": [],
+    "comments": [],
+    "data": [{"key": [first, second], "values": ["1"]} for first in first_values for second in second_values]
+  }).encode()
+
+class mocked_async_transport():
+  def __init__(self):
+    self.posts = 0
+    self.closed = False
+
+  async def get(self, url: str) -> SCBResponse:
+    if url != SCBClient._SCB_BASE_URL + "/Test/Test/Test/Test":
+      return SCBResponse(200, {}, b'[{"id": "Mocked_response"}]')
+    return SCBResponse(200, {}, json.dumps(VARIABLES).encode())
+
+  async def post(self, url: str, json: dict) -> SCBResponse:
+    self.posts += 1
+    # Later partitions are faster so they would finish first if order wasn't preserved
+    first_values = [var["selection"]["values"] for var in json["query"] if var["code"] == "first_code"][0]
+    await asyncio.sleep({"one": 0.03, "two": 0.02, "three": 0.01}[first_values[0]])
+    return SCBResponse(200, {}, mocked_data(json))
+
+  async def close(self) -> None:
+    self.closed = True
+
+def create_client(transport: mocked_async_transport) -> AsyncSCBClient:
+  return AsyncSCBClient("Test", "Test", "Test", "Test", transport = transport, rate_limiter = RateLimiter())
+
+def test_async_partitions_are_returned_in_order():
+  async def run():
+    client = create_client(mocked_async_transport())
+    client._client._SCB_LIMIT_RESULT = 3
+    await client.set_preferred_partition_variable_code("first_code")
+    query = await client.create_query()
+    return await client.get_data(query)
+
+  data = asyncio.run(run())
+  assert [response.data[0].key[0] for response in data] == ["one", "two", "three"]
+  assert len(data) == 3
+
+def test_async_and_sync_clients_return_identical_results(monkeypatch: MonkeyPatch):
+  async def run():
+    client = create_client(mocked_async_transport())
+    return await client.get_data(await client.create_query(time_top = 0))
+
+  async_data = asyncio.run(run())
+  with monkeypatch.context() as m:
+    sync_client = SCBClient("Test", "Test", "Test", "Test", transport = SCBTransport(), rate_limiter = RateLimiter())
+    m.setattr(sync_client.transport, "get", lambda url: SCBResponse(200, {}, json.dumps(VARIABLES).encode()))
+    m.setattr(sync_client.transport, "post", lambda url, json, stream = False: SCBResponse(200, {}, mocked_data(json)))
+    sync_data = sync_client.get_data(sync_client.create_query())
+  assert async_data == sync_data
+
+def test_many_tables_on_one_event_loop():
+  transport = mocked_async_transport()
+
+  async def fetch_table():
+    client = create_client(transport)
+    return await client.get_data(await client.create_query())
+
+  async def run():
+    return await asyncio.gather(*[fetch_table() for _ in range(5)])
+
+  results = asyncio.run(run())
+  assert len(results) == 5
+  assert transport.posts == 5
+
+def test_async_create_and_validate_client():
+  transport = mocked_async_transport()
+  client = asyncio.run(AsyncSCBClient.create_and_validate_client(
+    "Mocked_response",
+    "Mocked_response",
+    "Mocked_response",
+    "Mocked_response",
+    transport = transport
+  ))
+  assert client.transport is transport
+  assert len(client.perf_mon.download_sessions) == 4
+
+def test_async_metadata_requests_are_rate_limited():
+  class CountingRateLimiter(RateLimiter):
+    def __init__(self):
+      super().__init__()
+      self.acquired = 0
+
+    async def acquire_async(self) -> float:
+      self.acquired += 1
+      return await super().acquire_async()
+
+  async def run():
+    client = await AsyncSCBClient.create_and_validate_client(
+      "Mocked_response", "Mocked_response", "Mocked_response", "Mocked_response", transport = mocked_async_transport(), rate_limiter = rate_limiter
+    )
+    assert client.rate_limiter is rate_limiter
+    assert rate_limiter.acquired == 4
+    client = AsyncSCBClient("Test", "Test", "Test", "Test", transport = mocked_async_transport(), rate_limiter = rate_limiter)
+    await client.get_variables()
+    assert rate_limiter.acquired == 5
+
+  rate_limiter = CountingRateLimiter()
+  asyncio.run(run())
+
+@pytest.mark.parametrize("response_type, result_type", [
+  (ResponseType.AUTO, ResultType.DEFAULT), (ResponseType.JSON, ResultType.COLUMNAR), (ResponseType.JSON, ResultType.ARROW)
+])
+def test_async_variables_are_loaded_before_the_sync_client_needs_them(response_type: ResponseType, result_type: ResultType):
+  if result_type == ResultType.ARROW:
+    pytest.importorskip("pyarrow")
+
+  async def run():
+    query = await create_client(mocked_async_transport()).create_query(response_type = response_type)
+    client = create_client(mocked_async_transport())
+    client._client._get_metadata = lambda *args: pytest.fail("The sync client fetched the variables.")
+    return await client.get_data(query, result_type)
+
+  assert asyncio.run(run()) != None
+
+def test_async_create_and_validate_client_unknown_metadata():
+  with pytest.raises(ValueError):
+    asyncio.run(AsyncSCBClient.create_and_validate_client(
+      "Mocked_unkown_response",
+      "Mocked_response",
+      "Mocked_response",
+      "Mocked_response",
+      transport = mocked_async_transport()
+    ))
+
+def test_async_iter_data_yields_partitions_in_order():
+  async def run():
+    client = create_client(mocked_async_transport())
+    client._client._SCB_LIMIT_RESULT = 3
+    client.set_max_workers(2)
+    await client.set_preferred_partition_variable_code("first_code")
+    query = await client.create_query()
+    return [response.data[0].key[0] async for response in client.iter_data(query)]
+
+  assert asyncio.run(run()) == ["one", "two", "three"]
+
+def test_async_iter_data_can_stop_early():
+  transport = mocked_async_transport()
+
+  async def run():
+    client = create_client(transport)
+    client._client._SCB_LIMIT_RESULT = 3
+    client.set_max_workers(1)
+    await client.set_preferred_partition_variable_code("first_code")
+    iterator = client.iter_data(await client.create_query())
+    async for response in iterator:
+      break
+    await iterator.aclose()
+    return response
+
+  response = asyncio.run(run())
+  assert response.data[0].key[0] == "one"
+  assert transport.posts < 3
+
+def test_async_responses_are_parsed_off_the_event_loop():
+  threads = []
+
+  class RecordingDecoder(JsonDecoder):
+    def loads(self, content: bytes):
+      threads.append(threading.get_ident())
+      return super().loads(content)
+
+  async def run():
+    client = AsyncSCBClient("Test", "Test", "Test", "Test", transport = mocked_async_transport(), rate_limiter = RateLimiter(), json_decoder = RecordingDecoder())
+    await client.get_data(await client.create_query())
+    return threading.get_ident()
+
+  loop_thread = asyncio.run(run())
+  assert len(threads) == 1
+  assert threads[0] != loop_thread
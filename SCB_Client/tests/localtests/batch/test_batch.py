@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+import pytest
+from pytest import MonkeyPatch
+
+from SCB_Client import JobStatus, SCBBatch, SCBClient, SCBJob
+from SCB_Client.SCBClientUtilities import RateLimiter, SCBResponse, SCBTransport
+from SCB_Client.tests.helpers import mock_variables, mocked_body
+
+def create_client(m: MonkeyPatch, table: str, transport: SCBTransport, rate_limiter: RateLimiter) -> SCBClient:
+  client = SCBClient("Test", "Test", "Test", table, transport = transport, rate_limiter = rate_limiter)
+  m.setattr(client, "get_variables", mock_variables)
+  client.set_preferred_partition_variable_code("first_code")
+  client._SCB_LIMIT_RESULT = 3 # Full queries are 3 partitions
+  return client
+
+def create_clients(m: MonkeyPatch, tables: list, posts: list) -> list:
+  transport = SCBTransport()
+  rate_limiter = RateLimiter()
+
+  def mocked_post(url: str, json: dict, stream: bool = False):
+    posts.append((url.split("/")[-1], json["query"][0]["selection"]["values"]))
+    return SCBResponse(200, {}, mocked_body(json))
+  m.setattr(transport, "post", mocked_post)
+  return [create_client(m, table, transport, rate_limiter) for table in tables]
+
+def test_batch_returns_results_in_job_order(monkeypatch: MonkeyPatch):
+  with monkeypatch.context() as m:
+    small, large = create_clients(m, ["Small", "Large"], [])
+    results = SCBBatch([
+      SCBJob(small, small.create_query({"first_code": ["one"]})),
+      SCBJob(large, large.create_query())
+    ]).run()
+  assert [result.name for result in results] == ["Small", "Large"]
+  assert [result.error for result in results] == [None, None]
+  assert [len(partition.data) for partition in results[0].data] == [3]
+  assert [partition.data[0].key[0] for partition in results[1].data] == ["one", "two", "three"]
+
+def test_batch_schedules_by_deadline_then_size(monkeypatch: MonkeyPatch):
+  posts = []
+  with monkeypatch.context() as m:
+    small, large, urgent = create_clients(m, ["Small", "Large", "Urgent"], posts)
+    SCBBatch([
+      SCBJob(small, small.create_query({"first_code": ["one"]})),
+      SCBJob(large, large.create_query()),
+      SCBJob(urgent, urgent.create_query({"first_code": ["two"]}), deadline = datetime.now() + timedelta(hours = 1))
+    ], max_workers = 1).run()
+  assert [table for table, _ in posts] == ["Urgent", "Large", "Large", "Large", "Small"]
+
+def test_failed_job_does_not_stop_batch(monkeypatch: MonkeyPatch):
+  with monkeypatch.context() as m:
+    limited, ok = create_clients(m, ["Limited", "Ok"], [])
+    limited.set_size_limit(1)
+    results = SCBBatch([SCBJob(limited, limited.create_query()), SCBJob(ok, ok.create_query(), name = "Named")]).run()
+  assert isinstance(results[0].error, PermissionError)
+  assert results[0].data == None
+  assert results[1].name == "Named"
+  assert len(results[1].data) == 3
+
+def test_failed_partition_skips_rest_of_job(monkeypatch: MonkeyPatch):
+  posts = []
+  with monkeypatch.context() as m:
+    failing, = create_clients(m, ["Failing"], posts)
+    m.setattr(failing.transport, "post", lambda url, json, stream = False: posts.append(url) or SCBResponse(404, {}, b""))
+    batch = SCBBatch([SCBJob(failing, failing.create_query())], max_workers = 1)
+    results = batch.run()
+  assert results[0].error != None
+  assert len(posts) == 1
+  assert batch.get_progress()[0].status == JobStatus.FAILED
+
+def test_batch_reports_progress(monkeypatch: MonkeyPatch):
+  reported = []
+  with monkeypatch.context() as m:
+    client, = create_clients(m, ["Table"], [])
+    batch = SCBBatch([SCBJob(client, client.create_query())], on_progress = reported.append)
+    batch.run()
+  done = [progress for progress in reported if progress.partitions_done > 0]
+  assert [progress.partitions_done for progress in done] == [1, 2, 3]
+  assert done[-1].status == JobStatus.DONE
+  assert done[-1].fraction_done() == 1
+  assert batch.get_progress()[0].cells_done == 9
+
+def test_batch_validates_max_workers():
+  with pytest.raises(ValueError):
+    SCBBatch([], max_workers = 31)
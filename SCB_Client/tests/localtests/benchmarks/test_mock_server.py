@@ -0,0 +1,83 @@
+import asyncio
+import time
+
+import pytest
+
+from SCB_Client import AsyncSCBClient, ResponseType, ResultType, SCBClient
+from SCB_Client.benchmarks.mock_server import MockSCBServer, SyntheticTable
+from SCB_Client.SCBClientUtilities import RateLimiter
+
+TABLE_PATH = ("BE", "BE0101", "BE0101A", "Synthetic")
+
+@pytest.fixture
+def server():
+  with MockSCBServer({TABLE_PATH: SyntheticTable({"Region": 4, "Alder": 3, "Tid": 5}, contents = 2)}, max_requests = 0) as server:
+    yield server
+
+def create_client(server: MockSCBServer) -> SCBClient:
+  return SCBClient.create_and_validate_client(*TABLE_PATH, transport = server.create_transport(), rate_limiter = RateLimiter(max_requests = 1000, window_seconds = 1))
+
+def test_client_is_validated_against_the_tree(server: MockSCBServer):
+  client = create_client(server)
+  assert [var.code for var in client.get_variables()] == ["Region", "Alder", "Tid", "ContentsCode"]
+  assert [var.time for var in client.get_variables()] == [False, False, True, False]
+  with pytest.raises(ValueError):
+    SCBClient.create_and_validate_client(*TABLE_PATH[:3], "Missing", transport = server.create_transport())
+
+def test_json_data(server: MockSCBServer):
+  client = create_client(server)
+  data = client.get_data(client.create_query({"Region": ["0", "1"]}))
+  assert [column["type"] for column in data[0].columns] == ["d", "d", "t", "c", "c"]
+  assert len(data[0].data) == 2 * 3 * 5
+  assert data[0].data[0].key == ["0", "0", "2000M01"]
+  assert client.get_data(client.create_query({"Region": ["0", "1"]}), result_type = ResultType.COLUMNAR)[0].values["C01"].shape == (30,)
+
+def test_csv_data(server: MockSCBServer):
+  client = create_client(server)
+  rows = client.get_data(client.create_query(response_type = ResponseType.CSV))[0]
+  assert len(rows) == 4 * 3
+  assert list(rows[0])[:3] == ["region", "alder", "Innehåll 0 2000M01"]
+  assert len(rows[0]) == 2 + 2 * 5
+
+def test_responses_are_deterministic(server: MockSCBServer):
+  client = create_client(server)
+  first = client.transport.post(client.data_url, client.create_query().to_dict()).content
+  assert server.tables[TABLE_PATH].create_data({"Region": ["0", "1", "2", "3"], "Alder": ["0", "1", "2"], "Tid": client.get_variables()[2].values}, "json") == first
+
+def test_partitions_are_within_the_cell_limit():
+  with MockSCBServer({TABLE_PATH: SyntheticTable({"Region": 10, "Alder": 10, "Tid": 3})}, max_requests = 0, max_cells = 100) as server:
+    client = create_client(server)
+    query = client.create_query()
+    assert client.transport.post(client.data_url, query.to_dict()).status_code == 403
+    client._SCB_LIMIT_RESULT = 100
+    assert sum([len(response.data) for response in client.get_data(query)]) == 300
+
+def test_invalid_selection(server: MockSCBServer):
+  client = create_client(server)
+  query = client.create_query()
+  query.query[0].selection.values = ["missing"]
+  assert client.transport.post(client.data_url, query.to_dict()).status_code == 400
+
+def test_requests_are_throttled():
+  with MockSCBServer({TABLE_PATH: SyntheticTable({"Region": 2, "Tid": 2})}, max_requests = 2, window_seconds = 10) as server:
+    transport = server.create_transport()
+    url = SCBClient._SCB_BASE_URL
+    assert [transport.get(url).status_code for _ in range(3)] == [200, 200, 429]
+    assert 1 <= int(transport.get(url).headers["Retry-After"]) <= 10
+    assert server.request_count == 4
+    assert server.throttled_count == 2
+
+def test_latency():
+  with MockSCBServer({TABLE_PATH: SyntheticTable({"Region": 2, "Tid": 2})}, max_requests = 0, latency_seconds = 0.05) as server:
+    transport = server.create_transport()
+    start = time.monotonic()
+    transport.get(SCBClient._SCB_BASE_URL)
+    assert time.monotonic() - start >= 0.05
+
+def test_async_client(server: MockSCBServer):
+  async def run():
+    async with await AsyncSCBClient.create_and_validate_client(*TABLE_PATH, transport = server.create_async_transport()) as client:
+      return await client.get_data(await client.create_query())
+
+  data = asyncio.run(run())
+  assert len(data[0].data) == 4 * 3 * 5
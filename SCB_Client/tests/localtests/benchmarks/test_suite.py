@@ -0,0 +1,36 @@
+import json
+
+from SCB_Client.benchmarks.suite import compare, format_report, load_baselines, run_benchmarks, save_baselines
+
+def test_compare():
+  results = {name: {"median_seconds": 1.0} for name in ["same", "slower", "faster", "new"]}
+  baselines = {"same": {"median_seconds": 0.9}, "slower": {"median_seconds": 0.5}, "faster": {"median_seconds": 2.0}}
+  rows = {row["name"]: row for row in compare(results, baselines, tolerance = 0.25)}
+  assert [rows[name]["status"] for name in ["same", "slower", "faster", "new"]] == ["ok", "regression", "improvement", "new"]
+  assert rows["slower"]["change"] == 1.0
+  assert rows["new"]["baseline"] == None
+
+def test_report_lists_every_benchmark():
+  rows = compare({"first": {"median_seconds": 1.0}, "second": {"median_seconds": 1.0}}, {"first": {"median_seconds": 0.5}})
+  report = format_report(rows).splitlines()
+  assert len(report) == 3
+  assert "+100.0%" in report[1] and "regression" in report[1]
+  assert report[2].endswith("new")
+
+def test_baselines_are_merged(tmp_path):
+  path = str(tmp_path / "baselines.json")
+  assert load_baselines(path) == {}
+  save_baselines({"first": {"median_seconds": 1.0}}, path)
+  save_baselines({"second": {"median_seconds": 2.0}}, path)
+  assert load_baselines(path) == {"first": {"median_seconds": 1.0}, "second": {"median_seconds": 2.0}}
+  with open(path) as file:
+    assert "python" in json.load(file)
+
+def test_benchmarks_run():
+  results = run_benchmarks(["get_data_json", "parse_csv", "create_and_validate_client"], repeats = 1, scale = 0.01)
+  assert list(results) == ["get_data_json", "parse_csv", "create_and_validate_client"]
+  assert all([result["median_seconds"] > 0 for result in results.values()])
+
+def test_stored_baselines_cover_every_benchmark():
+  from SCB_Client.benchmarks.suite import BENCHMARKS
+  assert set(BENCHMARKS).issubset(load_baselines())
@@ -0,0 +1,123 @@
+import json
+import multiprocessing
+import sqlite3
+import time
+import pytest
+from pytest import MonkeyPatch
+
+from SCB_Client import SCBClient
+from SCB_Client.SCBClientUtilities import MetadataCache, SCBResponse, SCBTransport
+
+VARIABLES = {
+  "variables": [
+    {"code": "first_code", "text": "first_code", "values": ["one", "two"], "valueTexts": ["one", "two"]}
+  ]
+}
+
+def test_get_missing_url(tmp_path):
+  cache = MetadataCache(tmp_path / "metadata.sqlite")
+  assert cache.get("https://example") == None
+
+def test_set_and_get(tmp_path):
+  cache = MetadataCache(tmp_path / "metadata.sqlite")
+  cache.set("https://example", b"content")
+  assert cache.get("https://example") == b"content"
+  assert MetadataCache(tmp_path / "metadata.sqlite").get("https://example") == b"content", "The cache should persist between instances."
+
+def test_stale_entries_are_not_returned(tmp_path):
+  cache = MetadataCache(tmp_path / "metadata.sqlite", ttl_seconds = 0.05)
+  cache.set("https://example", b"content")
+  time.sleep(0.1)
+  assert cache.get("https://example") == None
+  assert cache.size_bytes() == 0
+
+def test_least_recently_used_is_evicted(tmp_path):
+  cache = MetadataCache(tmp_path / "metadata.sqlite", max_bytes = 10)
+  cache.set("first", b"12345")
+  cache.set("second", b"12345")
+  cache.get("first")
+  cache.set("third", b"12345")
+  assert cache.get("second") == None
+  assert cache.get("first") == b"12345"
+  assert cache.get("third") == b"12345"
+  assert cache.size_bytes() <= 10
+
+def test_size_is_kept_without_summing_the_entries(tmp_path):
+  path = str(tmp_path / "metadata.sqlite")
+  cache = MetadataCache(path, max_bytes = 20)
+  cache.set("first", b"12345")
+  cache.set("first", b"123") # Replaced
+  cache.set("second", b"1234567890")
+  assert cache.size_bytes() == 13
+  cache.set("third", b"1234567890") # Evicts first
+  assert cache.get("first") == None
+  assert cache.size_bytes() == 20
+  cache.delete("second")
+  cache.delete("missing")
+  assert cache.size_bytes() == 10
+  connection = sqlite3.connect(path)
+  connection.execute("DROP TABLE totals") # Databases of earlier versions have no totals
+  connection.close()
+  assert MetadataCache(path).size_bytes() == 10
+  cache.clear()
+  assert cache.size_bytes() == 0
+
+@pytest.mark.parametrize("kwargs", [{"ttl_seconds": 0}, {"max_bytes": 0}])
+def test_invalid_settings(tmp_path, kwargs):
+  with pytest.raises(ValueError):
+    MetadataCache(tmp_path / "metadata.sqlite", **kwargs)
+
+def write_entries(path: str, worker: int):
+  cache = MetadataCache(path)
+  for i in range(20):
+    cache.set(f"{worker}/{i}", b"x" * 100)
+
+def test_shared_between_processes(tmp_path):
+  path = str(tmp_path / "metadata.sqlite")
+  MetadataCache(path)
+  processes = [multiprocessing.Process(target = write_entries, args = (path, worker)) for worker in range(4)]
+  for process in processes:
+    process.start()
+  for process in processes:
+    process.join()
+  assert all(process.exitcode == 0 for process in processes)
+  assert MetadataCache(path).size_bytes() == 4 * 20 * 100
+
+def test_variables_are_served_from_cache(tmp_path, monkeypatch: MonkeyPatch):
+  cache = MetadataCache(tmp_path / "metadata.sqlite")
+  requested_urls = []
+
+  def mocked_get(url: str):
+    requested_urls.append(url)
+    return SCBResponse(200, {}, json.dumps(VARIABLES).encode())
+
+  with monkeypatch.context() as m:
+    transport = SCBTransport()
+    m.setattr(transport, "get", mocked_get)
+    first_client = SCBClient("Test", "Test", "Test", "Test", transport = transport, metadata_cache = cache)
+    second_client = SCBClient("Test", "Test", "Test", "Test", transport = transport, metadata_cache = cache)
+    assert first_client.get_variables() == second_client.get_variables()
+  assert len(requested_urls) == 1
+
+def test_tree_is_served_from_cache(tmp_path, monkeypatch: MonkeyPatch):
+  cache = MetadataCache(tmp_path / "metadata.sqlite")
+  requested_urls = []
+
+  def mocked_get(url: str):
+    requested_urls.append(url)
+    return SCBResponse(200, {}, b'[{"id": "Mocked_response"}]')
+
+  with monkeypatch.context() as m:
+    transport = SCBTransport()
+    m.setattr(transport, "get", mocked_get)
+    for _ in range(2):
+      client = SCBClient.create_and_validate_client(
+        "Mocked_response",
+        "Mocked_response",
+        "Mocked_response",
+        "Mocked_response",
+        transport = transport,
+        metadata_cache = cache
+      )
+  assert len(requested_urls) == 4
+  assert client.metadata_cache is cache
@@ -0,0 +1,92 @@
+import pytest
+from pytest import MonkeyPatch
+
+from SCB_Client import SCBClient, CachePolicy, ResponseType
+from SCB_Client.model.scb_models import SCBQuery, SCBQueryVariable, SCBQueryVariableSelection
+from SCB_Client.SCBClientUtilities import RateLimiter, ResponseCache, SCBResponse
+from SCB_Client.tests.helpers import create_mocked_client
+
+class counting_rate_limiter(RateLimiter):
+  def __init__(self):
+    super().__init__()
+    self.acquired = 0
+
+  def acquire(self) -> float:
+    self.acquired += 1
+    return super().acquire()
+
+def create_client(m: MonkeyPatch, cache: ResponseCache, posts: list) -> SCBClient:
+  return create_mocked_client(m, posts, response_cache = cache, rate_limiter = counting_rate_limiter())
+
+def query_of(first_values: list, second_values: list, reverse_variables: bool = False) -> SCBQuery:
+  variables = [
+    SCBQueryVariable("first_code", SCBQueryVariableSelection("item", first_values)),
+    SCBQueryVariable("second_code", SCBQueryVariableSelection("item", second_values))
+  ]
+  return SCBQuery(variables[::-1] if reverse_variables else variables, ResponseType.JSON)
+
+def test_key_is_normalized():
+  key = ResponseCache.create_key("url", query_of(["one", "two"], ["four", "five"]))
+  assert key == ResponseCache.create_key("url", query_of(["two", "one"], ["five", "four"], reverse_variables = True))
+
+@pytest.mark.parametrize("url, query", [
+  ("other_url", query_of(["one", "two"], ["four", "five"])),
+  ("url", query_of(["one"], ["four", "five"])),
+  ("url", SCBQuery(query_of(["one", "two"], ["four", "five"]).query, ResponseType.CSV))
+])
+def test_key_differs(url, query):
+  assert ResponseCache.create_key("url", query_of(["one", "two"], ["four", "five"])) != ResponseCache.create_key(url, query)
+
+def test_bodies_are_compressed(tmp_path):
+  cache = ResponseCache(tmp_path / "responses.sqlite")
+  cache.set("key", b"a" * 10000)
+  assert cache.get("key") == b"a" * 10000
+  assert cache.size_bytes() < 1000
+
+def test_cache_hit_makes_no_request(tmp_path, monkeypatch: MonkeyPatch):
+  cache = ResponseCache(tmp_path / "responses.sqlite")
+  posts = []
+  with monkeypatch.context() as m:
+    client = create_client(m, cache, posts)
+    first = client.get_data(client.create_query())
+    acquired = client.rate_limiter.acquired
+    second = client.get_data(client.create_query())
+  assert first == second
+  assert len(posts) == 1
+  assert client.rate_limiter.acquired == acquired, "Cache hits shouldn't use the rate limiter."
+
+def test_refresh_downloads_and_stores(tmp_path, monkeypatch: MonkeyPatch):
+  cache = ResponseCache(tmp_path / "responses.sqlite")
+  posts = []
+  with monkeypatch.context() as m:
+    client = create_client(m, cache, posts)
+    client.get_data(client.create_query(), cache_policy = CachePolicy.REFRESH)
+    client.get_data(client.create_query(), cache_policy = CachePolicy.REFRESH)
+    client.get_data(client.create_query())
+  assert len(posts) == 2
+
+def test_bypass_neither_reads_nor_writes(tmp_path, monkeypatch: MonkeyPatch):
+  cache = ResponseCache(tmp_path / "responses.sqlite")
+  posts = []
+  with monkeypatch.context() as m:
+    client = create_client(m, cache, posts)
+    client.get_data(client.create_query(), cache_policy = CachePolicy.BYPASS)
+  assert len(posts) == 1
+  assert cache.size_bytes() == 0
+
+def test_csv_responses_are_cached(tmp_path, monkeypatch: MonkeyPatch):
+  cache = ResponseCache(tmp_path / "responses.sqlite")
+  posts = []
+  with monkeypatch.context() as m:
+    client = create_client(m, cache, posts)
+    m.setattr(client.transport, "post", lambda url, json, stream = False: posts.append(stream) or SCBResponse(200, {}, b'"a","b"\r\n1,2\r\n'))
+    first = client.get_data(client.create_query(response_type = ResponseType.CSV))
+    second = client.get_data(client.create_query(response_type = ResponseType.CSV))
+  assert first == second == [[{"a": "1", "b": "2"}]]
+  assert posts == [False], "The body is read before it's cached, so it's not streamed."
+
+def test_invalid_cache_policy(tmp_path, monkeypatch: MonkeyPatch):
+  with monkeypatch.context() as m:
+    client = create_client(m, ResponseCache(tmp_path / "responses.sqlite"), [])
+    with pytest.raises(TypeError):
+      client.get_data(client.create_query(), cache_policy = "use")
@@ -0,0 +1,99 @@
+import asyncio
+import json
+from pytest import MonkeyPatch
+
+from SCB_Client import AsyncSCBClient, SCBClient, CachePolicy
+from SCB_Client.SCBClientUtilities import RateLimiter, ResponseCache, split_json_response, stitch_json_responses
+from SCB_Client.tests.helpers import (MOCKED_TIME_COLUMNS, create_mocked_client, mock_variables_with_time,
+                                     mocked_async_transport, mocked_time_body)
+
+def create_client(m: MonkeyPatch, cache: ResponseCache, posts: list) -> SCBClient:
+  client = create_mocked_client(m, posts, mock_variables_with_time, mocked_time_body, response_cache = cache)
+  client.set_preferred_partition_variable_code("time_code")
+  return client
+
+def time_values_of(posted_query: dict) -> list:
+  return [var["selection"]["values"] for var in posted_query["query"] if var["code"] == "time_code"][0]
+
+def test_split_and_stitch():
+  json_data = json.loads(mocked_time_body({"query": [
+    {"code": "first_code", "selection": {"values": ["one", "two"]}},
+    {"code": "time_code", "selection": {"values": ["2000", "2001"]}}
+  ]}))
+  slices = split_json_response(json_data, "time_code", ["2000", "2001"])
+  assert [datapoint["key"] for datapoint in slices["2001"]["data"]] == [["one", "2001"], ["two", "2001"]]
+  stitched = stitch_json_responses([slices["2000"], slices["2001"]])
+  assert sorted(map(str, stitched["data"])) == sorted(map(str, json_data["data"]))
+  stitched = stitch_json_responses([slices["2000"], slices["2001"]], {"first_code": ["one", "two"], "time_code": ["2000", "2001"]})
+  assert stitched == json_data
+
+def test_split_by_content_variable_is_not_possible():
+  assert split_json_response({"columns": MOCKED_TIME_COLUMNS, "comments": [], "data": []}, "content", ["content"]) == None
+
+def test_only_missing_values_are_downloaded(tmp_path, monkeypatch: MonkeyPatch):
+  cache = ResponseCache(tmp_path / "responses.sqlite")
+  posts = []
+  with monkeypatch.context() as m:
+    client = create_client(m, cache, posts)
+    client.get_data(client.create_query({"first_code": ["one", "two"], "third_code": ["%"], "second_code": ["%"], "time_code": ["2000", "2001", "2002"]}))
+    data = client.get_data(client.create_query({"first_code": ["one", "two"], "third_code": ["%"], "second_code": ["%"], "time_code": ["2001", "2002", "2003"]}))
+  assert len(posts) == 2
+  assert time_values_of(posts[1]) == ["2003"]
+  assert [datapoint.key for datapoint in data[0].data] == [
+    ["one", "2001"], ["one", "2002"], ["one", "2003"], ["two", "2001"], ["two", "2002"], ["two", "2003"]
+  ]
+
+def test_results_are_identical_with_and_without_cache_hits(tmp_path, monkeypatch: MonkeyPatch):
+  cache = ResponseCache(tmp_path / "responses.sqlite")
+  posts = []
+  with monkeypatch.context() as m:
+    client = create_client(m, cache, posts)
+    selection = {"first_code": ["one", "two"], "third_code": ["%"], "second_code": ["%"], "time_code": ["2000", "2001"]}
+    first = client.get_data(client.create_query(selection))
+    second = client.get_data(client.create_query(selection))
+  assert first == second
+  assert len(posts) == 1
+
+def test_rows_are_ordered_like_without_a_cache(tmp_path, monkeypatch: MonkeyPatch):
+  selection = {"first_code": ["two", "one"], "third_code": ["%"], "second_code": ["%"]}
+  full_selection = {**selection, "time_code": ["2001", "2000", "2002"]}
+  with monkeypatch.context() as m:
+    uncached_client = create_mocked_client(m, [], mock_variables_with_time, mocked_time_body)
+    expected = uncached_client.get_data(uncached_client.create_query(full_selection))
+    cold_client = create_client(m, ResponseCache(tmp_path / "cold.sqlite"), [])
+    cold = cold_client.get_data(cold_client.create_query(full_selection))
+    client = create_client(m, ResponseCache(tmp_path / "responses.sqlite"), [])
+    client.get_data(client.create_query({**selection, "time_code": ["2000"]}))
+    partly_cached = client.get_data(client.create_query(full_selection))
+  assert [datapoint.key for datapoint in expected[0].data][:3] == [["two", "2001"], ["two", "2000"], ["two", "2002"]]
+  assert cold == expected
+  assert partly_cached == expected
+
+def test_refresh_downloads_every_value(tmp_path, monkeypatch: MonkeyPatch):
+  cache = ResponseCache(tmp_path / "responses.sqlite")
+  posts = []
+  with monkeypatch.context() as m:
+    client = create_client(m, cache, posts)
+    selection = {"first_code": ["one"], "third_code": ["%"], "second_code": ["%"], "time_code": ["2000", "2001"]}
+    client.get_data(client.create_query(selection))
+    client.get_data(client.create_query(selection), cache_policy = CachePolicy.REFRESH)
+  assert [time_values_of(posted) for posted in posts] == [["2000", "2001"], ["2000", "2001"]]
+
+def test_async_client_reuses_sync_clients_slices(tmp_path, monkeypatch: MonkeyPatch):
+  cache = ResponseCache(tmp_path / "responses.sqlite")
+  posts = []
+  selection = {"first_code": ["one"], "third_code": ["%"], "second_code": ["%"], "time_code": ["2000", "2001"]}
+  with monkeypatch.context() as m:
+    client = create_client(m, cache, posts)
+    client.get_data(client.create_query(selection))
+
+  async def run():
+    async_client = AsyncSCBClient("Test", "Test", "Test", "Test", transport = mocked_async_transport(posts, mocked_time_body), rate_limiter = RateLimiter(), response_cache = cache)
+    async_client._client._variables = mock_variables_with_time()
+    await async_client.set_preferred_partition_variable_code("time_code")
+    query = await async_client.create_query({**selection, "time_code": ["2001", "2002"]})
+    return await async_client.get_data(query)
+
+  data = asyncio.run(run())
+  assert [time_values_of(posted) for posted in posts] == [["2000", "2001"], ["2002"]]
+  assert [datapoint.key for datapoint in data[0].data] == [["one", "2001"], ["one", "2002"]]
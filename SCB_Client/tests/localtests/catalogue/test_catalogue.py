@@ -0,0 +1,107 @@
+import json
+from threading import Lock
+from pytest import MonkeyPatch
+
+from SCB_Client import SCBCatalogue, SCBClient
+from SCB_Client.SCBClientUtilities import RateLimiter, SCBResponse, SCBTransport
+
+TREE = {
+  "": [{"id": "BE", "type": "l", "text": "Befolkning"}, {"id": "AM", "type": "l", "text": "Arbetsmarknad"}],
+  "/BE": [{"id": "BE0101", "type": "l", "text": "Befolkningsstatistik"}],
+  "/BE/BE0101": [{"id": "BE0101A", "type": "l", "text": "Folkmängd"}],
+  "/BE/BE0101/BE0101A": [
+    {"id": "BefolkManad", "type": "t", "text": "Folkmängden per månad efter region, ålder och kön"},
+    {"id": "BefolkningNy", "type": "t", "text": "Folkmängden efter region och civilstånd"}
+  ],
+  "/AM": [{"id": "AM0401", "type": "l", "text": "Arbetskraftsundersökningarna"}],
+  "/AM/AM0401": [{"id": "AM0401A", "type": "l", "text": "Grunddata"}],
+  "/AM/AM0401/AM0401A": [{"id": "NAKUBefolkning", "type": "t", "text": "Befolkningen efter arbetskraftstillhörighet"}],
+  "/BE/BE0101/BE0101A/BefolkManad": {"title": "Folkmängden", "variables": [
+    {"code": "Region", "text": "region", "values": ["00"], "valueTexts": ["Riket"]},
+    {"code": "Kon", "text": "kön", "values": ["1", "2"], "valueTexts": ["män", "kvinnor"]},
+    {"code": "Tid", "text": "månad", "values": ["2022M12"], "valueTexts": ["2022M12"], "time": True}
+  ]},
+  "/BE/BE0101/BE0101A/BefolkningNy": {"title": "Folkmängden", "variables": [
+    {"code": "Region", "text": "region", "values": ["00"], "valueTexts": ["Riket"]},
+    {"code": "Civilstand", "text": "civilstånd", "values": ["OG"], "valueTexts": ["ogifta"]}
+  ]},
+  "/AM/AM0401/AM0401A/NAKUBefolkning": {"title": "Befolkningen", "variables": [
+    {"code": "Kon", "text": "kön", "values": ["1", "2"], "valueTexts": ["män", "kvinnor"]}
+  ]}
+}
+
+def create_transport(m: MonkeyPatch, requested_urls: list, limited_urls: set = set()) -> SCBTransport:
+  transport = SCBTransport()
+  lock = Lock()
+
+  def mocked_get(url: str):
+    with lock:
+      requested_urls.append(url)
+      if url in limited_urls:
+        limited_urls.remove(url)
+        return SCBResponse(429, {"Retry-After": "0"}, b"")
+    path = url[len(SCBClient._SCB_BASE_URL):]
+    if path not in TREE:
+      return SCBResponse(404, {}, b"")
+    return SCBResponse(200, {}, json.dumps(TREE[path]).encode("utf-8"))
+  m.setattr(transport, "get", mocked_get)
+  return transport
+
+def crawl(m: MonkeyPatch, tmp_path, requested_urls: list = None, **kwargs) -> SCBCatalogue:
+  catalogue = SCBCatalogue(str(tmp_path / "catalogue.sqlite"))
+  transport = create_transport(m, requested_urls if requested_urls != None else [], kwargs.pop("limited_urls", set()))
+  kwargs.setdefault("rate_limiter", RateLimiter())
+  assert catalogue.crawl(transport = transport, **kwargs) == []
+  return catalogue
+
+def test_crawl_indexes_every_table(monkeypatch: MonkeyPatch, tmp_path):
+  requested_urls = []
+  with monkeypatch.context() as m:
+    catalogue = crawl(m, tmp_path, requested_urls)
+  assert len(requested_urls) == len(TREE)
+  entries = catalogue.search("")
+  assert [entry.path for entry in entries] == [
+    ["AM", "AM0401", "AM0401A", "NAKUBefolkning"],
+    ["BE", "BE0101", "BE0101A", "BefolkManad"],
+    ["BE", "BE0101", "BE0101A", "BefolkningNy"]
+  ]
+  assert [var.code for var in entries[1].variables] == ["Region", "Kon", "Tid"]
+
+def test_crawl_without_variables(monkeypatch: MonkeyPatch, tmp_path):
+  requested_urls = []
+  with monkeypatch.context() as m:
+    catalogue = crawl(m, tmp_path, requested_urls, include_variables = False, root = ["BE"])
+  assert len(requested_urls) == 3
+  assert [entry.variables for entry in catalogue.search("")] == [None, None]
+
+def test_crawl_retries_limited_requests(monkeypatch: MonkeyPatch, tmp_path):
+  requested_urls = []
+  with monkeypatch.context() as m:
+    # The back off empties the limiter, a fast one keeps the test quick
+    rate_limiter = RateLimiter(max_requests = 1000, window_seconds = 1)
+    catalogue = crawl(m, tmp_path, requested_urls, limited_urls = {SCBClient._SCB_BASE_URL + "/BE"}, rate_limiter = rate_limiter)
+  assert len(requested_urls) == len(TREE) + 1
+  assert len(catalogue.search("")) == 3
+
+def test_search_tokens_and_substrings(monkeypatch: MonkeyPatch, tmp_path):
+  with monkeypatch.context() as m:
+    catalogue = crawl(m, tmp_path)
+  assert [entry.path[-1] for entry in catalogue.search("MÅNAD")] == ["BefolkManad"]
+  assert [entry.path[-1] for entry in catalogue.search("folkmängd civil")] == ["BefolkningNy"]
+  # Kön is a variable of both tables but only in the text of BefolkManad, so it comes first
+  assert [entry.path[-1] for entry in catalogue.search("kön befolk")] == ["BefolkManad", "NAKUBefolkning"]
+  assert catalogue.search("100%") == []
+  assert len(catalogue.search("befolk", limit = 2)) == 2
+
+def test_catalogue_serves_clients_offline(monkeypatch: MonkeyPatch, tmp_path):
+  requested_urls = []
+  with monkeypatch.context() as m:
+    catalogue = crawl(m, tmp_path)
+    offline_transport = create_transport(m, requested_urls)
+    client = SCBClient.create_and_validate_client(
+      "BE", "BE0101", "BE0101A", "BefolkManad",
+      transport = offline_transport,
+      metadata_cache = catalogue
+    )
+    assert [var.code for var in client.get_variables()] == ["Region", "Kon", "Tid"]
+  assert requested_urls == []
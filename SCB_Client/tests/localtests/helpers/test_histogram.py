@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+from SCB_Client.SCBClientUtilities import LatencyHistogram
+
+
+def test_empty_histogram():
+  histogram = LatencyHistogram()
+  assert len(histogram) == 0
+  assert histogram.percentile(50) == None
+  assert histogram.buckets() == {}
+
+def test_small_values_are_exact():
+  histogram = LatencyHistogram()
+  for value in range(100):
+    histogram.record(value)
+  assert histogram.percentile(50) == 49
+  assert histogram.percentile(0) == 0
+  assert histogram.percentile(100) == 99
+  assert histogram.total == sum(range(100))
+
+def test_percentiles_are_within_relative_error():
+  random.seed(1)
+  values = [int(random.lognormvariate(15, 1.5)) for _ in range(20000)]
+  histogram = LatencyHistogram()
+  for value in values:
+    histogram.record(value)
+  values.sort()
+  for percentile in (50, 95, 99):
+    exact = values[round(percentile / 100 * len(values)) - 1]
+    assert abs(histogram.percentile(percentile) - exact) <= exact * 0.008
+  assert histogram.percentile(100) == values[-1]
+  assert len(histogram.buckets()) < 2000, "Memory should be bounded by the range of values, not their number."
+
+def test_merge():
+  first, second, both = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+  for value in range(0, 10000, 7):
+    first.record(value)
+    both.record(value)
+  for value in range(5, 50000, 11):
+    second.record(value)
+    both.record(value)
+  first.merge(second)
+  assert first.buckets() == both.buckets()
+  assert (first.count, first.total, first.min, first.max) == (both.count, both.total, both.min, both.max)
+
+def test_invalid_values():
+  histogram = LatencyHistogram()
+  with pytest.raises(ValueError):
+    histogram.record(-1)
+  with pytest.raises(ValueError):
+    histogram.percentile(101)
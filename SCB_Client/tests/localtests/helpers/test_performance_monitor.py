@@ -29,7 +29,7 @@ def test_correct_session_is_stopped():
   uuid_to_continue = monitor.start_session(SessionType.PROCESS)
   td = monitor.stop_session(uuid_to_stop)
   assert 200000 < td.microseconds < 400000
-  assert uuid_to_continue in [ses["uuid"] for ses in monitor._PerformanceMonitor__ongoing_sessions]
+  assert uuid_to_continue in monitor._PerformanceMonitor__ongoing_sessions
 
 def test_sum_one_session_type():
   monitor = PerformanceMonitor()
@@ -49,4 +49,45 @@ def test_sum_one_session_type():
     total_microseconds - allowed_difference_microseconds 
     <= monitor.total_session_time_microseconds(SessionType.DOWNLOAD) 
     <= total_microseconds + allowed_difference_microseconds
-  )
\ No newline at end of file
+  )
+
+def test_sessions_are_labelled():
+  monitor = PerformanceMonitor()
+  for partition in ["0", "1", "1"]:
+    uuid = monitor.start_session(SessionType.DOWNLOAD, table = "Test", partition = partition)
+    monitor.stop_session(uuid, byte_count = 100)
+  uuid = monitor.start_session(SessionType.DOWNLOAD, table = "Other")
+  monitor.stop_session(uuid, byte_count = 5, partition = "0")
+
+  assert len(monitor.download_sessions) == 4
+  assert len(monitor.get_histogram(SessionType.DOWNLOAD, table = "Test")) == 3
+  assert len(monitor.get_histogram(SessionType.DOWNLOAD, table = "Test", partition = "1")) == 2
+  assert len(monitor.get_histogram(SessionType.DOWNLOAD, partition = "0")) == 2, "Labels given when stopping should be added."
+  assert len(monitor.get_histogram(SessionType.PROCESS, table = "Test")) == 0
+  assert monitor.get_byte_count(SessionType.DOWNLOAD, table = "Test") == 300
+  assert monitor.get_byte_count(SessionType.DOWNLOAD) == 305
+  assert len(monitor.get_labelled_sessions()) == 3
+
+def test_percentiles():
+  monitor = PerformanceMonitor()
+  assert monitor.get_percentiles_microseconds(SessionType.DOWNLOAD) == {"p50": None, "p95": None, "p99": None}
+  for _ in range(3):
+    uuid = monitor.start_session(SessionType.DOWNLOAD)
+    sleep(0.01)
+    monitor.stop_session(uuid)
+  percentiles = monitor.get_percentiles_microseconds(SessionType.DOWNLOAD)
+  assert 9000 < percentiles["p50"] <= percentiles["p95"] <= percentiles["p99"] < 200000
+
+def test_unknown_session_raises():
+  monitor = PerformanceMonitor()
+  uuid = monitor.start_session(SessionType.DOWNLOAD)
+  monitor.stop_session(uuid)
+  with pytest.raises(KeyError):
+    monitor.stop_session(uuid)
+
+def test_total_is_not_truncated_to_a_second():
+  monitor = PerformanceMonitor()
+  uuid = monitor.start_session(SessionType.PROCESS)
+  sleep(1.1)
+  monitor.stop_session(uuid)
+  assert monitor.total_session_time_microseconds(SessionType.PROCESS) > 1000000
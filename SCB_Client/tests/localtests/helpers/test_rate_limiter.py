@@ -0,0 +1,97 @@
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from time import monotonic
+import pytest
+from pytest import MonkeyPatch
+
+from SCB_Client import SCBClient
+from SCB_Client.SCBClientUtilities import RateLimiter, SCBResponse, SCBTransport
+from SCB_Client.tests.helpers import mock_variables
+
+class mocked_response():
+  def __init__(self, status_code: int, headers: dict = {}):
+    self.status_code = status_code
+    self.headers = headers
+    self.content = b'{"columns": [], "comments": [], "data": []}'
+
+  def json(self):
+    return {"columns": [], "comments": [], "data": []}
+
+def test_shared_limiter_is_shared_between_clients():
+  first_client = SCBClient("Test", "Test", "Test", "Test")
+  second_client = SCBClient("Test", "Test", "Test", "Test")
+  assert first_client.rate_limiter is second_client.rate_limiter is RateLimiter.shared()
+
+def test_burst_plus_refill_stays_within_quota():
+  limiter = RateLimiter(max_requests = 30, window_seconds = 10)
+  assert limiter.burst + limiter._refill_per_second * limiter.window_seconds == 30
+
+def test_invalid_burst():
+  with pytest.raises(ValueError):
+    RateLimiter(max_requests = 5, burst = 5)
+
+def test_burst_is_not_throttled():
+  limiter = RateLimiter(max_requests = 10, window_seconds = 1, burst = 5)
+  start = monotonic()
+  for _ in range(5):
+    limiter.acquire()
+  assert monotonic() - start < 0.05
+
+def test_acquire_waits_for_refill():
+  limiter = RateLimiter(max_requests = 3, window_seconds = 0.2, burst = 1) # One token every 0.1s
+  limiter.acquire()
+  waited = limiter.acquire()
+  assert 0.05 < waited < 0.2
+
+def test_back_off_pauses_limiter():
+  limiter = RateLimiter(max_requests = 10, window_seconds = 1, burst = 5)
+  limiter.back_off(1, "0.2")
+  start = monotonic()
+  limiter.acquire()
+  assert monotonic() - start >= 0.2, "Retry-After should be respected."
+
+@pytest.mark.parametrize("retry_after, expected", [(None, None), ("3", 3.0), ("-1", 0.0), ("garbage", None)])
+def test_parse_retry_after(retry_after, expected):
+  assert RateLimiter.parse_retry_after(retry_after) == expected
+
+def test_parse_retry_after_http_date():
+  retry_at = format_datetime(datetime.now(timezone.utc) + timedelta(seconds = 30), usegmt = True)
+  assert 25 < RateLimiter.parse_retry_after(retry_at) <= 30
+
+def test_client_retries_after_429(monkeypatch: MonkeyPatch):
+  responses = [mocked_response(429, {"Retry-After": "0.1"}), mocked_response(200)]
+  with monkeypatch.context() as m:
+    client = SCBClient("Test", "Test", "Test", "Test", rate_limiter = RateLimiter(max_requests = 30, window_seconds = 1), transport = SCBTransport())
+    m.setattr(client, "get_variables", mock_variables)
+    m.setattr(client.transport, "post", lambda url, json, stream = False: responses.pop(0))
+    start = monotonic()
+    data = client.get_data(client.create_query())
+    assert monotonic() - start >= 0.1
+    assert len(data) == 1
+    assert len(client.perf_mon.download_sessions) == 2, "Every attempt should be monitored."
+
+def test_client_gives_up_after_max_retries(monkeypatch: MonkeyPatch):
+  with monkeypatch.context() as m:
+    client = SCBClient("Test", "Test", "Test", "Test", rate_limiter = RateLimiter(max_requests = 30, window_seconds = 1), transport = SCBTransport())
+    m.setattr(client, "get_variables", mock_variables)
+    m.setattr(client.transport, "post", lambda url, json, stream = False: mocked_response(429, {"Retry-After": "0"}))
+    client._SCB_MAX_RETRIES = 2
+    with pytest.raises(ConnectionError):
+      client.get_data(client.create_query())
+
+def test_client_metadata_requests_are_rate_limited(monkeypatch: MonkeyPatch):
+  class CountingRateLimiter(RateLimiter):
+    def __init__(self):
+      super().__init__()
+      self.acquired = 0
+
+    def acquire(self) -> float:
+      self.acquired += 1
+      return super().acquire()
+
+  rate_limiter = CountingRateLimiter()
+  with monkeypatch.context() as m:
+    client = SCBClient("Test", "Test", "Test", "Test", rate_limiter = rate_limiter, transport = SCBTransport())
+    m.setattr(client.transport, "get", lambda url: SCBResponse(200, {}, b'{"variables": [{"code": "a", "text": "a", "values": ["1"], "valueTexts": ["1"]}]}'))
+    assert [var.code for var in client.get_variables()] == ["a"]
+  assert rate_limiter.acquired == 1
@@ -0,0 +1,118 @@
+import json
+import urllib.request
+
+from pytest import MonkeyPatch
+
+from SCB_Client import MetricsRegistry, SCBClient
+from SCB_Client.SCBClientUtilities import CounterType, PerformanceMonitor, RateLimiter, SCBTransport, SessionType
+from SCB_Client.tests.helpers import mock_variables
+
+class mocked_response():
+  def __init__(self, status_code: int):
+    self.status_code = status_code
+    self.headers = {"Retry-After": "0"} if status_code == 429 else {}
+    self.content = json.dumps(self.json()).encode()
+
+  def json(self):
+    return {"columns": [], "comments": [], "data": []}
+
+def create_monitor() -> PerformanceMonitor:
+  monitor = PerformanceMonitor()
+  for table, partition, duration in [("First", "0", 0.02), ("First", "1", 2.0), ("Second", "0", 0.02)]:
+    uuid = monitor.start_session(SessionType.DOWNLOAD, table = table, partition = partition)
+    # Moves the start back instead of sleeping
+    _, start, labels = monitor._PerformanceMonitor__ongoing_sessions[uuid]
+    monitor._PerformanceMonitor__ongoing_sessions[uuid] = (SessionType.DOWNLOAD, start - int(duration * 1e9), labels)
+    monitor.stop_session(uuid, byte_count = 10)
+  monitor.count(CounterType.REQUESTS, 3, table = "First", partition = "0")
+  monitor.count(CounterType.REQUESTS, 1, table = "Second")
+  return monitor
+
+def get_samples(registry: MetricsRegistry) -> dict:
+  return {
+    (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+    for metric in registry.collect() for sample in metric.samples
+  }
+
+def test_counters_are_summed_over_partitions_and_monitors():
+  registry = MetricsRegistry(monitors = [create_monitor()])
+  registry.register(create_monitor())
+  samples = get_samples(registry)
+  assert samples[("scb_client_requests_total", (("table", "First"),))] == 6
+  assert samples[("scb_client_requests_total", (("table", "Second"),))] == 2
+  assert samples[("scb_client_downloaded_bytes_total", (("table", "First"),))] == 40
+  assert samples[("scb_client_download_seconds_count", (("table", "First"),))] == 4
+
+def test_monitor_is_registered_once():
+  monitor = create_monitor()
+  registry = MetricsRegistry()
+  registry.register(monitor)
+  registry.register(monitor)
+  assert get_samples(registry)[("scb_client_requests_total", (("table", "Second"),))] == 1
+  registry.unregister(monitor)
+  assert ("scb_client_requests_total", (("table", "Second"),)) not in get_samples(registry)
+
+def test_histogram_buckets_are_cumulative():
+  registry = MetricsRegistry(monitors = [create_monitor()], buckets = [0.01, 0.05, 5])
+  samples = get_samples(registry)
+  buckets = [samples[("scb_client_download_seconds_bucket", (("le", le), ("table", "First")))] for le in ["0.01", "0.05", "5.0", "+Inf"]]
+  assert buckets == [0, 1, 2, 2]
+  assert 2.0 < samples[("scb_client_download_seconds_sum", (("table", "First"),))] < 2.1
+
+def test_partitions_can_be_exported():
+  registry = MetricsRegistry(monitors = [create_monitor()], labels = ["table", "partition"])
+  samples = get_samples(registry)
+  assert samples[("scb_client_download_seconds_count", (("partition", "1"), ("table", "First")))] == 1
+
+def test_text_exposition():
+  text = MetricsRegistry(monitors = [create_monitor()], prefix = "scb").generate_text()
+  lines = text.splitlines()
+  assert "# TYPE scb_requests_total counter" in lines
+  assert 'scb_requests_total{table="First"} 3' in lines
+  assert "# TYPE scb_download_seconds histogram" in lines
+  assert 'scb_download_seconds_bucket{table="First",le="+Inf"} 2' in lines
+  assert "# EOF" not in lines
+
+def test_openmetrics_exposition():
+  text = MetricsRegistry(monitors = [create_monitor()]).generate_text(openmetrics = True)
+  assert "# TYPE scb_client_requests counter" in text.splitlines()
+  assert text.endswith("# EOF\n")
+
+def test_label_values_are_escaped():
+  monitor = PerformanceMonitor()
+  monitor.count(CounterType.CELLS, 1, table = 'a"b\\c')
+  assert 'scb_client_cells_total{table="a\\"b\\\\c"} 1' in MetricsRegistry(monitors = [monitor]).generate_text()
+
+def test_http_server():
+  registry = MetricsRegistry(monitors = [create_monitor()])
+  server = registry.start_http_server(0, "127.0.0.1")
+  try:
+    url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+    with urllib.request.urlopen(url) as response:
+      assert response.headers["Content-Type"].startswith("text/plain")
+      assert 'scb_client_requests_total{table="First"} 3' in response.read().decode()
+    request = urllib.request.Request(url, headers = {"Accept": "application/openmetrics-text"})
+    with urllib.request.urlopen(request) as response:
+      assert response.headers["Content-Type"].startswith("application/openmetrics-text")
+      assert response.read().decode().endswith("# EOF\n")
+  finally:
+    server.shutdown()
+    server.server_close()
+
+def test_client_counts_requests_retries_and_cells(monkeypatch: MonkeyPatch):
+  responses = [mocked_response(429), mocked_response(200)]
+  with monkeypatch.context() as m:
+    client = SCBClient("Test", "Test", "Test", "Test", rate_limiter = RateLimiter(max_requests = 1000, window_seconds = 1), transport = SCBTransport())
+    m.setattr(client, "get_variables", mock_variables)
+    m.setattr(client.transport, "post", lambda url, json, stream = False: responses.pop(0))
+    query = client.create_query()
+    client.get_data(query)
+  samples = get_samples(MetricsRegistry(monitors = [client.perf_mon]))
+  table = (("table", "Test"),)
+  assert samples[("scb_client_requests_total", table)] == 2
+  assert samples[("scb_client_rate_limited_total", table)] == 1
+  assert samples[("scb_client_retries_total", table)] == 1
+  assert samples[("scb_client_cells_total", table)] == client.estimate_cell_count(query)
+  assert samples[("scb_client_downloaded_bytes_total", table)] == 2 * len(mocked_response(200).content)
+  assert samples[("scb_client_download_seconds_count", table)] == 2
+  assert samples[("scb_client_process_seconds_count", table)] == 1
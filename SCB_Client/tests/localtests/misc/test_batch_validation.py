@@ -0,0 +1,84 @@
+import json
+import time
+from threading import Lock
+import pytest
+from pytest import MonkeyPatch
+
+from SCB_Client import SCBClient
+from SCB_Client.SCBClientUtilities import RateLimiter, SCBResponse, SCBTransport
+
+TREE = {
+  "": ["AA"],
+  "/AA": ["AA01", "AA02"],
+  "/AA/AA01": ["AA01A"],
+  "/AA/AA02": ["AA02A"],
+  "/AA/AA01/AA01A": ["Table1", "Table2"],
+  "/AA/AA02/AA02A": ["Table3"]
+}
+
+def create_transport(m: MonkeyPatch, requested_urls: list, delay: float = 0) -> SCBTransport:
+  transport = SCBTransport()
+  lock = Lock()
+
+  def mocked_get(url: str):
+    with lock:
+      requested_urls.append(url)
+    time.sleep(delay)
+    path = url[len(SCBClient._SCB_BASE_URL):]
+    if path not in TREE:
+      return SCBResponse(404, {}, b"")
+    return SCBResponse(200, {}, json.dumps([{"id": node_id} for node_id in TREE[path]]).encode())
+  m.setattr(transport, "get", mocked_get)
+  return transport
+
+def test_batch_requests_every_node_once(monkeypatch: MonkeyPatch):
+  requested_urls = []
+  with monkeypatch.context() as m:
+    transport = create_transport(m, requested_urls)
+    clients = SCBClient.create_and_validate_clients([
+      ("AA", "AA01", "AA01A", "Table1"),
+      ("AA", "AA01", "AA01A", "Table2"),
+      ("AA", "AA02", "AA02A", "Table3")
+    ], transport = transport, rate_limiter = RateLimiter())
+  assert [client.table for client in clients] == ["Table1", "Table2", "Table3"]
+  assert len(requested_urls) == 6, "One request per distinct node."
+  assert len(set(requested_urls)) == 6
+
+def test_nodes_are_memoised_per_transport(monkeypatch: MonkeyPatch):
+  requested_urls = []
+  with monkeypatch.context() as m:
+    transport = create_transport(m, requested_urls)
+    SCBClient.create_and_validate_client("AA", "AA01", "AA01A", "Table1", transport = transport, rate_limiter = RateLimiter())
+    SCBClient.create_and_validate_client("AA", "AA01", "AA01A", "Table2", transport = transport, rate_limiter = RateLimiter())
+    assert len(requested_urls) == 4, "The second client should be validated from the memo."
+    SCBClient.create_and_validate_client("AA", "AA01", "AA01A", "Table1", transport = create_transport(m, requested_urls), rate_limiter = RateLimiter())
+    assert len(requested_urls) == 8, "Another transport has its own memo."
+
+def test_memoised_nodes_expire(monkeypatch: MonkeyPatch):
+  requested_urls = []
+  with monkeypatch.context() as m:
+    transport = create_transport(m, requested_urls)
+    m.setattr(SCBClient, "_TREE_MEMO_TTL_SECONDS", -1)
+    for _ in range(2):
+      SCBClient.create_and_validate_client("AA", "AA01", "AA01A", "Table1", transport = transport, rate_limiter = RateLimiter())
+  assert len(requested_urls) == 8
+
+def test_nodes_are_requested_concurrently(monkeypatch: MonkeyPatch):
+  with monkeypatch.context() as m:
+    transport = create_transport(m, [], delay = 0.1)
+    start = time.perf_counter()
+    SCBClient.create_and_validate_client("AA", "AA01", "AA01A", "Table1", transport = transport, rate_limiter = RateLimiter())
+    assert time.perf_counter() - start < 0.3, "The 4 requests should overlap."
+
+def test_batch_reports_first_invalid_node(monkeypatch: MonkeyPatch):
+  requested_urls = []
+  with monkeypatch.context() as m:
+    transport = create_transport(m, requested_urls)
+    with pytest.raises(ValueError, match = "AA03"):
+      SCBClient.create_and_validate_clients([
+        ("AA", "AA01", "AA01A", "Table1"),
+        ("AA", "AA03", "AA03A", "Table4")
+      ], transport = transport, rate_limiter = RateLimiter())
+    # Failed requests aren't memoised, valid nodes are
+    SCBClient.create_and_validate_client("AA", "AA01", "AA01A", "Table1", transport = transport, rate_limiter = RateLimiter())
+  assert len(requested_urls) == 6
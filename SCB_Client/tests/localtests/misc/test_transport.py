@@ -0,0 +1,51 @@
+import pytest
+import requests
+from pytest import MonkeyPatch
+
+from SCB_Client import SCBClient
+from SCB_Client.SCBClientUtilities import SCBTransport
+from SCB_Client.SCBClientUtilities.transport import TimeoutHTTPAdapter
+
+class mocked_response():
+  def __init__(self, content: bytes):
+    self.status_code = 200
+    self.content = content
+
+def test_transport_is_shared_between_clients():
+  first_client = SCBClient("Test", "Test", "Test", "Test")
+  second_client = SCBClient("Test", "Test", "Test", "Test")
+  assert first_client.transport is second_client.transport is SCBTransport.shared()
+
+def test_transport_is_pooled():
+  transport = SCBTransport(pool_size = 8, timeout = 3)
+  adapter = transport.session.get_adapter("https://api.scb.se")
+  assert isinstance(adapter, TimeoutHTTPAdapter)
+  assert adapter._pool_maxsize == 8
+  assert adapter.timeout == 3
+  assert "gzip" in transport.session.headers["Accept-Encoding"]
+
+def test_invalid_pool_size():
+  with pytest.raises(ValueError):
+    SCBTransport(pool_size = 0)
+
+def test_adapter_applies_default_timeout(monkeypatch: MonkeyPatch):
+  sent_timeouts = []
+  with monkeypatch.context() as m:
+    m.setattr(requests.adapters.HTTPAdapter, "send", lambda self, request, **kwargs: sent_timeouts.append(kwargs["timeout"]))
+    adapter = TimeoutHTTPAdapter(7)
+    adapter.send(None, timeout = None)
+    adapter.send(None, timeout = 1)
+  assert sent_timeouts == [7, 1]
+
+def test_validated_client_keeps_transport(monkeypatch: MonkeyPatch):
+  transport = SCBTransport()
+  with monkeypatch.context() as m:
+    m.setattr(transport, "get", lambda url: mocked_response(b'[{"id": "Mocked_response"}]'))
+    client = SCBClient.create_and_validate_client(
+      "Mocked_response",
+      "Mocked_response",
+      "Mocked_response",
+      "Mocked_response",
+      transport = transport
+    )
+    assert client.transport is transport
@@ -0,0 +1,68 @@
+import json
+import pytest
+from pytest import MonkeyPatch
+
+pa = pytest.importorskip("pyarrow")
+
+from SCB_Client import SCBClient, ResponseType, ResultType
+from SCB_Client.model.scb_models import SCBVariable
+from SCB_Client.SCBClientUtilities import arrow_batch_from_columnar, columnar_from_json
+from SCB_Client.tests.helpers import create_mocked_client, mock_variables_with_texts, mocked_body_with_missing
+
+def create_client(m: MonkeyPatch) -> SCBClient:
+  return create_mocked_client(m, variables = mock_variables_with_texts, body = mocked_body_with_missing)
+
+def test_key_columns_are_dictionary_encoded_with_value_texts():
+  columnar = columnar_from_json(json.loads(mocked_body_with_missing({"query": [
+    {"code": "first_code", "selection": {"values": ["two"]}},
+    {"code": "second_code", "selection": {"values": ["four", "six"]}}
+  ]})), mock_variables_with_texts())
+  batch = arrow_batch_from_columnar(columnar, mock_variables_with_texts())
+  assert pa.types.is_dictionary(batch.schema.field("first_code").type)
+  assert batch.column(0).to_pylist() == ["Two", "Two"]
+  assert batch.column(1).to_pylist() == ["Four", "Six"]
+  assert batch.column(2).to_pylist() == [1.5, None]
+  assert batch.schema.field("content").metadata == {b"text": b"content"}
+
+def test_values_with_the_same_text_share_a_category():
+  pytest.importorskip("pandas")
+  variables = [
+    SCBVariable("first_code", "first_text", ["one", "two", "three"], ["Same", "Other", "Same"]),
+    SCBVariable("second_code", "second_text", ["four", "five", "six"], ["Four", "Five", "Six"])
+  ]
+  columnar = columnar_from_json(json.loads(mocked_body_with_missing({"query": [
+    {"code": "first_code", "selection": {"values": ["one", "two", "three"]}},
+    {"code": "second_code", "selection": {"values": ["four"]}}
+  ]})), variables)
+  batch = arrow_batch_from_columnar(columnar, variables)
+  assert batch.column(0).dictionary.to_pylist() == ["Same", "Other"]
+  assert batch.column(0).to_pylist() == ["Same", "Other", "Same"]
+  data_frame = pa.Table.from_batches([batch]).to_pandas()
+  assert list(data_frame["first_code"].cat.categories) == ["Same", "Other"]
+  assert list(data_frame["first_code"]) == ["Same", "Other", "Same"]
+
+def test_get_data_returns_table_of_partitions(monkeypatch: MonkeyPatch):
+  with monkeypatch.context() as m:
+    client = create_client(m)
+    client.set_preferred_partition_variable_code("first_code")
+    client._SCB_LIMIT_RESULT = 3
+    table = client.get_data(client.create_query(), ResultType.ARROW)
+  assert isinstance(table, pa.Table)
+  assert table.num_rows == 9
+  assert len(table.to_batches()) == 3
+  assert table.column("first_code").to_pylist() == ["One"] * 3 + ["Two"] * 3 + ["Three"] * 3
+
+def test_to_pandas_has_categorical_keys(monkeypatch: MonkeyPatch):
+  pytest.importorskip("pandas")
+  with monkeypatch.context() as m:
+    client = create_client(m)
+    df = client.get_data(client.create_query(), ResultType.ARROW).to_pandas()
+  assert str(df["second_code"].dtype) == "category"
+  assert list(df["second_code"].cat.categories) == ["Four", "Five", "Six"]
+  assert df["content"].isna().sum() == 3
+
+def test_arrow_requires_json(monkeypatch: MonkeyPatch):
+  with monkeypatch.context() as m:
+    client = create_client(m)
+    with pytest.raises(NotImplementedError):
+      client.get_data(client.create_query(response_type = ResponseType.CSV), ResultType.ARROW)
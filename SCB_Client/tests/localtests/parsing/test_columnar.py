@@ -0,0 +1,76 @@
+import json
+import math
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from SCB_Client import SCBClient, ResponseType, ResultType, SCBColumnarResponse
+from SCB_Client.SCBClientUtilities import RateLimiter, SCBResponse, SCBTransport, columnar_from_json, concat_columnar
+from SCB_Client.tests.helpers import mock_variables
+
+JSON_DATA = {
+  "columns": [
+    {"code": "first_code", "text": "first_code", "type": "d"},
+    {"code": "second_code", "text": "second_code", "type": "t"},
+    {"code": "content", "text": "content", "type": "c"}
+  ],
+  "comments": [],
+  "data": [
+    {"key": ["two", "four"], "values": ["1.5"]},
+    {"key": ["one", "six"], "values": [".."]},
+    {"key": ["three", "four"], "values": ["-"]},
+    {"key": ["two", "five"], "values": ["3"]}
+  ]
+}
+
+def test_keys_are_dictionary_encoded():
+  response = columnar_from_json(JSON_DATA, mock_variables())
+  assert response.key_values["first_code"] == ["one", "two", "three"]
+  assert response.key_codes["first_code"].tolist() == [1, 0, 2, 1]
+  assert response.key_codes["second_code"].dtype == np.int32
+  assert response.decode_key("second_code") == ["four", "six", "four", "five"]
+
+def test_values_are_parsed_with_missing_mask():
+  response = columnar_from_json(JSON_DATA, mock_variables())
+  values = response.values["content"]
+  assert values.dtype == np.float64
+  assert values[0] == 1.5 and values[3] == 3
+  assert math.isnan(values[1]) and math.isnan(values[2])
+  assert response.missing["content"].tolist() == [False, True, True, False]
+  assert len(response) == 4
+
+def test_unknown_key_extends_vocabulary():
+  json_data = {**JSON_DATA, "data": [{"key": ["seven", "four"], "values": ["1"]}]}
+  response = columnar_from_json(json_data, mock_variables())
+  assert response.key_values["first_code"] == ["one", "two", "three", "seven"]
+  assert response.decode_key("first_code") == ["seven"]
+
+def test_empty_response():
+  response = columnar_from_json({**JSON_DATA, "data": []}, mock_variables())
+  assert len(response) == 0
+  assert response.values["content"].dtype == np.float64
+
+def test_concat_partitions():
+  first = columnar_from_json({**JSON_DATA, "data": JSON_DATA["data"][:2]}, mock_variables())
+  second = columnar_from_json({**JSON_DATA, "data": JSON_DATA["data"][2:]}, mock_variables())
+  response = concat_columnar([first, second])
+  expected = columnar_from_json(JSON_DATA, mock_variables())
+  assert response.key_codes["first_code"].tolist() == expected.key_codes["first_code"].tolist()
+  assert response.missing["content"].tolist() == expected.missing["content"].tolist()
+
+def test_get_data_returns_columnar(monkeypatch: pytest.MonkeyPatch):
+  with monkeypatch.context() as m:
+    client = SCBClient("Test", "Test", "Test", "Test", transport = SCBTransport(), rate_limiter = RateLimiter())
+    m.setattr(client, "get_variables", mock_variables)
+    body = json.dumps(JSON_DATA).encode()
+    m.setattr(client.transport, "post", lambda url, json, stream = False: SCBResponse(200, {}, body))
+    data = client.get_data(client.create_query(), ResultType.COLUMNAR)
+  assert isinstance(data[0], SCBColumnarResponse)
+  assert len(data[0]) == 4
+
+def test_columnar_requires_json(monkeypatch: pytest.MonkeyPatch):
+  with monkeypatch.context() as m:
+    client = SCBClient("Test", "Test", "Test", "Test")
+    m.setattr(client, "get_variables", mock_variables)
+    with pytest.raises(NotImplementedError):
+      client.get_data(client.create_query(response_type = ResponseType.CSV), ResultType.COLUMNAR)
@@ -0,0 +1,70 @@
+import pytest
+
+from SCB_Client import SCBClient, ResponseType
+from SCB_Client.model.scb_models import SCBCsvRow
+from SCB_Client.SCBClientUtilities import SCBResponse, iter_csv_rows
+
+CSV_BODY = (
+  '"region","ålder","Folkmängd, antal 2005M01","Folkmängd, antal 2005M02"\r\n'
+  '"00 Riket","18 år",112989,113013\r\n'
+  '"01 Stockholms län","18 år",24031,24052\r\n'
+).encode("latin-1")
+
+def chunked(content: bytes, chunk_size: int):
+  return [content[i:i + chunk_size] for i in range(0, len(content), chunk_size)]
+
+def test_quoted_headers_with_comma_are_kept():
+  rows = list(iter_csv_rows([CSV_BODY]))
+  assert list(rows[0].keys()) == ["region", "ålder", "Folkmängd, antal 2005M01", "Folkmängd, antal 2005M02"]
+
+def test_rows_are_parsed():
+  rows = list(iter_csv_rows([CSV_BODY]))
+  assert rows == [
+    {"region": "00 Riket", "ålder": "18 år", "Folkmängd, antal 2005M01": "112989", "Folkmängd, antal 2005M02": "113013"},
+    {"region": "01 Stockholms län", "ålder": "18 år", "Folkmängd, antal 2005M01": "24031", "Folkmängd, antal 2005M02": "24052"}
+  ]
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 64])
+def test_lines_spanning_chunks(chunk_size: int):
+  assert list(iter_csv_rows(chunked(CSV_BODY, chunk_size))) == list(iter_csv_rows([CSV_BODY]))
+
+def test_header_strings_are_shared_between_rows():
+  first_row, second_row = iter_csv_rows([CSV_BODY])
+  assert all(first is second for first, second in zip(first_row.keys(), second_row.keys()))
+
+def test_missing_trailing_line_break_and_empty_lines():
+  rows = list(iter_csv_rows([b'"a","b"\r\n\r\n1,2']))
+  assert rows == [{"a": "1", "b": "2"}]
+
+def test_empty_response():
+  assert list(iter_csv_rows([])) == []
+
+def test_client_parses_csv_response():
+  client = SCBClient("Test", "Test", "Test", "Test")
+  rows = client._create_response_obj(SCBResponse(200, {}, CSV_BODY), ResponseType.CSV)
+  assert len(rows) == 2
+  assert rows[1]["region"] == "01 Stockholms län"
+
+def test_rows_behave_like_dicts():
+  row = next(iter_csv_rows([CSV_BODY]))
+  assert isinstance(row, SCBCsvRow)
+  assert len(row) == 4
+  assert "region" in row and "land" not in row
+  assert row.get("land", "-") == "-"
+  assert list(row.values()) == ["00 Riket", "18 år", "112989", "113013"]
+  assert row.cells() == ("00 Riket", "18 år", "112989", "113013")
+  assert dict(row) == {"region": "00 Riket", "ålder": "18 år", "Folkmängd, antal 2005M01": "112989", "Folkmängd, antal 2005M02": "113013"}
+  assert repr(row) == repr(dict(row))
+  assert not hasattr(row, "__dict__")
+  with pytest.raises(KeyError):
+    row["land"]
+
+def test_key_cells_are_interned():
+  first_row, second_row = iter_csv_rows([CSV_BODY], key_headers = {"ålder"})
+  assert first_row["ålder"] is second_row["ålder"]
+  first_row, second_row = iter_csv_rows([CSV_BODY])
+  assert first_row["ålder"] == second_row["ålder"]
+
+def test_rows_with_missing_or_extra_cells():
+  rows = list(iter_csv_rows([b'"a","b"\r\n1\r\n1,2,3\r\n'], key_headers = {"a"}))
+  assert rows == [{"a": "1"}, {"a": "1", "b": "2"}]
@@ -0,0 +1,175 @@
+import gc
+import json
+from threading import Barrier, Thread
+
+import pytest
+
+from SCB_Client import ResultType, SCBClient
+from SCB_Client.model.scb_models import SCBJsonDataPoints, SCBJsonResponse, SCBJsonResponseDataPoint
+from SCB_Client.SCBClientUtilities import (JsonDecoder, OrjsonDecoder, RateLimiter, SCBResponse, SCBTransport,
+                                           get_json_decoder, paused_gc)
+from SCB_Client.tests.helpers import mock_variables
+
+def mocked_content() -> bytes:
+  return json.dumps({
+    "columns": [
+      {"code": "first_code", "text": "first_text", "type": "d"},
+      {"code": "second_code", "text": "second_text", "type": "d"},
+      {"code": "content", "text": "content", "type": "c"}
+    ],
+    "comments": [],
+    "data": [
+      {"key": [first, second], "values": [f"{i}.5" if i % 4 else ".."]}
+      for i, (first, second) in enumerate([(first, second) for first in ["one", "two", "three"] for second in ["four", "five", "six"]])
+    ]
+  }, ensure_ascii = False).encode()
+
+def get_decoders() -> list:
+  decoders = [JsonDecoder(), JsonDecoder(lazy_rows = True)]
+  try:
+    decoders += [OrjsonDecoder(), OrjsonDecoder(lazy_rows = True)]
+  except ImportError:
+    pass
+  return decoders
+
+@pytest.mark.parametrize("decoder", get_decoders(), ids = lambda decoder: f"{decoder.name}{' lazy' if decoder.lazy_rows else ''}")
+def test_decoders_create_the_same_rows(decoder: JsonDecoder):
+  response = SCBResponse(200, {}, mocked_content())
+  json_data = decoder.decode(response)
+  assert json_data == json.loads(mocked_content())
+  rows = decoder.create_data_points(json_data["data"])
+  expected = [SCBJsonResponseDataPoint(datapoint["key"], datapoint["values"]) for datapoint in json_data["data"]]
+  assert rows == expected
+  assert expected == rows
+  assert len(rows) == 9
+  assert rows[-1] == expected[-1]
+  assert rows[2:4] == expected[2:4]
+  assert list(rows) == expected
+
+@pytest.mark.parametrize("decoder", get_decoders(), ids = lambda decoder: f"{decoder.name}{' lazy' if decoder.lazy_rows else ''}")
+def test_bodies_starting_with_a_bom_are_decoded(decoder: JsonDecoder):
+  response = SCBResponse(200, {}, b"\xef\xbb\xbf" + mocked_content())
+  assert decoder.decode(response) == json.loads(mocked_content())
+
+def test_lazy_rows():
+  data = json.loads(mocked_content())["data"]
+  rows = SCBJsonDataPoints(data)
+  assert isinstance(rows[0], SCBJsonResponseDataPoint)
+  assert rows[0].key is data[0]["key"] # Shared with the decoded data, nothing is copied
+  assert rows != SCBJsonDataPoints(data[:-1])
+  assert rows != "not rows"
+  assert SCBJsonResponse([], [], rows) == SCBJsonResponse([], [], list(rows))
+  with pytest.raises(IndexError):
+    rows[9]
+
+def test_responses_without_bytes_are_decoded_by_themselves():
+  class ConvertedResponse():
+    def json(self):
+      return {"data": []}
+  assert JsonDecoder().decode(ConvertedResponse()) == {"data": []}
+
+def test_fastest_installed_decoder_is_the_default():
+  pytest.importorskip("orjson")
+  assert isinstance(get_json_decoder(), OrjsonDecoder)
+  assert get_json_decoder(lazy_rows = True).lazy_rows == True
+  client = SCBClient("Test", "Test", "Test", "Test", transport = SCBTransport(), rate_limiter = RateLimiter())
+  assert isinstance(client.json_decoder, OrjsonDecoder)
+
+@pytest.mark.parametrize("pause_gc", [False, True])
+def test_gc_is_only_paused_if_the_decoder_pauses_it(pause_gc: bool):
+  gc_enabled = []
+  class RecordingDecoder(JsonDecoder):
+    def loads(self, content: bytes):
+      gc_enabled.append(gc.isenabled())
+      return super().loads(content)
+  decoder = RecordingDecoder(pause_gc = pause_gc)
+  decoder.decode(SCBResponse(200, {}, mocked_content()))
+  assert gc_enabled == [not pause_gc]
+  assert gc.isenabled()
+  assert get_json_decoder().pause_gc == False
+  assert get_json_decoder(pause_gc = True).pause_gc == True
+
+def test_gc_is_paused_while_decoding():
+  assert gc.isenabled()
+  with paused_gc():
+    assert not gc.isenabled()
+    with paused_gc():
+      assert not gc.isenabled()
+    assert not gc.isenabled()
+  assert gc.isenabled()
+
+def test_gc_stays_disabled_if_it_was():
+  gc.disable()
+  try:
+    with paused_gc():
+      pass
+    assert not gc.isenabled()
+  finally:
+    gc.enable()
+
+def test_concurrent_pauses_enable_gc_after_the_last():
+  entered = Barrier(2)
+  first_done = Barrier(2)
+  enabled_inside = []
+
+  def first():
+    with paused_gc():
+      entered.wait()
+    first_done.wait()
+
+  def second():
+    with paused_gc():
+      entered.wait()
+      first_done.wait()
+      enabled_inside.append(gc.isenabled())
+
+  threads = [Thread(target = first), Thread(target = second)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  assert enabled_inside == [False]
+  assert gc.isenabled()
+
+def test_client_uses_the_given_decoder(monkeypatch: pytest.MonkeyPatch):
+  class CountingDecoder(JsonDecoder):
+    def __init__(self):
+      super().__init__(lazy_rows = True)
+      self.count = 0
+
+    def loads(self, content: bytes):
+      self.count += 1
+      return super().loads(content)
+
+  decoder = CountingDecoder()
+  client = SCBClient("Test", "Test", "Test", "Test", transport = SCBTransport(), rate_limiter = RateLimiter(), json_decoder = decoder)
+  monkeypatch.setattr(client, "get_variables", mock_variables)
+  monkeypatch.setattr(client.transport, "post", lambda url, json, stream = False: SCBResponse(200, {}, mocked_content()))
+  query = client.create_query({"first_code": ["*"], "second_code": ["*"]})
+  response = client.get_data(query)[0]
+  assert isinstance(response.data, SCBJsonDataPoints)
+  assert response.data[1].key == ["one", "five"]
+  assert client.get_data(query, ResultType.COLUMNAR)[0].values["content"].shape == (9,)
+  assert decoder.count == 2
+
+def test_keys_are_interned_with_the_variable_values():
+  data = json.loads(mocked_content())["data"]
+  vocabularies = [["one", "two", "three"], ["four", "five", "six"]]
+  rows = JsonDecoder(intern_keys = True).create_data_points(data, vocabularies)
+  assert rows == [SCBJsonResponseDataPoint(datapoint["key"], datapoint["values"]) for datapoint in data]
+  assert all(row.key[0] is vocabularies[0][i // 3] and row.key[1] is vocabularies[1][i % 3] for i, row in enumerate(rows))
+  assert not hasattr(rows[0], "__dict__")
+
+def test_keys_outside_the_vocabulary_are_kept():
+  data = json.loads(mocked_content())["data"]
+  vocabularies = [["one"], []]
+  rows = JsonDecoder(intern_keys = True).create_data_points(data, vocabularies)
+  assert [row.key for row in rows] == [datapoint["key"] for datapoint in data]
+  assert rows[0].key[0] is vocabularies[0][0]
+  assert all(row.key[1] is datapoint["key"][1] for row, datapoint in zip(rows, data))
+
+def test_keys_are_not_interned_by_default():
+  assert get_json_decoder().intern_keys == False
+  data = json.loads(mocked_content())["data"]
+  rows = JsonDecoder().create_data_points(data, [["one", "two", "three"], ["four", "five", "six"]])
+  assert all(row.key is datapoint["key"] for row, datapoint in zip(rows, data))
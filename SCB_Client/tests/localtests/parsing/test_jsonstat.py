@@ -0,0 +1,123 @@
+import json
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from SCB_Client import ResponseType, ResultType, SCBClient
+from SCB_Client.benchmarks.mock_server import MockSCBServer, SyntheticTable
+from SCB_Client.model.scb_models import SCBVariable
+from SCB_Client.SCBClientUtilities import RateLimiter, columnar_from_jsonstat2, concat_columnar, json_from_jsonstat2
+
+TABLE_PATH = ("BE", "BE0101", "BE0101A", "Synthetic")
+
+def mock_variables():
+  return [
+    SCBVariable("Tid", "år", ["2020", "2021"], ["2020", "2021"], False, True),
+    SCBVariable("ContentsCode", "tabellinnehåll", ["C1", "C2"], ["Antal", "Andel"]),
+    SCBVariable("Region", "region", ["00", "01", "03"], ["Riket", "Stockholm", "Uppsala"], True, False)
+  ]
+
+def mock_dataset() -> dict:
+  # Contents in the middle of the cube, a dict index and a list index, missing values with and without status
+  return {
+    "version": "2.0",
+    "class": "dataset",
+    "id": ["Tid", "ContentsCode", "Region"],
+    "size": [2, 2, 2],
+    "dimension": {
+      "Tid": {"label": "år", "category": {"index": {"2021": 1, "2020": 0}, "label": {"2020": "2020", "2021": "2021"}}},
+      "ContentsCode": {"label": "tabellinnehåll", "category": {"index": ["C1", "C2"], "label": {"C1": "Antal", "C2": "Andel"}}},
+      "Region": {"label": "region", "category": {"index": {"03": 0, "00": 1}, "label": {"03": "Uppsala", "00": "Riket"}}}
+    },
+    "role": {"time": ["Tid"], "metric": ["ContentsCode"]},
+    "value": [1, 2, 0.5, None, 3, 4, None, 1.25],
+    "status": {"3": ".."}
+  }
+
+def test_columnar_has_one_index_per_dimension():
+  columnar = columnar_from_jsonstat2(mock_dataset(), mock_variables())
+  assert len(columnar) == 4
+  assert columnar.decode_key("Tid") == ["2020", "2020", "2021", "2021"]
+  assert columnar.decode_key("Region") == ["03", "00", "03", "00"]
+  assert columnar.key_values["Region"] == ["00", "01", "03"] # The variable values are the vocabulary
+  assert columnar.key_codes["Region"].dtype == np.int32
+  assert np.array_equal(columnar.values["C1"], [1, 2, 3, 4])
+  assert np.array_equal(columnar.values["C2"], [0.5, np.nan, np.nan, 1.25], equal_nan = True)
+  assert columnar.missing["C2"].tolist() == [False, True, True, False]
+  assert [(column["code"], column["type"]) for column in columnar.columns] == [("Tid", "t"), ("Region", "d"), ("C1", "c"), ("C2", "c")]
+
+def test_json_is_the_json_response():
+  json_data = json_from_jsonstat2(mock_dataset())
+  assert [(datapoint["key"], datapoint["values"]) for datapoint in json_data["data"]] == [
+    (["2020", "03"], ["1", "0.5"]), (["2020", "00"], ["2", ".."]),
+    (["2021", "03"], ["3", ".."]), (["2021", "00"], ["4", "1.25"])
+  ]
+  assert json_data["columns"] == columnar_from_jsonstat2(mock_dataset(), mock_variables()).columns
+
+def test_integral_floats_are_written_like_the_json_response():
+  dataset = mock_dataset()
+  dataset["value"] = [1.0, 2.0, 0.5, None, 3.0, 4.0, None, 1.25]
+  assert json_from_jsonstat2(dataset) == json_from_jsonstat2(mock_dataset())
+
+def test_unknown_categories_extend_the_vocabulary():
+  columnar = columnar_from_jsonstat2(mock_dataset(), [])
+  assert columnar.key_values["Region"] == ["03", "00"]
+  assert columnar.decode_key("Region") == ["03", "00", "03", "00"]
+
+def test_invalid_datasets():
+  dataset = mock_dataset()
+  dataset["value"] = dataset["value"][:-1]
+  with pytest.raises(ValueError):
+    columnar_from_jsonstat2(dataset, mock_variables())
+  dataset = mock_dataset()
+  del dataset["role"]
+  dataset["id"] = ["Tid", "Contents", "Region"]
+  with pytest.raises(ValueError):
+    columnar_from_jsonstat2(dataset, mock_variables())
+
+def test_string_values_are_parsed_like_json():
+  dataset = mock_dataset()
+  dataset["value"] = ["1", "2", "0.5", "..", "3", "4", None, "1.25"]
+  columnar = columnar_from_jsonstat2(dataset, mock_variables())
+  assert columnar.missing["C2"].tolist() == [False, True, True, False]
+  assert np.array_equal(columnar.values["C1"], [1, 2, 3, 4])
+
+@pytest.fixture
+def client():
+  with MockSCBServer({TABLE_PATH: SyntheticTable({"Region": 10, "Alder": 6, "Tid": 4}, contents = 2)}, max_requests = 0) as server:
+    yield SCBClient.create_and_validate_client(*TABLE_PATH, transport = server.create_transport(), rate_limiter = RateLimiter(max_requests = 1000, window_seconds = 1))
+
+def test_partitions_are_stitched_like_json(client: SCBClient):
+  client._SCB_LIMIT_RESULT = 100
+  jsonstat_query = client.create_query(response_type = ResponseType.JSONSTAT2)
+  assert len(client.plan(jsonstat_query)) > 1
+  partitions = client.get_data(jsonstat_query)
+  stitched = concat_columnar(partitions)
+  expected = concat_columnar(client.get_data(client.create_query(), ResultType.COLUMNAR))
+  assert len(stitched) == 10 * 6 * 4
+  for code in expected.key_codes:
+    assert stitched.key_values[code] == expected.key_values[code]
+    assert np.array_equal(stitched.key_codes[code], expected.key_codes[code])
+  for code in expected.values:
+    assert np.array_equal(stitched.values[code], expected.values[code], equal_nan = True)
+    assert np.array_equal(stitched.missing[code], expected.missing[code])
+  assert stitched.columns == expected.columns
+
+def test_decoded_like_the_json_response(client: SCBClient):
+  query = client.create_query({"Region": ["7", "2"]})
+  json_data = client.transport.post(client.data_url, query.to_dict()).json()
+  query.response_type = ResponseType.JSONSTAT2
+  jsonstat_data = client.transport.post(client.data_url, query.to_dict()).json()
+  assert json_from_jsonstat2(jsonstat_data) == json_data
+  assert len(json.dumps(jsonstat_data)) < len(json.dumps(json_data)) / 2
+
+def test_arrow_result(client: SCBClient):
+  pytest.importorskip("pyarrow")
+  table = client.get_data(client.create_query(response_type = ResponseType.JSONSTAT2), ResultType.ARROW)
+  expected = client.get_data(client.create_query(), ResultType.ARROW)
+  assert table.equals(expected)
+
+def test_csv_results_are_still_rejected(client: SCBClient):
+  with pytest.raises(NotImplementedError):
+    client.get_data(client.create_query(response_type = ResponseType.CSV), ResultType.COLUMNAR)
@@ -0,0 +1,136 @@
+import json
+import time
+import pytest
+from pytest import MonkeyPatch
+
+from SCB_Client.tests.helpers import mock_variables
+from SCB_Client import SCBClient
+from SCB_Client.SCBClientUtilities import RateLimiter, SCBTransport, SessionType
+
+class mocked_response():
+  def __init__(self, query: dict):
+    self.status_code = 200
+    self.headers = {}
+    self.query = query
+
+  @property
+  def content(self) -> bytes:
+    return json.dumps(self.json()).encode()
+
+  def json(self):
+    first_values = [var["selection"]["values"] for var in self.query["query"] if var["code"] == "first_code"][0]
+    return {
+      "columns": [],
+      "comments": [],
+      "data": [{"key": [value], "values": ["1"]} for value in first_values]
+    }
+
+def mocked_slow_post(url: str, json: dict, stream: bool = False):
+  # The first partition is the slowest so it would finish last if order wasn't preserved.
+  first_values = [var["selection"]["values"] for var in json["query"] if var["code"] == "first_code"][0]
+  time.sleep({"one": 0.03, "two": 0.02, "three": 0.01}[first_values[0]])
+  return mocked_response(json)
+
+def create_partitioning_client(m: MonkeyPatch, rate_limiter: RateLimiter = None) -> SCBClient:
+  client = SCBClient(
+    "Test",
+    "Test",
+    "Test",
+    "Test",
+    rate_limiter = rate_limiter if rate_limiter != None else RateLimiter(),
+    transport = SCBTransport()
+  )
+  m.setattr(client, "get_variables", mock_variables)
+  m.setattr(client.transport, "post", mocked_slow_post)
+  client.set_preferred_partition_variable_code("first_code")
+  client._SCB_LIMIT_RESULT = 3 # 9 cells with 3 per request results in 3 partitions
+  return client
+
+def test_default_max_workers():
+  client = SCBClient(
+    "Test",
+    "Test",
+    "Test",
+    "Test"
+  )
+  assert client.get_max_workers() == 1
+
+@pytest.mark.parametrize("max_workers", [0, -1, "2", 31])
+def test_set_invalid_max_workers(max_workers):
+  client = SCBClient(
+    "Test",
+    "Test",
+    "Test",
+    "Test"
+  )
+  with pytest.raises(ValueError):
+    client.set_max_workers(max_workers)
+
+def test_concurrent_partitions_are_returned_in_order(monkeypatch: MonkeyPatch):
+  with monkeypatch.context() as m:
+    client = create_partitioning_client(m)
+    client.set_max_workers(3)
+    query = client.create_query()
+    data = client.get_data(query)
+    assert [response.data[0].key for response in data] == [["one"], ["two"], ["three"]]
+
+def test_concurrent_partitions_are_monitored_per_worker(monkeypatch: MonkeyPatch):
+  with monkeypatch.context() as m:
+    client = create_partitioning_client(m)
+    client.set_max_workers(3)
+    query = client.create_query()
+    client.get_data(query)
+    assert len(client.perf_mon.download_sessions) == 3
+    assert client.perf_mon.total_session_time_microseconds(SessionType.DOWNLOAD) > 0
+
+def test_sessions_are_labelled_by_table_and_partition(monkeypatch: MonkeyPatch):
+  with monkeypatch.context() as m:
+    client = create_partitioning_client(m)
+    client.set_max_workers(3)
+    client.get_data(client.create_query())
+    for partition in ["0", "1", "2"]:
+      assert len(client.perf_mon.get_histogram(SessionType.DOWNLOAD, table = "Test", partition = partition)) == 1
+      assert len(client.perf_mon.get_histogram(SessionType.PROCESS, table = "Test", partition = partition)) == 1
+    assert client.perf_mon.get_byte_count(SessionType.DOWNLOAD, table = "Test") > 0
+
+def test_partitioning_does_not_modify_query(monkeypatch: MonkeyPatch):
+  with monkeypatch.context() as m:
+    client = create_partitioning_client(m)
+    client.set_max_workers(2)
+    query = client.create_query()
+    client.get_data(query)
+    first_variable = [var for var in query.query if var.code == "first_code"][0]
+    assert first_variable.selection.values == ["one", "two", "three"]
+
+def test_requests_are_held_back_at_scb_limit(monkeypatch: MonkeyPatch):
+  with monkeypatch.context() as m:
+    # A burst of 1 and 2 requests per 0.2s window refills one token every 0.2s
+    client = create_partitioning_client(m, RateLimiter(max_requests = 2, window_seconds = 0.2, burst = 1))
+    client.set_max_workers(3)
+    query = client.create_query()
+    start = time.monotonic()
+    client.get_data(query)
+    assert time.monotonic() - start >= 0.35, "The second and third request should wait for the bucket to refill."
+
+def test_iter_data_yields_partitions_in_order(monkeypatch: MonkeyPatch):
+  with monkeypatch.context() as m:
+    client = create_partitioning_client(m)
+    client.set_max_workers(2)
+    query = client.create_query()
+    keys = [response.data[0].key for response in client.iter_data(query)]
+    assert keys == [["one"], ["two"], ["three"]]
+
+def test_iter_data_yields_before_last_partition_is_downloaded(monkeypatch: MonkeyPatch):
+  with monkeypatch.context() as m:
+    client = create_partitioning_client(m)
+    iterator = client.iter_data(client.create_query())
+    first_response = next(iterator)
+    assert first_response.data[0].key == ["one"]
+    assert len(client.perf_mon.download_sessions) == 1, "Only the first partition should have been downloaded."
+
+def test_iter_data_checks_size_limit_eagerly(monkeypatch: MonkeyPatch):
+  with monkeypatch.context() as m:
+    client = create_partitioning_client(m)
+    client.set_size_limit(1)
+    with pytest.raises(PermissionError):
+      client.iter_data(client.create_query())
@@ -44,22 +44,19 @@ def test_partition_values_per_request_with_preferred(monkeypatch: MonkeyPatch):
     query = client.create_query()
 
     client.set_preferred_partition_variable_code(preferred_partition_variable_code)
-    preferred_partition_variable = [var for var in query.query if var.code == preferred_partition_variable_code][0]
-    expect_values_per_req = client._SCB_LIMIT_RESULT / len(preferred_partition_variable.selection.values)
-    values_per_req = client._SCBClient__get_partition_values_per_request(query, preferred_partition_variable)
-    assert values_per_req == expect_values_per_req
+    assert len(client.plan(query)) == 1
     # Drop limit to 5, 5/3 = 1,66
     client._SCB_LIMIT_RESULT = 5
-    values_per_req = client._SCBClient__get_partition_values_per_request(query, preferred_partition_variable)
-    assert values_per_req == 1
+    plan = client.plan(query)
+    assert plan.partition_variable_codes == [preferred_partition_variable_code]
+    assert [len(partition.query[0].selection.values) for partition in plan.partitions] == [1, 1, 1]
     # Increase limit to 6, 6/3 = 2
     client._SCB_LIMIT_RESULT = 6
-    values_per_req = client._SCBClient__get_partition_values_per_request(query, preferred_partition_variable)
-    assert values_per_req == 2
+    plan = client.plan(query)
+    assert [len(partition.query[0].selection.values) for partition in plan.partitions] == [2, 1]
 
-def test_cant_partition_enough(monkeypatch: MonkeyPatch):
+def test_partitions_by_more_variables_when_one_value_is_too_large(monkeypatch: MonkeyPatch):
   preferred_partition_variable_code = "first_code"
-  expected_exception = ValueError
 
   with monkeypatch.context() as m:
     client = SCBClient(
@@ -72,9 +69,9 @@ def test_cant_partition_enough(monkeypatch: MonkeyPatch):
     query = client.create_query()
 
     client.set_preferred_partition_variable_code(preferred_partition_variable_code)
-    preferred_partition_variable = [var for var in query.query if var.code == preferred_partition_variable_code][0]
 
-    # Decrease limit to be below what is possible
+    # Decrease limit below the 3 cells of a single value of the preferred variable
     client._SCB_LIMIT_RESULT = 2
-    with pytest.raises(expected_exception):
-      client._SCBClient__get_partition_values_per_request(query, preferred_partition_variable)
\ No newline at end of file
+    plan = client.plan(query)
+    assert plan.partition_variable_codes == ["first_code", "second_code"]
+    assert max(plan.cell_counts) <= 2
@@ -0,0 +1,105 @@
+import math
+
+import pytest
+from pytest import MonkeyPatch
+
+from SCB_Client.tests.helpers import mock_variables, mock_variables_with_time
+from SCB_Client import SCBClient, SCBVariable
+from SCB_Client.SCBClientUtilities import plan_tiling, split_evenly
+
+def create_planning_client(m: MonkeyPatch, variables = mock_variables) -> SCBClient:
+  client = SCBClient(
+    "Test",
+    "Test",
+    "Test",
+    "Test"
+  )
+  m.setattr(client, "get_variables", variables)
+  return client
+
+def test_plan_below_limit_is_the_query(monkeypatch: MonkeyPatch):
+  with monkeypatch.context() as m:
+    client = create_planning_client(m)
+    query = client.create_query()
+    plan = client.plan(query)
+    assert plan.partitions == [query]
+    assert plan.partition_variable_codes == []
+    assert plan.cell_counts == [9]
+
+def test_plan_tiles_when_one_value_exceeds_limit(monkeypatch: MonkeyPatch):
+  with monkeypatch.context() as m:
+    client = create_planning_client(m)
+    client.set_preferred_partition_variable_code("first_code")
+    client._SCB_LIMIT_RESULT = 2 # One value of first_code is 3 cells
+    query = client.create_query()
+    plan = client.plan(query)
+    assert len(plan) == 6, "9 cells with at most 2 per request can't be done in less than 5, and 3x3 can't be tiled in 5."
+    assert plan.partition_variable_codes == ["first_code", "second_code"]
+    assert max(plan.cell_counts) <= 2
+    assert sum(plan.cell_counts) == 9
+    covered = sorted((first, second) for partition in plan.partitions for first in partition.query[0].selection.values for second in partition.query[1].selection.values)
+    assert covered == sorted((first, second) for first in ["one", "two", "three"] for second in ["four", "five", "six"])
+
+def test_plan_prefers_partition_variable(monkeypatch: MonkeyPatch):
+  with monkeypatch.context() as m:
+    client = create_planning_client(m)
+    client._SCB_LIMIT_RESULT = 3
+    client.set_preferred_partition_variable_code("second_code")
+    plan = client.plan(client.create_query())
+    assert plan.partition_variable_codes == ["second_code"]
+    assert [partition.query[1].selection.values for partition in plan.partitions] == [["four"], ["five"], ["six"]]
+
+def test_plan_is_balanced(monkeypatch: MonkeyPatch):
+  with monkeypatch.context() as m:
+    client = create_planning_client(m, mock_variables_with_time)
+    client.set_preferred_partition_variable_code("third_code")
+    client._SCB_LIMIT_RESULT = 216 # 54 cells per value, two requests of 3 values instead of 4 + 2
+    plan = client.plan(client.create_query())
+    assert plan.cell_counts == [162, 162]
+
+def test_plan_does_not_modify_query(monkeypatch: MonkeyPatch):
+  with monkeypatch.context() as m:
+    client = create_planning_client(m)
+    client._SCB_LIMIT_RESULT = 2
+    query = client.create_query()
+    client.plan(query)
+    assert [var.selection.values for var in query.query] == [["one", "two", "three"], ["four", "five", "six"]]
+
+@pytest.mark.parametrize("sizes, limit", [
+  ([312, 101, 2, 24], 150000),
+  ([290, 97, 2, 500, 3], 150000),
+  ([1, 1000000], 150000),
+  ([7, 11, 13], 5),
+  ([4, 4], 1)
+])
+def test_plan_tiling_stays_within_limit(sizes: list, limit: int):
+  chunk_counts = plan_tiling(sizes, limit)
+  tile_size = math.prod(math.ceil(size / count) for size, count in zip(sizes, chunk_counts))
+  assert tile_size <= limit
+  assert math.prod(chunk_counts) >= math.ceil(math.prod(sizes) / limit)
+
+def test_plan_tiling_minimises_requests():
+  # Splitting the preferred time variable needs 12 requests (2 periods per request), splitting the first variable needs 11
+  assert math.prod(plan_tiling([312, 101, 2, 24], 150000, 3)) == 11
+
+def test_split_evenly():
+  assert split_evenly(list(range(7)), 3) == [[0, 1, 2], [3, 4], [5, 6]]
+  assert split_evenly(["a"], 1) == [["a"]]
+
+def test_plan_tiling_with_many_dimensions_falls_back_to_greedy_splits():
+  sizes = [2] * 40
+  chunk_counts = plan_tiling(sizes, 1000, preferred_index = 3)
+  assert math.prod(math.ceil(size / count) for size, count in zip(sizes, chunk_counts)) <= 1000
+  assert chunk_counts[3] == 2, "The preferred dimension is split first."
+  assert math.prod(chunk_counts) == 2 ** 31, "The fewest tiles of 2 ** 40 cells with at most 2 ** 9 per tile."
+
+def test_plan_query_with_many_variables(monkeypatch: MonkeyPatch):
+  def many_variables():
+    return [SCBVariable(f"code_{i}", f"text_{i}", ["a", "b"], ["a", "b"]) for i in range(24)]
+
+  with monkeypatch.context() as m:
+    client = create_planning_client(m, many_variables)
+    plan = client.plan(client.create_query())
+  assert max(plan.cell_counts) <= client._SCB_LIMIT_RESULT
+  assert sum(plan.cell_counts) == 2 ** 24
+  assert len(plan) == 128
@@ -0,0 +1,136 @@
+import asyncio
+import sys
+
+import numpy
+import pytest
+
+from SCB_Client import AsyncSCBClient, ResponseType, ResultType, SCBClient
+from SCB_Client.benchmarks.mock_server import MockSCBServer, SyntheticTable
+from SCB_Client.SCBClientUtilities import RateLimiter, choose_response_type, estimate_payload, json_from_csv_rows
+
+TABLE_PATH = ("BE", "BE0101", "BE0101A", "Synthetic")
+TIME_FIRST_PATH = ("BE", "BE0101", "BE0101A", "TimeFirst")
+
+@pytest.fixture
+def server():
+  tables = {
+    TABLE_PATH: SyntheticTable({"Region": 20, "Alder": 10, "Tid": 6}, contents = 2),
+    TIME_FIRST_PATH: SyntheticTable({"Tid": 4, "Region": 3, "Alder": 2}, contents = 1)
+  }
+  with MockSCBServer(tables, max_requests = 0) as server:
+    yield server
+
+def create_client(server: MockSCBServer, table_path: tuple = TABLE_PATH) -> SCBClient:
+  return SCBClient.create_and_validate_client(*table_path, transport = server.create_transport(), rate_limiter = RateLimiter(max_requests = 1000, window_seconds = 1))
+
+def get_response_bytes(client: SCBClient, query) -> int:
+  return len(client.transport.post(client.data_url, query.to_dict()).content)
+
+def test_estimates_are_close_to_the_response_sizes(server: MockSCBServer):
+  client = create_client(server)
+  query = client.create_query()
+  estimates = client.estimate_payload(query)
+  assert estimates[ResponseType.JSON].cell_count == 20 * 10 * 6 * 2
+  assert estimates[ResponseType.JSON].bytes > estimates[ResponseType.CSV].bytes
+  assert 0.5 < estimates[ResponseType.JSON].bytes / get_response_bytes(client, query) < 2
+  csv_query = client.create_query(response_type = ResponseType.CSV)
+  assert 0.5 < estimates[ResponseType.CSV].bytes / get_response_bytes(client, csv_query) < 2
+  assert estimates[ResponseType.CSV].parse_seconds < estimates[ResponseType.JSON].parse_seconds
+
+def test_estimates_grow_with_the_selection(server: MockSCBServer):
+  client = create_client(server)
+  small = client.estimate_payload(client.create_query({"Region": ["00"]}))
+  large = client.estimate_payload(client.create_query({"Region": [f"{i:02}" for i in range(10)]}))
+  for response_type in (ResponseType.JSON, ResponseType.CSV, ResponseType.JSONSTAT2):
+    assert large[response_type].bytes > 5 * small[response_type].bytes
+
+def test_choose_response_type(server: MockSCBServer):
+  client = create_client(server)
+  assert client.choose_response_type(client.create_query()) == ResponseType.JSONSTAT2
+  estimates = client.estimate_payload(client.create_query())
+  assert estimates[ResponseType.JSONSTAT2].bytes < estimates[ResponseType.CSV].bytes
+  assert 0.5 < estimates[ResponseType.JSONSTAT2].bytes / get_response_bytes(client, client.create_query(response_type = ResponseType.JSONSTAT2)) < 2
+
+def test_jsonstat2_is_not_chosen_without_numpy(server: MockSCBServer, monkeypatch: pytest.MonkeyPatch):
+  client = create_client(server)
+  query = client.create_query(response_type = ResponseType.AUTO)
+  expected = [datapoint.key for response in client.get_data(client.create_query()) for datapoint in response.data]
+  monkeypatch.setitem(sys.modules, "numpy", None) # Imports of numpy raise ImportError
+  assert client.choose_response_type(query) == ResponseType.CSV
+  assert [datapoint.key for response in client.get_data(query) for datapoint in response.data] == expected
+  query.query = [queryvar for queryvar in query.query if queryvar.code != "ContentsCode"]
+  assert client.choose_response_type(query) == ResponseType.JSON
+
+def test_csv_is_not_chosen_without_contents(server: MockSCBServer):
+  client = create_client(server)
+  query = client.create_query()
+  query.query = [queryvar for queryvar in query.query if queryvar.code != "ContentsCode"]
+  assert choose_response_type(query, client.get_variables()) == ResponseType.JSONSTAT2
+  with pytest.raises(NotImplementedError):
+    json_from_csv_rows([], query, client.get_variables()) # CSV can't be mapped back without the contents
+
+def force_response_type(client: SCBClient, response_type: ResponseType) -> None:
+  client.choose_response_type = lambda query: response_type
+
+@pytest.mark.parametrize("response_type", [ResponseType.CSV, ResponseType.JSONSTAT2])
+def test_auto_returns_the_json_result(server: MockSCBServer, response_type: ResponseType):
+  client = create_client(server)
+  force_response_type(client, response_type)
+  json_data = client.get_data(client.create_query({"Region": ["03", "00", "07"]}))
+  auto_data = client.get_data(client.create_query({"Region": ["03", "00", "07"]}, response_type = ResponseType.AUTO))
+  assert [response.data for response in auto_data] == [response.data for response in json_data]
+  assert [response.columns for response in auto_data] == [response.columns for response in json_data]
+
+@pytest.mark.parametrize("response_type", [ResponseType.CSV, ResponseType.JSONSTAT2])
+def test_auto_returns_the_columnar_result(server: MockSCBServer, response_type: ResponseType):
+  client = create_client(server)
+  force_response_type(client, response_type)
+  json_data = client.get_data(client.create_query(), result_type = ResultType.COLUMNAR)[0]
+  auto_data = client.get_data(client.create_query(response_type = ResponseType.AUTO), result_type = ResultType.COLUMNAR)[0]
+  for code in json_data.key_codes:
+    assert (auto_data.key_codes[code] == json_data.key_codes[code]).all()
+  for code in json_data.values:
+    assert numpy.array_equal(auto_data.values[code], json_data.values[code], equal_nan = True)
+    assert (auto_data.missing[code] == json_data.missing[code]).all()
+
+@pytest.mark.parametrize("response_type", [ResponseType.CSV, ResponseType.JSONSTAT2])
+def test_auto_with_the_time_variable_first(server: MockSCBServer, response_type: ResponseType):
+  client = create_client(server, TIME_FIRST_PATH)
+  force_response_type(client, response_type)
+  query = client.create_query(response_type = ResponseType.AUTO)
+  assert client.get_data(query)[0].data == client.get_data(client.create_query())[0].data
+
+def test_json_from_csv_rows_maps_texts_and_codes(server: MockSCBServer):
+  client = create_client(server, TIME_FIRST_PATH)
+  query = client.create_query({"Tid": ["2000M02", "2000M01"], "Region": ["1"], "Alder": ["0", "1"]})
+  rows = [
+    {"region": "1", "alder": "0", "Innehåll 0 2000M02": "5", "Innehåll 0 2000M01": "6"},
+    {"region": "1", "alder": "1", "Innehåll 0 2000M02": "7", "Innehåll 0 2000M01": "8"}
+  ]
+  json = json_from_csv_rows(rows, query, client.get_variables())
+  assert [column["type"] for column in json["columns"]] == ["t", "d", "d", "c"]
+  assert [(datapoint["key"], datapoint["values"]) for datapoint in json["data"]] == [
+    (["2000M02", "1", "0"], ["5"]), (["2000M02", "1", "1"], ["7"]),
+    (["2000M01", "1", "0"], ["6"]), (["2000M01", "1", "1"], ["8"])
+  ]
+  with pytest.raises(ValueError):
+    json_from_csv_rows([{"region": "9", "alder": "0"}], query, client.get_variables())
+
+def test_estimate_without_variable_metadata(server: MockSCBServer):
+  client = create_client(server)
+  estimates = estimate_payload(client.create_query(), [])
+  assert estimates[ResponseType.JSON].cell_count == 20 * 10 * 6 * 2
+  assert choose_response_type(client.create_query(), []) == ResponseType.JSONSTAT2
+
+def test_async_auto(server: MockSCBServer):
+  async def get_data():
+    client = await AsyncSCBClient.create_and_validate_client(*TABLE_PATH, transport = server.create_async_transport(), rate_limiter = RateLimiter(max_requests = 1000, window_seconds = 1))
+    query = await client.create_query(response_type = ResponseType.AUTO)
+    response_type = await client.choose_response_type(query)
+    auto_data = await client.get_data(query)
+    json_data = await client.get_data(await client.create_query())
+    await client.close()
+    return response_type, auto_data, json_data
+  response_type, auto_data, json_data = asyncio.run(get_data())
+  assert response_type == ResponseType.JSONSTAT2
+  assert [response.data for response in auto_data] == [response.data for response in json_data]
@@ -316,3 +316,9 @@ def test_time_top_and_time_variable_in_selection(monkeypatch: MonkeyPatch):
     }
     with pytest.raises(ValueError, match = "Time variable can't be included in variable selection if time_top is used.") as r:
       client.create_query(variable_selection, ResponseType.JSON, 3)
+
+def test_query_variables_have_no_dict():
+  variable = SCBQueryVariable("Region", SCBQueryVariableSelection("item", ["00"]))
+  assert not hasattr(variable, "__dict__")
+  assert not hasattr(variable.selection, "__dict__")
+  assert variable == SCBQueryVariable("Region", SCBQueryVariableSelection("item", ["00"]))
@@ -0,0 +1,94 @@
+import asyncio
+import os
+import pytest
+from pytest import MonkeyPatch
+
+np = pytest.importorskip("numpy")
+
+from SCB_Client import AsyncSCBClient, SCBClient, ResponseType
+from SCB_Client.SCBClientUtilities import ParquetSink, RateLimiter, SQLiteSink
+from SCB_Client.tests.helpers import create_mocked_client, mock_variables_with_texts, mocked_async_transport, mocked_body_with_missing
+
+def create_client(m: MonkeyPatch, posts: list) -> SCBClient:
+  client = create_mocked_client(m, posts, mock_variables_with_texts, mocked_body_with_missing, rate_limiter = RateLimiter(max_requests = 1000, window_seconds = 1))
+  client.set_preferred_partition_variable_code("first_code")
+  client._SCB_LIMIT_RESULT = 3 # 3 partitions
+  return client
+
+def test_sqlite_sink_writes_every_partition(monkeypatch: MonkeyPatch, tmp_path):
+  sink = SQLiteSink(str(tmp_path / "data.sqlite"), "Test")
+  with monkeypatch.context() as m:
+    client = create_client(m, [])
+    assert client.write_data(client.create_query(), sink) == 9
+  data = sink.read()
+  assert len(data) == 9
+  assert data.decode_key("first_code") == ["one"] * 3 + ["two"] * 3 + ["three"] * 3
+  assert data.missing["content"].tolist() == [False, False, True] * 3
+  assert data.values["content"][0] == 1.5
+
+def test_sqlite_sink_is_idempotent(monkeypatch: MonkeyPatch, tmp_path):
+  sink = SQLiteSink(str(tmp_path / "data.sqlite"), "Test")
+  with monkeypatch.context() as m:
+    client = create_client(m, [])
+    client.write_data(client.create_query(), sink)
+    client.write_data(client.create_query({"first_code": ["two"]}), sink)
+  assert len(sink.read()) == 9
+
+def test_sqlite_sink_filters(monkeypatch: MonkeyPatch, tmp_path):
+  sink = SQLiteSink(str(tmp_path / "data.sqlite"), "Test")
+  assert sink.read() == None
+  with monkeypatch.context() as m:
+    client = create_client(m, [])
+    client.write_data(client.create_query(), sink)
+  data = sink.read({"first_code": ["two", "three"], "second_code": ["four"]})
+  assert data.decode_key("first_code") == ["two", "three"]
+  assert data.decode_key("second_code") == ["four", "four"]
+
+def test_write_data_requires_json(monkeypatch: MonkeyPatch, tmp_path):
+  with monkeypatch.context() as m:
+    client = create_client(m, [])
+    with pytest.raises(NotImplementedError):
+      client.write_data(client.create_query(response_type = ResponseType.CSV), SQLiteSink(str(tmp_path / "data.sqlite"), "Test"))
+
+def test_parquet_sink_is_partitioned_and_idempotent(monkeypatch: MonkeyPatch, tmp_path):
+  pytest.importorskip("pyarrow")
+  sink = ParquetSink(str(tmp_path / "dataset"), partitioning = ["first_code"])
+  assert sink.read() == None
+  with monkeypatch.context() as m:
+    client = create_client(m, [])
+    client.write_data(client.create_query(), sink)
+    client.write_data(client.create_query(), sink)
+  assert sorted(os.listdir(tmp_path / "dataset")) == ["first_code=One", "first_code=Three", "first_code=Two"]
+  assert sink.read().num_rows == 9
+  table = sink.read({"first_code": ["Two"], "second_code": ["Four", "Six"]}, columns = ["second_code", "content"])
+  assert table.column("second_code").to_pylist() == ["Four", "Six"]
+  assert table.column("content").to_pylist() == [1.5, None]
+
+@pytest.mark.parametrize("partitioning", [None, ["first_code"]])
+def test_parquet_sink_keeps_overlapping_queries_once(monkeypatch: MonkeyPatch, tmp_path, partitioning):
+  pytest.importorskip("pyarrow")
+  sink = ParquetSink(str(tmp_path / "dataset"), partitioning = partitioning)
+  sqlite_sink = SQLiteSink(str(tmp_path / "data.sqlite"), "Test")
+  with monkeypatch.context() as m:
+    client = create_client(m, [])
+    for selection in [{"first_code": ["one", "two"]}, {"first_code": ["two", "three"], "second_code": ["four", "five"]}, {}]:
+      client.write_data(client.create_query(selection), sink)
+      client.write_data(client.create_query(selection), sqlite_sink)
+      assert sink.read().num_rows == len(sqlite_sink.read())
+  table = sink.read()
+  assert table.num_rows == 9
+  keys = list(zip(table.column("first_code").to_pylist(), table.column("second_code").to_pylist()))
+  assert len(set(keys)) == 9
+
+def test_async_write_data(monkeypatch: MonkeyPatch, tmp_path):
+  sink = SQLiteSink(str(tmp_path / "data.sqlite"), "Test")
+
+  async def run():
+    client = AsyncSCBClient("Test", "Test", "Test", "Test", transport = mocked_async_transport(body = mocked_body_with_missing), rate_limiter = RateLimiter())
+    client._client._variables = mock_variables_with_texts()
+    client._client._SCB_LIMIT_RESULT = 3
+    async with client:
+      return await client.write_data(await client.create_query(), sink)
+
+  assert asyncio.run(run()) == 9
+  assert len(sink.read()) == 9
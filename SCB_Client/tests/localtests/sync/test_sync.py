@@ -0,0 +1,93 @@
+import asyncio
+import pytest
+from pytest import MonkeyPatch
+
+from SCB_Client import AsyncSCBClient, SCBClient
+from SCB_Client.model.scb_models import SCBJsonResponse, SCBJsonResponseDataPoint
+from SCB_Client.SCBClientUtilities import RateLimiter, SyncStore
+from SCB_Client.tests.helpers import (create_mocked_client, mock_variables, mock_variables_with_time,
+                                     mocked_async_transport, mocked_time_body)
+
+def mock_variables_with_new_period():
+  variables = mock_variables_with_time()
+  variables[-1].values.append("2006")
+  variables[-1].valueTexts.append("2006")
+  return variables
+
+def create_client(m: MonkeyPatch, posts: list) -> SCBClient:
+  return create_mocked_client(m, posts, mock_variables_with_time, mocked_time_body)
+
+def get_time_values(posted_query: dict) -> list:
+  return [var["selection"]["values"] for var in posted_query["query"] if var["code"] == "time_code"][0]
+
+def test_first_sync_downloads_query(monkeypatch: MonkeyPatch, tmp_path):
+  store = SyncStore(str(tmp_path / "sync.sqlite"))
+  posts = []
+  with monkeypatch.context() as m:
+    client = create_client(m, posts)
+    query = client.create_query({"first_code": ["one"]}, time_top = 2)
+    responses = client.sync(query, store)
+    assert [get_time_values(post) for post in posts] == [["2004", "2005"]]
+    assert len(responses[0].data) == 2
+    assert store.get_high_water_mark(client.get_sync_signature(query)) == "2005"
+
+def test_sync_only_downloads_new_periods(monkeypatch: MonkeyPatch, tmp_path):
+  store = SyncStore(str(tmp_path / "sync.sqlite"))
+  posts = []
+  with monkeypatch.context() as m:
+    client = create_client(m, posts)
+    query = client.create_query({"first_code": ["one"]}, time_top = 2)
+    client.sync(query, store)
+    assert client.sync(query, store) == [], "Nothing new has been published."
+    assert len(posts) == 1, "No request should be made when the store is up to date."
+
+    m.setattr(client, "get_variables", mock_variables_with_new_period)
+    responses = client.sync(query, store)
+    assert get_time_values(posts[-1]) == ["2006"]
+    assert {datapoint.key[1] for datapoint in responses[0].data} == {"2006"}
+
+    signature = client.get_sync_signature(query)
+    assert store.get_high_water_mark(signature) == "2006"
+    stored = store.read(signature)
+    assert {datapoint.key[1] for datapoint in stored.data} == {"2004", "2005", "2006"}
+    assert len(stored.data) == 3
+
+def test_sync_signature_ignores_time_selection(monkeypatch: MonkeyPatch):
+  with monkeypatch.context() as m:
+    client = create_client(m, [])
+    assert client.get_sync_signature(client.create_query(time_top = 1)) == client.get_sync_signature(client.create_query(time_top = 3))
+    assert client.get_sync_signature(client.create_query()) != client.get_sync_signature(client.create_query({"first_code": ["one"]}))
+
+def test_append_is_idempotent(tmp_path):
+  store = SyncStore(str(tmp_path / "sync.sqlite"))
+  response = SCBJsonResponse(columns = [], comments = [], data = [SCBJsonResponseDataPoint(["one", "2005"], ["1"])])
+  store.append("signature", "url", [response], "2005")
+  store.append("signature", "url", [response], "2005")
+  assert len(store.read("signature").data) == 1
+  store.delete("signature")
+  assert store.read("signature") == None
+  assert store.get_high_water_mark("signature") == None
+
+def test_sync_requires_time_variable(monkeypatch: MonkeyPatch, tmp_path):
+  with monkeypatch.context() as m:
+    client = SCBClient("Test", "Test", "Test", "Test")
+    m.setattr(client, "get_variables", mock_variables)
+    with pytest.raises(ValueError):
+      client.sync(client.create_query(), SyncStore(str(tmp_path / "sync.sqlite")))
+
+def test_async_sync_only_downloads_new_periods(monkeypatch: MonkeyPatch, tmp_path):
+  store = SyncStore(str(tmp_path / "sync.sqlite"))
+  with monkeypatch.context() as m:
+    sync_client = create_client(m, [])
+    sync_client.sync(sync_client.create_query(time_top = 2), store)
+    posts = []
+
+    async def run():
+      client = AsyncSCBClient("Test", "Test", "Test", "Test", transport = mocked_async_transport(posts, mocked_time_body), rate_limiter = RateLimiter())
+      client._client._variables = mock_variables_with_new_period()
+      async with client:
+        return await client.sync(client._client.create_query(time_top = 2), store)
+
+    responses = asyncio.run(run())
+    assert [get_time_values(post) for post in posts] == [["2006"]]
+    assert len(responses[0].data) == 3
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+from pytest import MonkeyPatch
+
+from SCB_Client import AsyncSCBClient, SCBClient
+from SCB_Client.SCBClientUtilities import CallbackTracer, RateLimiter, SCBResponse, Tracer
+from SCB_Client.tests.helpers import create_mocked_client, mock_variables, mocked_async_transport, mocked_body
+
+def create_client(m: MonkeyPatch, tracer: Tracer) -> SCBClient:
+  client = create_mocked_client(m, rate_limiter = RateLimiter(max_requests = 1000, window_seconds = 1), tracer = tracer)
+  client.set_preferred_partition_variable_code("first_code")
+  client._SCB_LIMIT_RESULT = 3 # 9 cells with 3 per request results in 3 partitions
+  return client
+
+def test_default_tracer_creates_no_spans():
+  tracer = Tracer()
+  assert not tracer.enabled
+  with tracer.span("scb.test", table = "Test") as span:
+    span.set_attribute("cell_count", 1)
+  assert SCBClient("Test", "Test", "Test", "Test").tracer.enabled == False
+
+def test_span_is_timed_and_records_errors():
+  ended = []
+  tracer = CallbackTracer(on_end = ended.append)
+  with pytest.raises(ValueError):
+    with tracer.span("scb.test", table = "Test"):
+      raise ValueError()
+  assert ended[0].name == "scb.test"
+  assert isinstance(ended[0].error, ValueError)
+  assert ended[0].duration_ns() >= 0
+
+def test_subclasses_overriding_the_hooks_receive_spans(monkeypatch: MonkeyPatch):
+  class RecordingTracer(Tracer):
+    def __init__(self):
+      self.calls = []
+
+    def on_start(self, span):
+      self.calls.append(("start", span.name))
+
+    def on_end(self, span):
+      self.calls.append(("end", span.name))
+
+  class DisabledTracer(RecordingTracer):
+    enabled = False
+
+  tracer = RecordingTracer()
+  with monkeypatch.context() as m:
+    client = create_client(m, tracer)
+    client.get_data(client.create_query())
+  assert ("start", "scb.http_attempt") in tracer.calls and ("end", "scb.parse") in tracer.calls
+  assert not DisabledTracer().enabled
+  assert not Tracer().enabled
+
+def test_client_spans(monkeypatch: MonkeyPatch):
+  started, ended = [], []
+  with monkeypatch.context() as m:
+    client = create_client(m, CallbackTracer(on_start = started.append, on_end = ended.append))
+    client.set_max_workers(3)
+    client.get_data(client.create_query())
+
+  assert len(started) == len(ended)
+  names = [span.name for span in ended]
+  assert names.count("scb.create_query") == 1
+  assert names.count("scb.plan") == 1
+  assert names.count("scb.rate_limit_wait") == 3
+  assert names.count("scb.http_attempt") == 3
+  assert names.count("scb.parse") == 3
+
+  plan = [span for span in ended if span.name == "scb.plan"][0]
+  assert plan.attributes == {"table": "Test", "cell_count": 9, "partition_count": 3}
+  attempts = sorted([span for span in ended if span.name == "scb.http_attempt"], key = lambda span: span.attributes["partition_index"])
+  assert [span.attributes["partition_index"] for span in attempts] == [0, 1, 2]
+  assert attempts[0].attributes["cell_count"] == 3
+  assert attempts[0].attributes["status_code"] == 200
+  first_partition = {"query": [
+    {"code": "first_code", "selection": {"values": ["one"]}},
+    {"code": "second_code", "selection": {"values": ["four", "five", "six"]}}
+  ]}
+  assert attempts[0].attributes["response_bytes"] == len(mocked_body(first_partition))
+  parse = [span for span in ended if span.name == "scb.parse"][0]
+  assert parse.attributes["response_type"] == "JSON"
+  assert parse.attributes["result_type"] == "DEFAULT"
+
+def test_every_attempt_gets_a_span(monkeypatch: MonkeyPatch):
+  ended = []
+  responses = [SCBResponse(429, {"Retry-After": "0"}, b"")]
+  with monkeypatch.context() as m:
+    client = create_client(m, CallbackTracer(on_end = ended.append))
+    client._SCB_LIMIT_RESULT = 150000
+    m.setattr(client.transport, "post", lambda url, json, stream = False: responses.pop(0) if responses else SCBResponse(200, {}, mocked_body(json)))
+    client.get_data(client.create_query())
+  attempts = [span for span in ended if span.name == "scb.http_attempt"]
+  assert [(span.attributes["attempt"], span.attributes["status_code"]) for span in attempts] == [(0, 429), (1, 200)]
+
+def test_async_client_spans():
+  ended = []
+
+  async def run():
+    client = AsyncSCBClient("Test", "Test", "Test", "Test", transport = mocked_async_transport(), rate_limiter = RateLimiter(), tracer = CallbackTracer(on_end = ended.append))
+    client._client._variables = mock_variables()
+    client._client._SCB_LIMIT_RESULT = 3
+    await client.set_preferred_partition_variable_code("first_code")
+    return await client.get_data(await client.create_query())
+
+  asyncio.run(run())
+  names = [span.name for span in ended]
+  assert names.count("scb.http_attempt") == 3
+  assert names.count("scb.parse") == 3
+  assert names.count("scb.plan") == 1